@@ -0,0 +1,46 @@
+"""
+Conversion of the geocentric coordinates into geodetic coordinates.
+
+"""
+import numpy as np
+
+from coordinates import jit, xyz2lbh
+from coordinates.geodesy import xyz2lbh_array
+
+
+def random_points(n):
+    random = np.random.RandomState(0)
+    xyz = random.normal(size=(n, 3))
+    xyz *= random.uniform(6.3e6, 4.3e7, (n, 1)) / np.linalg.norm(
+        xyz, axis=1, keepdims=True)
+    return xyz
+
+
+class XYZ2LBH:
+
+    def setup(self):
+        self.points = random_points(1000).tolist()
+
+    def time_xyz2lbh(self):
+        for x, y, z in self.points:
+            xyz2lbh(x, y, z)
+
+
+class XYZ2LBHArray:
+    params = ([1000, 100000, 1000000], ['numpy', 'numba'])
+    param_names = ['n', 'backend']
+
+    def setup(self, n, backend):
+        if backend not in jit.available_backends():
+            raise NotImplementedError
+
+        self.x, self.y, self.z = random_points(n).T
+        self.backend = jit.get_backend()
+        jit.set_backend(backend)
+        xyz2lbh_array(self.x[:10], self.y[:10], self.z[:10])
+
+    def teardown(self, n, backend):
+        jit.set_backend(self.backend)
+
+    def time_xyz2lbh_array(self, n, backend):
+        xyz2lbh_array(self.x, self.y, self.z)
@@ -0,0 +1,17 @@
+"""
+Startup cost: import of the package and the submodules in a fresh
+interpreter.
+
+"""
+
+
+def timeraw_import_coordinates():
+    return 'import coordinates'
+
+
+def timeraw_import_satellite_xyz():
+    return 'from coordinates import satellite_xyz'
+
+
+def timeraw_import_batch():
+    return 'import coordinates.batch'
@@ -0,0 +1,89 @@
+"""
+Parsing of the navigation files and lookup of the messages.
+
+"""
+import datetime
+import time
+import tracemalloc
+
+from coordinates.broadcast import rnx_nav
+from coordinates.sat import find_message, read_nav_data
+
+from .common import START, nav_file
+
+
+class RinexNavParsing:
+    params = [1, 6, 24]
+    param_names = ['hours']
+    timeout = 300
+
+    def setup(self, hours):
+        self.filename = nav_file(hours)
+
+    def time_rnx_nav(self, hours):
+        for _ in rnx_nav(self.filename):
+            pass
+
+    def track_records_per_second(self, hours):
+        start = time.perf_counter()
+        records = sum(1 for _ in rnx_nav(self.filename))
+        return records / (time.perf_counter() - start)
+
+    track_records_per_second.unit = 'records/s'
+
+    def time_iter_bytes(self, hours):
+        for _ in rnx_nav(self.filename).iter_bytes():
+            pass
+
+    def track_records_per_second_bytes(self, hours):
+        start = time.perf_counter()
+        records = sum(1 for _ in rnx_nav(self.filename).iter_bytes())
+        return records / (time.perf_counter() - start)
+
+    track_records_per_second_bytes.unit = 'records/s'
+
+    def time_read_nav_data(self, hours):
+        read_nav_data.cache_clear()
+        read_nav_data(self.filename)
+
+    def peakmem_read_nav_data(self, hours):
+        read_nav_data.cache_clear()
+        read_nav_data(self.filename)
+
+    def track_read_nav_data_bytes(self, hours):
+        read_nav_data.cache_clear()
+        tracemalloc.start()
+        try:
+            nav_data = read_nav_data(self.filename)
+            size, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        del nav_data
+        return size
+
+    track_read_nav_data_bytes.unit = 'bytes'
+
+
+class MergedNavData:
+    params = ([0., 0.5, 2.], [3.03, 2.11])
+    param_names = ['duplicates', 'version']
+    timeout = 300
+
+    def setup(self, duplicates, version):
+        self.filename = nav_file(24, duplicates, version)
+
+    def time_read_nav_data(self, duplicates, version):
+        read_nav_data.cache_clear()
+        read_nav_data(self.filename)
+
+
+class FindMessage:
+    params = ['G', 'R', 'E', 'C']
+    param_names = ['system']
+
+    def setup(self, system):
+        self.nav_data = read_nav_data(nav_file(24))
+        self.epoch = START + datetime.timedelta(hours=13, seconds=17)
+
+    def time_find_message(self, system):
+        find_message(self.nav_data, system, 7, self.epoch)
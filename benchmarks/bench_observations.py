@@ -0,0 +1,47 @@
+"""
+Streaming of the observation files and the join with the satellite
+positions.
+
+"""
+import time
+
+from coordinates.observations import block_xyz, rnx_obs
+
+from .common import nav_file, obs_file
+
+
+class RinexObsStreaming:
+    params = ([120, 2880], [3.03, 2.11])
+    param_names = ['epochs', 'version']
+    timeout = 300
+
+    def setup(self, epochs, version):
+        self.filename = obs_file(epochs, version)
+
+    def time_rnx_obs(self, epochs, version):
+        for _ in rnx_obs(self.filename):
+            pass
+
+    def track_rows_per_second(self, epochs, version):
+        start = time.perf_counter()
+        rows = sum(len(b.epoch) for b in rnx_obs(self.filename))
+        return rows / (time.perf_counter() - start)
+
+    track_rows_per_second.unit = 'rows/s'
+
+    def peakmem_rnx_obs(self, epochs, version):
+        for _ in rnx_obs(self.filename):
+            pass
+
+
+class BlockXYZ:
+    timeout = 300
+
+    def setup(self):
+        self.nav = nav_file(2)
+        self.blocks = list(rnx_obs(obs_file(240)))
+        block_xyz(self.nav, self.blocks[0])
+
+    def time_block_xyz(self):
+        for block in self.blocks:
+            block_xyz(self.nav, block)
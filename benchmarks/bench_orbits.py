@@ -0,0 +1,57 @@
+"""
+Propagation of the broadcast orbits: per point and batch.
+
+"""
+import datetime
+
+import numpy as np
+
+from coordinates import jit
+from coordinates.batch import satellite_xyz_many
+from coordinates.sat import read_nav_data, satellite_xyz
+from coordinates.timescale import datetime2sec
+
+from .common import START, nav_file
+
+
+class SatelliteXYZ:
+    params = ['G', 'R', 'E', 'C']
+    param_names = ['system']
+
+    def setup(self, system):
+        self.filename = nav_file(24)
+        read_nav_data(self.filename)
+        self.epoch = START + datetime.timedelta(hours=13, seconds=17)
+
+    def time_satellite_xyz(self, system):
+        # without the cache of the results
+        satellite_xyz.__wrapped__(self.filename, system, 7, self.epoch)
+
+
+class SatelliteXYZMany:
+    params = ([100, 1000, 10000, 100000], ['numpy', 'numba'])
+    param_names = ['n', 'backend']
+
+    def setup(self, n, backend):
+        if backend not in jit.available_backends():
+            raise NotImplementedError
+
+        self.filename = nav_file(24)
+        self.satellites = np.array(['G', 'R', 'E', 'C'] * (n // 4 + 1))[:n]
+        self.numbers = np.arange(n) % 24 + 1
+
+        start = datetime2sec(START) + 60
+        self.sec = start + np.linspace(0, 23 * 3600, n)
+
+        self.backend = jit.get_backend()
+        jit.set_backend(backend)
+        # compile and load the file
+        satellite_xyz_many(self.filename, self.satellites[:4],
+                           self.numbers[:4], self.sec[:4])
+
+    def teardown(self, n, backend):
+        jit.set_backend(self.backend)
+
+    def time_satellite_xyz_many(self, n, backend):
+        satellite_xyz_many(self.filename, self.satellites, self.numbers,
+                           self.sec)
@@ -0,0 +1,76 @@
+"""
+Synthetic input files shared by the benchmarks.
+
+"""
+import atexit
+import datetime
+import os
+import shutil
+import tempfile
+
+from coordinates.synthetic import nav_records, write_nav, write_obs
+
+START = datetime.datetime(2017, 9, 8)
+POSITION = (-6100258.869, -996506.167, -1567978.863)
+
+_directory = None
+_files = dict()
+
+
+def _remove_directory():
+    if _directory is not None:
+        shutil.rmtree(_directory, ignore_errors=True)
+
+
+def _make_directory():
+    global _directory
+
+    if _directory is None:
+        _directory = tempfile.mkdtemp(prefix='coordinates-bench-')
+        atexit.register(_remove_directory)
+
+
+def nav_file(hours=24, duplicates=0., version=3.03):
+    """Returns the name of the synthetic navigation file for the time
+    span; the file is written once per process. RINEX 2 files hold GPS
+    records only.
+
+    """
+    key = hours, duplicates, version
+    if key not in _files:
+        _make_directory()
+
+        satellites = None if version >= 3 else dict(G=32)
+        records = nav_records(START, hours=hours, satellites=satellites,
+                              duplicates=duplicates)
+
+        filename = os.path.join(
+            _directory,
+            'nav-{}h-{}-{}.rnx'.format(hours, duplicates, version),
+        )
+        with open(filename, 'w') as out:
+            write_nav(out, records, version=version)
+        _files[key] = filename
+
+    return _files[key]
+
+
+def obs_file(epochs=2880, version=3.03):
+    """Returns the name of the synthetic observation file with 40
+    satellites per epoch (30 seconds interval); the file is written once
+    per process.
+
+    """
+    key = 'obs', epochs, version
+    if key not in _files:
+        _make_directory()
+
+        filename = os.path.join(
+            _directory,
+            'obs-{}-{}.rnx'.format(epochs, version),
+        )
+        with open(filename, 'w') as out:
+            write_obs(out, START, POSITION, epochs, version=version)
+        _files[key] = filename
+
+    return _files[key]
@@ -2,13 +2,42 @@
 """
 Tools for manipulating coordinates for gnss-lab project.
 
+The submodules which need NumPy (e.g. coordinates.sat) are imported on the
+first access to their names, so ``import coordinates`` is cheap and has
+no side effects.
 """
+import importlib
+import sys
 from math import pi, sin, cos, atan2, sqrt
 
 from coordinates.exceptions import XYZNotFoundError
-from coordinates.sat import satellite_xyz
 
-__all__ = ['satellite_xyz', 'retrieve_xyz', 'xyz2lbh']
+__all__ = ['satellite_xyz', 'retrieve_xyz', 'xyz2lbh', 'stats']
+
+# name -> the module which provides it
+_LAZY = dict(
+    satellite_xyz='coordinates.sat',
+    stats='coordinates.instrument',
+)
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        value = getattr(importlib.import_module(_LAZY[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(
+        "module '{}' has no attribute '{}'".format(__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
+
+
+# module __getattr__ requires Python 3.7 (PEP 562)
+if sys.version_info < (3, 7):
+    from coordinates.instrument import stats  # noqa: F401
+    from coordinates.sat import satellite_xyz  # noqa: F401
 
 __version__ = '1.1.0b2'
 __author__ = __maintainer__ = 'Ilya Zhivetiev'
@@ -0,0 +1,207 @@
+"""
+Asyncio counterparts of the readers and the orbit queries.
+
+The files are read and parsed, and the coordinates are computed in the
+executor, so the event loop is never blocked by the I/O or by the
+computation. A usage example::
+
+    nav_data = await coordinates.aio.load_nav('brdm2510.17p')
+    xyz = await coordinates.aio.satellite_xyz_many(
+        'brdm2510.17p', 'G', 1, epochs)
+
+The executor is the default executor of the event loop unless another one
+is set with set_executor or passed with the executor argument, e.g.
+concurrent.futures.ThreadPoolExecutor (the parsers and the kernels release
+the GIL for the most of the work, see coordinates.jit).
+
+Concurrent requests for the same file (see coordinates.cache.cache_key)
+are coalesced: the file is parsed once and every request gets the result.
+A cancelled request doesn't cancel the parsing shared with other requests;
+the parsing which is already running in the executor completes and its
+result is cached. satellite_xyz_many computes the large requests by chunks
+and stops after the current chunk when it is cancelled.
+"""
+import asyncio
+import functools
+import weakref
+
+import numpy as np
+
+from coordinates.batch import (
+    broadcast_request,
+    read_nav_arrays,
+    satellite_xyz_many as _satellite_xyz_many,
+)
+from coordinates.cache import FileKey
+from coordinates.sat import (
+    read_nav_data,
+    satellite_xyz as _satellite_xyz,
+)
+
+# the number of rows of satellite_xyz_many computed by one executor call
+CHUNK_SIZE = 100000
+
+_state = dict(executor=None)
+
+# event loop -> {(function, file key, arguments): asyncio.Future}
+_pending = weakref.WeakKeyDictionary()
+
+
+def set_executor(executor):
+    """Sets the executor used by default, see concurrent.futures.Executor;
+    None means the default executor of the event loop.
+
+    """
+    _state['executor'] = executor
+
+
+def get_executor():
+    """Returns the executor used by default or None."""
+    return _state['executor']
+
+
+async def run(function, *args, executor=None, **kwargs):
+    """Calls the function in the executor and returns its result.
+
+    Parameters
+    ----------
+    function : callable
+
+    executor : concurrent.futures.Executor, optional
+        default: see set_executor
+    """
+    if executor is None:
+        executor = _state['executor']
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(
+        executor, functools.partial(function, *args, **kwargs))
+
+
+def forget(pending, key, future):
+    """Removes the finished future from the pending requests."""
+    if pending.get(key) is future:
+        del pending[key]
+    # the error is delivered to the waiting requests if there are any
+    if not future.cancelled():
+        future.exception()
+
+
+async def coalesced(function, filename, *args, executor=None):
+    """Calls the cached function of the file (see
+    coordinates.cache.file_cache) in the executor; concurrent calls with the
+    same file and arguments share one call.
+
+    """
+    if executor is None:
+        executor = _state['executor']
+    loop = asyncio.get_event_loop()
+
+    # stat or hash of the content can block too
+    file_key = await loop.run_in_executor(executor, FileKey, filename)
+
+    pending = _pending.setdefault(loop, {})
+    key = (function, file_key, args)
+    future = pending.get(key)
+    if future is None:
+        future = loop.run_in_executor(
+            executor, functools.partial(function.keyed, file_key, *args))
+        pending[key] = future
+        future.add_done_callback(functools.partial(forget, pending, key))
+
+    # the cancellation of the request doesn't cancel the shared call
+    return await asyncio.shield(future)
+
+
+async def load_nav(filename, healthy_only=False, check_fit_interval=False,
+                   errors='strict', executor=None):
+    """Returns navigation data of the file, see
+    coordinates.sat.read_nav_data.
+
+    Parameters
+    ----------
+    filename : str or file
+
+    healthy_only, check_fit_interval, errors
+        see coordinates.sat.read_nav_data
+
+    executor : concurrent.futures.Executor, optional
+        default: see set_executor
+
+    Returns
+    -------
+    nav_data : NavData
+    """
+    return await coalesced(read_nav_data, filename, healthy_only,
+                           check_fit_interval, errors, executor=executor)
+
+
+async def load_nav_arrays(filename, healthy_only=False,
+                          check_fit_interval=False, errors='strict',
+                          executor=None):
+    """Returns navigation data of the file as NavArrays, see
+    coordinates.batch.read_nav_arrays and load_nav.
+
+    """
+    return await coalesced(read_nav_arrays, filename, healthy_only,
+                           check_fit_interval, errors, executor=executor)
+
+
+async def satellite_xyz(filename, satellite, number, epoch, executor=None):
+    """Returns XYZ coordinates of the satellite, see
+    coordinates.sat.satellite_xyz.
+
+    """
+    if not hasattr(filename, 'satellite_xyz_many'):
+        await load_nav(filename, executor=executor)
+    return await run(_satellite_xyz, filename, satellite, number, epoch,
+                     executor=executor)
+
+
+async def satellite_xyz_many(filename, satellite, number, epoch,
+                             receiver=None, elevation_mask=0.,
+                             executor=None, chunk_size=CHUNK_SIZE):
+    """Returns XYZ coordinates of the satellites for the epochs, see
+    coordinates.batch.satellite_xyz_many.
+
+    The request is computed by chunks of chunk_size rows; the cancellation
+    takes effect between the chunks.
+
+    Parameters
+    ----------
+    filename, satellite, number, epoch, receiver, elevation_mask
+        see coordinates.batch.satellite_xyz_many
+
+    executor : concurrent.futures.Executor, optional
+        default: see set_executor
+
+    chunk_size : int, optional
+
+    Returns
+    -------
+    xyz : numpy.ndarray
+
+    or, if the receiver is given,
+
+    index, xyz : numpy.ndarray
+    """
+    if not hasattr(filename, 'satellite_xyz_many'):
+        await load_nav_arrays(filename, executor=executor)
+
+    satellite, number, sec = await run(broadcast_request, satellite, number,
+                                       epoch, executor=executor)
+
+    results = []
+    for start in range(0, max(len(sec), 1), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        result = await run(
+            _satellite_xyz_many, filename, satellite[chunk], number[chunk],
+            sec[chunk], receiver, elevation_mask, executor=executor,
+        )
+        if receiver is not None:
+            index, xyz = result
+            result = index + start, xyz
+        results.append(result)
+
+    if receiver is None:
+        return np.concatenate(results)
+    return tuple(np.concatenate(r) for r in zip(*results))
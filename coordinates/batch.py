@@ -0,0 +1,436 @@
+"""
+Batch computation of the satellite coordinates.
+
+The functions accept arrays of epochs as numbers (see
+``coordinates.timescale``) and process them without creating a
+``datetime.datetime`` object per epoch.
+"""
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from coordinates import instrument
+from coordinates.broadcast import RinexNavFile
+from coordinates.cache import file_cache
+from coordinates.ephemeris import ephemeris_array
+from coordinates.exceptions import SatSystemError, NavMessageNotFoundError
+from coordinates.geodesy import receiver_frames, row_elevation
+from coordinates.kernels import (  # noqa: F401
+    glo_sat_xyz_array,
+    gps_sat_xyz_array,
+)
+from coordinates.propagators import find_propagator
+from coordinates.sat import GPS_WAY, KNOWN_SYSTEMS, read_nav_data
+from coordinates.timescale import datetime2sec, day, from_gps, week_sec
+
+# visibility pre-pass: step of the coarse grid, seconds, and the upper
+# bound of the elevation rate of GNSS satellites, degrees per second
+COARSE_STEP = 600.
+MAX_ELEVATION_RATE = 0.02
+
+# time systems of the navigation message epochs other than GPS time
+NAV_TIME_SYSTEM = dict(
+    R='UTC',  # GLONASS
+    C='C',  # BDS
+)
+
+NavArrays = namedtuple('NavArrays', ['epochs', 'messages', 'ephemerides'])
+NavArrays.__doc__ = """\
+Navigation messages of a satellite.
+
+epochs : numpy.ndarray
+    (n, ) epochs of the messages, seconds since GPS_EPOCH, sorted.
+messages : numpy.ndarray
+    (n, m) navigation messages.
+ephemerides : numpy.ndarray
+    (n, p) compiled ephemerides, see coordinates.ephemeris.ephemeris_array
+"""
+
+
+@file_cache(maxsize=8, single_flight=True)
+def read_nav_arrays(filename, healthy_only=False, check_fit_interval=False,
+                    errors='strict'):
+    """Returns dictionary which contains navigation data from the file as
+    NavArrays keyed by (satellite, number).
+
+    healthy_only, check_fit_interval, and errors: see
+    coordinates.sat.read_nav_data.
+
+    """
+    nav_data = read_nav_data(filename, healthy_only, check_fit_interval,
+                             errors)
+    nav_arrays = dict()
+    for sat, records in nav_data.items():
+        epochs = np.array([datetime2sec(r['epoch']) for r in records])
+        messages = np.array([r['message'] for r in records], dtype=float)
+        ephemerides = ephemeris_array([r['ephemeris'] for r in records])
+        nav_arrays[sat] = NavArrays(epochs, messages, ephemerides)
+    return nav_arrays
+
+
+def select_messages(nav_arrays, satellite, number, sec,
+                    field='messages'):
+    """Returns time deltas and navigation messages for the epochs, the
+    vectorized version of ``coordinates.sat.find_message``.
+
+    Parameters
+    ----------
+    nav_arrays : dict
+        see read_nav_arrays
+
+    satellite : str
+
+    number : int
+
+    sec : numpy.ndarray
+        (n, ) epochs, seconds since GPS_EPOCH in the system time
+
+    field : str, optional
+        'messages' or 'ephemerides', see NavArrays
+
+    Returns
+    -------
+    dt : numpy.ndarray
+        (n, ) seconds since the beginning of the week for GPS-way
+        satellites and seconds since the message epoch for GLO-way
+        satellites.
+
+    messages : numpy.ndarray
+        (n, m) navigation messages or compiled ephemerides.
+
+    Raises
+    ------
+    SatSystemError
+        on unknown satellite system.
+
+    NavMessageNotFoundError
+        when there is no message for the satellite or the epochs.
+    """
+    if satellite not in KNOWN_SYSTEMS:
+        raise SatSystemError(satellite)
+
+    try:
+        arrays = nav_arrays[(satellite, number)]
+    except KeyError:
+        msg = 'No such satellite: {sat}{num}'.format(
+            sat=satellite,
+            num=number,
+        )
+        raise NavMessageNotFoundError(msg)
+
+    messages = getattr(arrays, field)
+
+    # the first message for GPS, BDS, Galileo, and IRNSS
+    if satellite in GPS_WAY:
+        messages = np.broadcast_to(
+            messages[0],
+            (len(sec), messages.shape[1]),
+        )
+        dt = week_sec(sec, satellite)
+        return dt, messages
+
+    # the nearest for GLONASS, SBAS, and QZSS
+    days = day(sec)
+    first_day = day(arrays.epochs[0])
+    last_day = day(arrays.epochs[-1])
+    if not np.all((days == first_day) | (days == last_day)):
+        raise NavMessageNotFoundError(
+            'The dates of the nav message and observation must be the same.'
+        )
+
+    index = np.searchsorted(arrays.epochs, sec, side='right') - 1
+    np.maximum(index, 0, out=index)
+
+    dt = sec - arrays.epochs[index]
+    return dt, messages[index]
+
+
+def xyz_array_calculator(satellite, number=None):
+    """Returns the vectorized XYZ calculator for the satellite system, the
+    batch entry of the propagator, see
+    coordinates.propagators.find_propagator.
+
+    """
+    return find_propagator(satellite, number).batch
+
+
+def broadcast_request(satellite, number, epoch):
+    """Returns flat arrays of satellites, numbers and epochs (seconds)
+    broadcast against each other.
+
+    """
+    sec = np.atleast_1d(datetime2sec(epoch))
+    satellite, number, sec = np.broadcast_arrays(
+        np.asarray(satellite, dtype=str),
+        np.asarray(number, dtype=int),
+        sec,
+    )
+    return satellite.ravel(), number.ravel(), sec.ravel()
+
+
+def satellite_xyz_many(filename, satellite, number, epoch, receiver=None,
+                       elevation_mask=0.):
+    """Returns XYZ coordinates of the satellites for the epochs.
+
+    Parameters
+    ----------
+    filename : str or file
+        navigation file or an orbit object with satellite_xyz_many method,
+        e.g. coordinates.sp3.SP3Orbits
+
+    satellite : str or array_like
+        satellite system(s)
+
+    number : int or array_like
+        satellite number(s)
+
+    epoch : array_like
+        epochs as seconds since coordinates.timescale.GPS_EPOCH in the
+        system time, numpy.datetime64 or datetime.datetime values.
+
+    The parameters are broadcast against each other.
+
+    receiver : array_like, optional
+        X, Y, Z of the receiver, meters. If given, only the satellites
+        above the elevation mask are returned, see visible_xyz_many.
+
+    elevation_mask : float, optional
+        degrees, used with the receiver
+
+    Returns
+    -------
+    xyz : numpy.ndarray
+        (n, 3) X, Y, Z, meters
+
+    or, if the receiver is given,
+
+    index : numpy.ndarray
+        indices of the visible rows in the (broadcast) request
+    xyz : numpy.ndarray
+        (len(index), 3) X, Y, Z, meters
+
+    Raises
+    ------
+    SatSystemError
+        on unknown satellite system.
+
+    NavMessageNotFoundError
+        when there is no message for a satellite or an epoch.
+    """
+    if receiver is not None:
+        return visible_xyz_many(filename, satellite, number, epoch, receiver,
+                                elevation_mask)
+
+    if hasattr(filename, 'satellite_xyz_many'):
+        return filename.satellite_xyz_many(satellite, number, epoch)
+
+    satellite, number, sec = broadcast_request(satellite, number, epoch)
+    return nav_arrays_xyz(read_nav_arrays(filename), satellite, number, sec)
+
+
+def nav_arrays_xyz(nav_arrays, satellite, number, sec):
+    """Returns XYZ coordinates of the satellites for the epochs computed
+    from the navigation data, see satellite_xyz_many.
+
+    Parameters
+    ----------
+    nav_arrays : dict
+        see read_nav_arrays
+
+    satellite, number, sec : numpy.ndarray
+        (n, ) see broadcast_request
+
+    Returns
+    -------
+    xyz : numpy.ndarray
+        (n, 3) X, Y, Z, meters
+    """
+    started = instrument.start()
+
+    # the rows are grouped by the propagator and every propagator is
+    # called once
+    groups = OrderedDict()
+    for system, num, index in group_request(satellite, number):
+        dt, ephemerides = select_messages(
+            nav_arrays,
+            system,
+            num,
+            sec[index],
+            field='ephemerides',
+        )
+        propagator = find_propagator(system, num)
+        groups.setdefault(propagator, []).append((index, dt, ephemerides))
+
+    started = instrument.stop('find_message', started)
+
+    xyz = np.empty((sec.size, 3))
+    for propagator, group in groups.items():
+        index, dt, ephemerides = (np.concatenate(g) for g in zip(*group))
+        xyz[index] = propagator.batch(ephemerides, dt)
+
+    instrument.stop('propagate', started)
+    instrument.count('propagate.rows', sec.size)
+    return xyz
+
+
+def group_request(satellite, number):
+    """Yields satellite system, number, and indices of its rows.
+
+    """
+    for system in np.unique(satellite):
+        in_system = satellite == system
+        for num in np.unique(number[in_system]):
+            index = np.flatnonzero(in_system & (number == num))
+            yield str(system), int(num), index
+
+
+def satellite_index(index, satellite, number):
+    """Returns indices of the satellites of the request in the arrays of the
+    orbit object.
+
+    Parameters
+    ----------
+    index : dict
+        (satellite system, number) -> index in the arrays
+
+    satellite, number : numpy.ndarray
+        flat arrays, see broadcast_request
+
+    Raises
+    ------
+    NavMessageNotFoundError
+        when there is no such satellite.
+    """
+    sat_index = np.empty(len(satellite), dtype=int)
+    for system, num, rows in group_request(satellite, number):
+        key = (system, num)
+        if key not in index:
+            msg = 'No such satellite: {sat}{num}'.format(
+                sat=system,
+                num=num,
+            )
+            raise NavMessageNotFoundError(msg)
+        sat_index[rows] = index[key]
+    return sat_index
+
+
+def coarse_visibility(filename, satellite, number, sec, receiver, frame,
+                      elevation_mask):
+    """Returns False for the epochs when the satellite can't be above the
+    elevation mask.
+
+    The elevation is computed on the coarse grid only; between the nodes
+    of the grid it can't exceed the maximum at the nodes by more than
+    MAX_ELEVATION_RATE * step / 2.
+    """
+    lo, hi = np.min(sec), np.max(sec)
+    num_of_nodes = int(np.ceil((hi - lo) / COARSE_STEP)) + 1
+    if num_of_nodes < 2 or num_of_nodes * 2 >= len(sec):
+        return np.ones(len(sec), dtype=bool)
+
+    nodes = np.linspace(lo, hi, num_of_nodes)
+    elevation = row_elevation(
+        receiver,
+        frame,
+        satellite_xyz_many(filename, satellite, number, nodes),
+    )
+
+    index = np.searchsorted(nodes, sec, side='right') - 1
+    np.clip(index, 0, num_of_nodes - 2, out=index)
+
+    margin = MAX_ELEVATION_RATE * (nodes[1] - nodes[0]) / 2
+    bound = np.fmax(elevation[index], elevation[index + 1]) + margin
+
+    # NaN (absent orbits) can't be pruned
+    return ~(bound < elevation_mask)
+
+
+def visible_xyz_many(filename, satellite, number, epoch, receiver,
+                     elevation_mask=0.):
+    """Returns XYZ coordinates of the satellites above the elevation mask,
+    see satellite_xyz_many.
+
+    The (satellite, epoch) pairs which can't be visible are pruned by the
+    coarse pre-pass (see coarse_visibility) before the full computation.
+
+    Returns
+    -------
+    index : numpy.ndarray
+        indices of the visible rows in the (broadcast) request
+    xyz : numpy.ndarray
+        (len(index), 3) X, Y, Z, meters
+    """
+    satellite, number, sec = broadcast_request(satellite, number, epoch)
+    receiver = np.asarray(receiver, dtype=float).reshape(3)
+    frame = receiver_frames(receiver)[0]
+
+    candidate = np.zeros(len(sec), dtype=bool)
+    for system, num, index in group_request(satellite, number):
+        candidate[index] = coarse_visibility(
+            filename, system, num, sec[index], receiver, frame,
+            elevation_mask,
+        )
+    index = np.flatnonzero(candidate)
+
+    xyz = satellite_xyz_many(
+        filename,
+        satellite[index],
+        number[index],
+        sec[index],
+    )
+    visible = row_elevation(receiver, frame, xyz) >= elevation_mask
+    return index[visible], xyz[visible]
+
+
+def satellite_xyz_grid(filename, satellites, numbers, epoch, gps_time=True,
+                       leap_seconds=None):
+    """Returns XYZ coordinates of every satellite for every epoch.
+
+    Parameters
+    ----------
+    filename : str, file or orbit object
+        see satellite_xyz_many
+
+    satellites, numbers : array_like
+        (k, ) satellite systems and numbers
+
+    epoch : array_like
+        (m, ) epochs
+
+    gps_time : bool, optional
+        the epochs are in GPS time; for navigation files they are converted
+        into the time system of the messages of every satellite. Otherwise
+        the epochs are used as is, see satellite_xyz_many.
+
+    leap_seconds : int, optional
+        GPS - UTC; by default it is read from the navigation file when
+        needed
+
+    Returns
+    -------
+    xyz : numpy.ndarray
+        (k, m, 3) X, Y, Z, meters; NaN for the satellites without
+        navigation messages for the epochs.
+    """
+    sec = np.atleast_1d(datetime2sec(epoch))
+    satellites, numbers = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(satellites, dtype=str)),
+        np.atleast_1d(np.asarray(numbers, dtype=int)),
+    )
+
+    convert = gps_time and not hasattr(filename, 'satellite_xyz_many')
+    if convert and leap_seconds is None and 'R' in satellites:
+        leap_seconds = RinexNavFile.retrieve_leap_seconds(filename)
+
+    xyz = np.full((len(satellites), len(sec), 3), np.nan)
+    for i, (sat, num) in enumerate(zip(satellites.tolist(),
+                                       numbers.tolist())):
+        sat_sec = sec
+        if convert and sat in NAV_TIME_SYSTEM:
+            sat_sec = from_gps(sec, NAV_TIME_SYSTEM[sat], leap_seconds)
+        try:
+            xyz[i] = satellite_xyz_many(filename, sat, num, sat_sec)
+        except NavMessageNotFoundError:
+            pass
+
+    return xyz
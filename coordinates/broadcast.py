@@ -3,28 +3,113 @@
 """
 import datetime
 import logging
+import mmap
+import threading
+import weakref
 from abc import ABC, abstractmethod
-from io import StringIO
+from collections import namedtuple
+from contextlib import contextmanager
+from io import BytesIO, StringIO
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
 
 from coordinates.exceptions import RinexNavFileError
 
 LOGGER = logging.getLogger(__name__)
-logging.basicConfig(level=logging.DEBUG)
+
+# records converted at once by the byte-level parser, see
+# RinexNavFile.iter_bytes
+BUFFER_CHUNK = 1024
+
+# bytes scanned at once for the line terminators
+SCAN_CHUNK = 1 << 20
+
+# the width of the lines of the records
+LINE_WIDTH = 80
+
+# the handling of the malformed records by RinexNavFile.iter_bytes
+ERROR_MODES = ('strict', 'skip')
+
+# the locks of the file objects shared by the readers, see stream_lock
+_stream_locks = weakref.WeakKeyDictionary()
+_stream_locks_guard = threading.Lock()
+_shared_stream_lock = threading.RLock()
+
+_SPACE = ord(' ')
+_NEWLINE = ord('\n')
+_RETURN = ord('\r')
+
+
+NavParseError = namedtuple('NavParseError', [
+    'line_number', 'offset', 'message',
+])
+NavParseError.__doc__ = """\
+The malformed record skipped by the error-tolerant parser, see
+RinexNavFile.iter_bytes.
+
+line_number : int
+    the first line of the record, counted from 1
+offset : int
+    bytes from the start of the file to the line
+message : str
+"""
+
+
+def stream_lock(file_object):
+    """Returns the lock of the file object which is held by the readers
+    while they read and rewind the object, see read_stream.
+
+    """
+    with _stream_locks_guard:
+        try:
+            lock = _stream_locks.get(file_object)
+            if lock is None:
+                lock = _stream_locks[file_object] = threading.RLock()
+        except TypeError:
+            # the object doesn't support weak references
+            lock = _shared_stream_lock
+    return lock
+
+
+def read_stream(file_object):
+    """Returns the content of the file object from the current position;
+    the object will seek to the start of the file. The file object can be
+    shared by the readers in several threads.
+
+    """
+    with stream_lock(file_object):
+        content = file_object.read()
+        file_object.seek(0)
+    return content
 
 
 class IOWrapper():
 
-    def __init__(self, filename):
+    def __init__(self, filename, mode='r', buffering=-1):
         """
         filename: str or StringIO
+        mode, buffering: see open(), used for str
+
+        The file object is read at once into a private copy when it is
+        opened for reading (see read_stream), so the readers of the same
+        object don't interfere.
         """
         self.filename = filename
+        self.mode = mode
+        self.buffering = buffering
         self.file_obj = None
         self.seek = False
 
     def __enter__(self):
         if isinstance(self.filename, str):
-            self.file_obj = open(self.filename)
+            self.file_obj = open(self.filename, self.mode, self.buffering)
+        elif 'r' in self.mode:
+            content = read_stream(self.filename)
+            if isinstance(content, str):
+                self.file_obj = StringIO(content)
+            else:
+                self.file_obj = BytesIO(content)
         else:
             self.file_obj = self.filename
             self.seek = True
@@ -38,6 +123,176 @@ class IOWrapper():
         return False
 
 
+@contextmanager
+def open_buffer(filename):
+    """Returns the content of the file as bytes-like object: the memory map
+    of the file or the bytes read from the file object (text is encoded as
+    latin-1, the object will seek to the start of the file).
+
+    """
+    if not isinstance(filename, str):
+        content = read_stream(filename)
+        if isinstance(content, str):
+            content = content.encode('latin-1')
+        yield content
+        return
+
+    with open(filename, 'rb') as file_object:
+        try:
+            buffer = mmap.mmap(file_object.fileno(), 0,
+                               access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty file
+            yield b''
+            return
+        try:
+            yield buffer
+        finally:
+            try:
+                buffer.close()
+            except BufferError:
+                # the arrays are still referenced, e.g. by the traceback of
+                # the exception; the map is closed when they are collected
+                pass
+
+
+def find_header_end(buffer):
+    """Returns the offset of the first line after the header.
+
+    Raises
+    ------
+    RinexNavFileError
+        on unexpected end of the file.
+    """
+    label = b'END OF HEADER'
+    position = buffer.find(label)
+    while position >= 0:
+        line_start = buffer.rfind(b'\n', 0, position) + 1
+        if position - line_start == 60:
+            line_end = buffer.find(b'\n', position)
+            return len(buffer) if line_end < 0 else line_end + 1
+        position = buffer.find(label, position + 1)
+    raise RinexNavFileError('Unexpected end of the file.')
+
+
+def line_bounds(data, offset):
+    """Returns the starts and the ends (without the line terminators) of
+    the lines of the data after the offset.
+
+    """
+    newlines = [
+        np.flatnonzero(data[i:i + SCAN_CHUNK] == _NEWLINE) + i
+        for i in range(offset, data.size, SCAN_CHUNK)
+    ]
+    newlines = np.concatenate(newlines or [np.empty(0, dtype=np.int64)])
+    starts = np.concatenate(([offset], newlines + 1))
+    ends = np.concatenate((newlines, [data.size]))
+    if starts[-1] == data.size:
+        starts, ends = starts[:-1], ends[:-1]
+    carriage = (ends > starts) & (data[np.maximum(ends - 1, 0)] == _RETURN)
+    return starts, ends - carriage
+
+
+def line_matrix(data, starts, ends):
+    """Returns the lines as (n, LINE_WIDTH) uint8 array padded with
+    blanks; the longer lines are truncated.
+
+    """
+    lengths = np.minimum(ends - starts, LINE_WIDTH)
+    matrix = np.empty((len(starts), LINE_WIDTH), dtype=np.uint8)
+
+    # every line is copied as a whole, the tail of the file separately
+    inside = starts + LINE_WIDTH <= data.size
+    if data.size >= LINE_WIDTH:
+        windows = as_strided(data, shape=(data.size - LINE_WIDTH + 1,
+                                          LINE_WIDTH), strides=(1, 1))
+        matrix[inside] = windows[starts[inside]]
+    for i in np.flatnonzero(~inside).tolist():
+        matrix[i, :lengths[i]] = data[starts[i]:starts[i] + lengths[i]]
+
+    matrix[np.arange(LINE_WIDTH) >= lengths[:, None]] = _SPACE
+    return matrix
+
+
+def fields_to_float(chars, blank=None):
+    """Converts the fixed width fields into float; Fortran 'D' exponent is
+    allowed.
+
+    Parameters
+    ----------
+    chars : numpy.ndarray
+        uint8, (..., width) the characters of the fields
+    blank : float, optional
+        the value of the blank fields; blank fields are errors by default
+
+    Raises
+    ------
+    ValueError
+        when a field can't be converted.
+    """
+    chars = np.array(chars, dtype=np.uint8, order='C')
+    chars[(chars == ord('D')) | (chars == ord('d'))] = ord('E')
+    fields = chars.view('S{}'.format(chars.shape[-1]))[..., 0]
+    if blank is None:
+        return fields.astype(np.float64)
+
+    is_blank = (chars == _SPACE).all(axis=-1)
+    fields[is_blank] = b'nan'
+    values = fields.astype(np.float64)
+    values[is_blank] = blank
+    return values
+
+
+def orbit_columns(values_per_orbit):
+    """Returns the indices of the values of the message among the fields
+    of the orbit records (4 per record).
+
+    """
+    return [num * 4 + i for num, count in enumerate(values_per_orbit)
+            for i in range(count)]
+
+
+def fields_to_datetime(components):
+    """Converts the epoch components into datetime.datetime objects, see
+    validate_epoch.
+
+    Parameters
+    ----------
+    components : numpy.ndarray
+        (n, 6) year, month, day, hour, minute, and seconds
+
+    Raises
+    ------
+    ValueError
+        on invalid epoch.
+    """
+    year, month, day, hour, minute, sec = components.T
+    integer = components[:, :5]
+    if (integer != np.floor(integer)).any():
+        raise ValueError('Non-integer epoch component.')
+
+    # YY -> YYYY
+    year = np.where(year < 100, np.where(year >= 89, year + 1900,
+                                         year + 2000), year)
+
+    if ((month < 1) | (month > 12) | (day < 1) | (day > 31) |
+            (hour < 0) | (hour > 23) | (minute < 0) | (minute > 120) |
+            (sec < 0) | (sec >= 121)).any():
+        raise ValueError('Invalid epoch component.')
+
+    months = ((year - 1970) * 12 + month - 1).astype('M8[M]')
+    dates = months.astype('M8[D]') + (day - 1).astype('m8[D]')
+    if (dates.astype('M8[M]') != months).any():
+        raise ValueError('Invalid day of the month.')
+
+    # seconds and microseconds, see sec2sec_ms
+    whole = np.trunc(sec)
+    microsec = np.trunc(np.round((sec - whole) * 1e+6, 1))
+    microsec += ((hour * 60 + minute) * 60 + whole) * 1e+6
+    epochs = dates.astype('M8[us]') + microsec.astype('m8[us]')
+    return epochs.tolist()
+
+
 def validate_epoch(epoch):
     """Check epoch and convert into datetime.datetime
 
@@ -157,6 +412,35 @@ class RinexNavFile(ABC):
                 msg = 'Unexpected end of the file.'
                 raise RinexNavFileError(msg)
 
+    @staticmethod
+    def retrieve_leap_seconds(filename):
+        """Returns the number of leap seconds from the header of the file.
+
+        Returns
+        -------
+        leap_seconds : int or None
+            None if there is no 'LEAP SECONDS' record in the header.
+
+        Raises
+        ------
+        RinexNavFileError
+            when it can't parse the record.
+        """
+        leap_seconds = None
+        with IOWrapper(filename) as rinex:
+            for line in rinex:
+                label = line[60:].rstrip()
+                if label == 'LEAP SECONDS':
+                    try:
+                        leap_seconds = int(line[:6])
+                    except ValueError:
+                        msg = "Can't read leap seconds: {}.".format(line)
+                        raise RinexNavFileError(msg)
+                    break
+                if label == 'END OF HEADER':
+                    break
+        return leap_seconds
+
     @staticmethod
     def read_orbits(file_object, num_of_orbits):
         """Return list of orbits read from the file.
@@ -187,6 +471,318 @@ class RinexNavFile(ABC):
             orbits[i] = line.rstrip()
         return orbits
 
+    def iter_bytes(self, errors='strict'):
+        """Yields the same records as the iteration over the object.
+
+        The file is read as one buffer (memory-mapped); the records are
+        located by the line offsets and their fixed width fields are
+        converted by chunks of BUFFER_CHUNK records, without the
+        intermediate strings.
+
+        Parameters
+        ----------
+        errors : str, optional
+            'strict' -- raise RinexNavFileError on the malformed record;
+            'skip' -- skip the malformed record, resynchronise on the next
+            valid epoch record, and keep going. The skipped records are
+            listed in the errors attribute as NavParseError.
+
+        Raises
+        ------
+        RinexNavFileError
+            when it can't parse a record or on unexpected end of the file
+            in the strict mode.
+        """
+        if errors not in ERROR_MODES:
+            raise ValueError('Unknown errors mode: {}.'.format(errors))
+        self.errors = []
+
+        with open_buffer(self.filename) as buffer:
+            data = np.frombuffer(buffer, dtype=np.uint8)
+            try:
+                offset = find_header_end(buffer)
+                starts, ends = line_bounds(data, offset)
+                if errors == 'strict':
+                    records = self.locate_records(data, starts)
+                    convert = self.convert_records
+                else:
+                    header_lines = np.count_nonzero(data[:offset] == _NEWLINE)
+                    self._error_context = starts, header_lines
+                    records = self.resync_records(data, starts, ends)
+                    convert = self.convert_tolerant
+
+                for i in range(0, len(records), BUFFER_CHUNK):
+                    yield from convert(data, starts, ends,
+                                       records[i:i + BUFFER_CHUNK])
+            finally:
+                # the memory map can't be closed while it is exported
+                self._error_context = None
+                del data
+
+    @abstractmethod
+    def record_system(self, head):
+        """Returns the satellite system of the record by the first character
+        of its epoch record.
+
+        """
+
+    def locate_records(self, data, starts):
+        """Returns the satellite system and the index of the first line of
+        every record.
+
+        """
+        heads = data[np.minimum(starts, data.size - 1)].tobytes()
+        heads = heads.decode('latin-1')
+
+        records = []
+        i = 0
+        num_of_lines = len(starts)
+        while i < num_of_lines:
+            system = self.record_system(heads[i])
+            if system not in self.values_per_orbit:
+                msg = "Can't read epoch: {}.".format(
+                    self.line(data, starts[i]))
+                raise RinexNavFileError(msg)
+            records.append((system, i))
+            i += 1 + len(self.values_per_orbit[system])
+        if i > num_of_lines:
+            raise RinexNavFileError('Unexpected end of the file.')
+        return records
+
+    def epoch_like(self, data, starts, ends, any_system=False):
+        """Returns True for the lines which look like the epoch records,
+        see epoch_pattern; with any_system the system may be any capital
+        letter.
+
+        """
+        pattern = self.epoch_pattern
+        is_epoch = np.empty(len(starts), dtype=bool)
+        columns = np.arange(len(pattern))
+        systems = np.frombuffer(
+            ''.join(self.values_per_orbit).encode(), dtype=np.uint8)
+
+        step = SCAN_CHUNK // LINE_WIDTH
+        for i in range(0, len(starts), step):
+            index = starts[i:i + step, None] + columns
+            inside = index < ends[i:i + step, None]
+            chars = np.where(inside, data[np.where(inside, index, 0)],
+                             _SPACE)
+            digit = (chars >= ord('0')) & (chars <= ord('9'))
+            space = chars == _SPACE
+
+            valid = np.ones(chars.shape[0], dtype=bool)
+            for column, kind in enumerate(pattern):
+                if kind == 'd':
+                    valid &= digit[:, column]
+                elif kind == 'D':
+                    valid &= digit[:, column] | space[:, column]
+                elif kind == ' ':
+                    valid &= space[:, column]
+                elif kind == 'S' and any_system:
+                    valid &= ((chars[:, column] >= ord('A')) &
+                              (chars[:, column] <= ord('Z')))
+                elif kind == 'S':
+                    valid &= np.isin(chars[:, column], systems)
+            is_epoch[i:i + step] = valid
+        return is_epoch
+
+    def resync_records(self, data, starts, ends):
+        """Returns the records as locate_records; the malformed records are
+        skipped up to the next line which looks like the epoch record, see
+        epoch_like.
+
+        """
+        heads = data[np.minimum(starts, data.size - 1)].tobytes()
+        heads = heads.decode('latin-1')
+        is_epoch = self.epoch_like(data, starts, ends)
+        epoch_lines = np.flatnonzero(is_epoch)
+        is_epoch = is_epoch.tolist()
+        # the records end before the epoch records of any system
+        is_boundary = self.epoch_like(data, starts, ends, any_system=True)
+
+        def next_epoch(line):
+            following = np.searchsorted(epoch_lines, line)
+            if following < len(epoch_lines):
+                return int(epoch_lines[following])
+            return len(starts)
+
+        records = []
+        i = 0
+        num_of_lines = len(starts)
+        while i < num_of_lines:
+            system = self.record_system(heads[i])
+            if not is_epoch[i] or system not in self.values_per_orbit:
+                msg = "Can't read epoch: {}.".format(
+                    self.line(data, starts[i]))
+                self.add_error(i, msg)
+                i = next_epoch(i + 1)
+                continue
+
+            end = i + 1 + len(self.values_per_orbit[system])
+            if end > num_of_lines:
+                self.add_error(i, 'Unexpected end of the file.')
+                break
+
+            following = next_epoch(i + 1)
+            if following < end:
+                msg = 'Incomplete record: {}.'.format(
+                    self.line(data, starts[i]))
+                self.add_error(i, msg)
+                i = following
+                continue
+
+            # an extra line (e.g. a duplicated orbit record) means that
+            # the orbits of the record may be shifted
+            if end < num_of_lines and not is_boundary[end]:
+                msg = 'Unexpected line after the record: {}.'.format(
+                    self.line(data, starts[i]))
+                self.add_error(i, msg)
+                i = following
+                continue
+
+            records.append((system, i))
+            i = end
+        return records
+
+    def convert_tolerant(self, data, starts, ends, records):
+        """Returns the parsed records as convert_records; the records which
+        can't be parsed are skipped.
+
+        """
+        try:
+            return self.convert_records(data, starts, ends, records)
+        except RinexNavFileError as error:
+            if len(records) == 1:
+                self.add_error(records[0][1], str(error))
+                return []
+
+        # the malformed records are found by bisection
+        half = len(records) // 2
+        return (self.convert_tolerant(data, starts, ends, records[:half]) +
+                self.convert_tolerant(data, starts, ends, records[half:]))
+
+    def add_error(self, line, message):
+        """Adds NavParseError of the line to the errors."""
+        starts, header_lines = self._error_context
+        error = NavParseError(int(header_lines) + line + 1,
+                              int(starts[line]), message)
+        LOGGER.warning('%s, line %d: %s', self.filename, error.line_number,
+                       message)
+        self.errors.append(error)
+
+    @staticmethod
+    def line(data, start):
+        """Returns the line starting at the offset, e.g. for the error
+        messages.
+
+        """
+        end = start
+        while end < data.size and data[end] != _NEWLINE:
+            end += 1
+        return data[start:end].tobytes().decode('latin-1').rstrip()
+
+    def convert_records(self, data, starts, ends, records):
+        """Returns the parsed records, see iter_bytes.
+
+        """
+        rows = [None] * len(records)
+
+        first = records[0][1]
+        last = records[-1][1] + 1 + len(self.values_per_orbit[records[-1][0]])
+        matrix = line_matrix(data, starts[first:last], ends[first:last])
+
+        groups = dict()
+        for i, (system, line) in enumerate(records):
+            groups.setdefault(system, []).append((i, line - first))
+
+        for system, group in groups.items():
+            index, lines = (np.array(g, dtype=np.int64) for g in zip(*group))
+            epoch_lines = matrix[lines]
+
+            try:
+                start, width = self.number_field
+                number = fields_to_float(epoch_lines[:, start:start + width])
+                components = np.stack([
+                    fields_to_float(epoch_lines[:, start:start + width])
+                    for start, width in self.epoch_fields
+                ], axis=1)
+                epochs = fields_to_datetime(components)
+
+                start = self.clock_start
+                end = start + 3 * self.item_len
+                sv_clock = fields_to_float(epoch_lines[:, start:end].reshape(
+                    -1, 3, self.item_len))
+            except ValueError:
+                msg = "Can't read epoch: {}.".format(
+                    self.first_invalid_epoch(data, starts[lines + first]))
+                raise RinexNavFileError(msg)
+
+            if (number != np.floor(number)).any():
+                msg = "Can't read epoch: {}.".format(
+                    self.first_invalid_epoch(data, starts[lines + first]))
+                raise RinexNavFileError(msg)
+
+            # orbit records: 4 values per line
+            values_per_orbit = self.values_per_orbit[system]
+            num_of_orbits = len(values_per_orbit)
+            orbit_lines = lines[:, None] + np.arange(1, num_of_orbits + 1)
+            start = self.orbit_start
+            end = start + 4 * self.item_len
+            # the spare fields aren't parsed, see parse_orbits
+            fields = matrix[orbit_lines, start:end].reshape(
+                -1, num_of_orbits * 4, self.item_len)
+            try:
+                message = fields_to_float(
+                    fields[:, orbit_columns(values_per_orbit)],
+                    blank=0.,
+                )
+            except ValueError:
+                msg = "Can't parse the orbit: {}".format(
+                    self.first_invalid_orbit(
+                        data,
+                        starts[orbit_lines.ravel() + first],
+                        values_per_orbit,
+                    ))
+                raise RinexNavFileError(msg)
+
+            number = number.astype(np.int64).tolist()
+            sv_clock = sv_clock.tolist()
+            message = message.tolist()
+            for k, i in enumerate(index.tolist()):
+                rows[i] = (system, number[k], epochs[k], tuple(sv_clock[k]),
+                           tuple(message[k]))
+
+        return rows
+
+    def first_invalid_epoch(self, data, epoch_starts):
+        """Returns the first epoch record which can't be parsed."""
+        for start in epoch_starts.tolist():
+            line = self.line(data, start)
+            try:
+                self.parse_epoch(iter([line]))
+            except (RinexNavFileError, ValueError, IndexError):
+                return line
+        return self.line(data, epoch_starts[0])
+
+    def first_invalid_orbit(self, data, line_starts, values_per_orbit):
+        """Returns the first orbit record which can't be parsed; the orbit
+        records of the messages follow each other, only the values of the
+        message (values_per_orbit) are checked.
+
+        """
+        num_of_orbits = len(values_per_orbit)
+        for k, start in enumerate(line_starts.tolist()):
+            line = self.line(data, start)
+            count = values_per_orbit[k % num_of_orbits]
+            end = self.orbit_start + count * self.item_len
+            for i in range(self.orbit_start, end, self.item_len):
+                value = line[i:i + self.item_len].strip()
+                try:
+                    value and float(value.lower().replace('d', 'e'))
+                except ValueError:
+                    return line
+        return ''
+
     def parse_orbits(self, orbits, values_per_orbit):
         """Return navigation message. Message parsed from the orbits list
         according to values_per_orbit.
@@ -238,6 +834,15 @@ class RinexNavFileV2(RinexNavFile):
     orbit_start = 3
     orbit_end = 75
 
+    # the fields of the epoch record: start, width
+    number_field = (0, 2)
+    epoch_fields = ((2, 3), (5, 3), (8, 3), (11, 3), (14, 3), (17, 5))
+    clock_start = 22
+
+    # the beginning of the epoch record: d -- digit, D -- digit or blank,
+    # S -- satellite system
+    epoch_pattern = 'Dd Dd Dd Dd Dd Dd'
+
     system = dict(
         N='G',
         G='R',
@@ -274,6 +879,9 @@ class RinexNavFileV2(RinexNavFile):
                 file_type = header_line[20]
         return version, file_type
 
+    def record_system(self, head):
+        return self.system.get(self.file_type)
+
     @staticmethod
     def parse_epoch(file_object):
         """Return satellite number, epoch and sv_clock
@@ -338,6 +946,14 @@ class RinexNavFileV3(RinexNavFile):
     orbit_start = 4
     orbit_end = 76
 
+    # the fields of the epoch record: start, width
+    number_field = (1, 2)
+    epoch_fields = ((4, 5), (8, 3), (11, 3), (14, 3), (17, 3), (20, 3))
+    clock_start = 23
+
+    # see RinexNavFileV2.epoch_pattern
+    epoch_pattern = 'SDd dddd Dd Dd Dd Dd Dd'
+
     def __init__(self, filename):
         super().__init__(filename)
         self.filename = filename
@@ -360,6 +976,9 @@ class RinexNavFileV3(RinexNavFile):
             system = header_line[40]
         return version, file_type, system
 
+    def record_system(self, head):
+        return head
+
     @staticmethod
     def parse_epoch(file_object):
         """Returns epoch components
@@ -0,0 +1,196 @@
+"""
+Caches of the results computed from the files.
+
+The functions decorated with file_cache are cached by the content of the
+file instead of the identity of the argument:
+
+- the path is identified by (path, size, modification time), so the
+  modified file is read again;
+- the file object (e.g. StringIO) is identified by its cache_token
+  attribute if it is set, otherwise by the hash of its content from the
+  current position; identical payloads share the cached result and
+  a mutated buffer is read again;
+- other objects (e.g. orbit objects) are identified by themselves.
+
+A usage example::
+
+    payload = io.StringIO(message)
+    payload.cache_token = ('brdc', 2017, 251, 3)  # optional
+    nav_data = read_nav_data(payload)
+
+The hash of the file object is kept while its position and size don't
+change, so the repeated calls don't read it again; a buffer modified in
+place without the change of its size is not detected -- set cache_token
+or use another object.
+
+The cached functions can be called from several threads. With
+single_flight=True the concurrent calls with the same key wait for the
+first one instead of computing the same result again.
+"""
+import hashlib
+import os
+import threading
+import weakref
+from functools import lru_cache, wraps
+
+from coordinates.broadcast import stream_lock
+
+TOKEN_ATTRIBUTE = 'cache_token'
+
+# file object -> (position, size, hash), see content_hash
+_hashes = weakref.WeakKeyDictionary()
+_hashes_lock = threading.Lock()
+
+
+def cache_key(filename):
+    """Returns the key which identifies the content of the file.
+
+    Parameters
+    ----------
+    filename : str, file or object
+
+    Returns
+    -------
+    key : tuple or object
+    """
+    if isinstance(filename, str):
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return 'path', filename
+        return 'path', filename, stat.st_size, stat.st_mtime_ns
+
+    if hasattr(filename, 'read') and hasattr(filename, 'seek'):
+        token = getattr(filename, TOKEN_ATTRIBUTE, None)
+        if token is not None:
+            return 'token', token
+        return 'content', content_hash(filename)
+
+    return filename
+
+
+def content_hash(file_object):
+    """Returns the hash of the content of the file object from the current
+    position; the position is restored. The hash is computed again only
+    when the position or the size of the object is changed.
+
+    """
+    memo = None
+    with stream_lock(file_object):
+        position = file_object.tell()
+        size = file_object.seek(0, os.SEEK_END)
+        file_object.seek(position)
+
+        with _hashes_lock:
+            try:
+                memo = _hashes.get(file_object)
+            except TypeError:
+                # the object doesn't support weak references
+                pass
+        if memo is not None and memo[:2] == (position, size):
+            return position, memo[2]
+
+        content = file_object.read()
+        file_object.seek(position)
+
+    if isinstance(content, str):
+        content = content.encode('utf-8', 'surrogatepass')
+    digest = hashlib.blake2b(content, digest_size=16).digest()
+
+    with _hashes_lock:
+        try:
+            _hashes[file_object] = position, size, digest
+        except TypeError:
+            pass
+    return position, digest
+
+
+class FileKey:
+    """The argument of the cached function compared by cache_key; the
+    argument itself is passed to the function on the cache miss.
+
+    """
+    __slots__ = ('key', 'filename')
+
+    def __init__(self, filename):
+        self.key = cache_key(filename)
+        self.filename = filename
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __eq__(self, other):
+        return isinstance(other, FileKey) and self.key == other.key
+
+
+def file_cache(maxsize=128, single_flight=False, pass_key=False):
+    """Decorator which caches the function of the file (the first argument)
+    by cache_key, see functools.lru_cache. The decorated function provides
+    cache_info, cache_clear, __wrapped__, and keyed(file_key, *args) which
+    takes the FileKey of the file computed beforehand. The omitted
+    positional arguments are replaced by their defaults in the key.
+
+    With single_flight=True the calls with the same arguments are
+    serialized until the result is cached: the first call computes it, the
+    others wait and take it from the cache. Calls with other arguments
+    don't wait.
+
+    With pass_key=True the function takes the FileKey instead of the file
+    (e.g. to pass it to keyed of other cached functions); __wrapped__
+    still takes the file.
+
+    """
+    def decorator(function):
+        @lru_cache(maxsize=maxsize)
+        def cached(file_key, *args, **kwargs):
+            if pass_key:
+                return function(file_key, *args, **kwargs)
+            return function(file_key.filename, *args, **kwargs)
+
+        # key -> [lock, number of the waiting calls]
+        flights = {}
+        flights_lock = threading.Lock()
+
+        def call_once(file_key, *args, **kwargs):
+            key = (file_key, args, tuple(sorted(kwargs.items())))
+            with flights_lock:
+                flight = flights.setdefault(key, [threading.Lock(), 0])
+                flight[1] += 1
+            try:
+                with flight[0]:
+                    return cached(file_key, *args, **kwargs)
+            finally:
+                with flights_lock:
+                    flight[1] -= 1
+                    if not flight[1]:
+                        del flights[key]
+
+        call = call_once if single_flight else cached
+
+        # f(x) and f(x, <defaults>) share the cached result
+        defaults = function.__defaults__ or ()
+        num_of_args = function.__code__.co_argcount - 1
+
+        def keyed(file_key, *args, **kwargs):
+            missing = num_of_args - len(args)
+            if not kwargs and 0 < missing <= len(defaults):
+                args += defaults[len(defaults) - missing:]
+            return call(file_key, *args, **kwargs)
+
+        @wraps(function)
+        def wrapper(filename, *args, **kwargs):
+            return keyed(FileKey(filename), *args, **kwargs)
+
+        if pass_key:
+            @wraps(function)
+            def unwrapped(filename, *args, **kwargs):
+                return function(FileKey(filename), *args, **kwargs)
+
+            wrapper.__wrapped__ = unwrapped
+
+        wrapper.keyed = keyed
+        wrapper.cache_info = cached.cache_info
+        wrapper.cache_clear = cached.cache_clear
+        return wrapper
+
+    return decorator
@@ -0,0 +1,386 @@
+"""
+Catalogue of the stations built from the headers of the observation files.
+
+Only the header block of a file is read, in large chunks; plain, Hatanaka
+compressed, and gzipped files are supported. The directory trees are
+scanned in parallel. The catalogue is kept in a JSON file keyed by the
+path of the file, the modification time and the size; a rescan reads
+only the new and the changed files.
+
+A usage example::
+
+    catalogue = Catalogue('stations.json')
+    catalogue.update('/data/rinex', workers=16)
+    catalogue.save()
+
+    for path, header in catalogue.items():
+        print(header.marker_name, header.xyz)
+"""
+import datetime
+import gzip
+import json
+import os
+import re
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from coordinates.exceptions import RinexObsFileError
+
+# the size of the chunks, bytes
+HEADER_CHUNK_SIZE = 1 << 14
+
+# the header must end before this offset, bytes
+MAX_HEADER_SIZE = 1 << 20
+
+END_OF_HEADER = b'END OF HEADER'
+
+# names of the observation files: RINEX 2 (plain and Hatanaka) and RINEX 3
+OBS_FILE_PATTERN = re.compile(
+    r'(\.\d\d[od]|_[MGRECJIS]O\.(rnx|crx))(\.gz)?$',
+    re.IGNORECASE,
+)
+
+CATALOGUE_VERSION = 1
+
+StationHeader = namedtuple('StationHeader', [
+    'version', 'marker_name', 'marker_number', 'xyz', 'receiver', 'antenna',
+    'interval', 'first_epoch',
+])
+StationHeader.__doc__ = """\
+The header of the observation file.
+
+version : float
+    RINEX version
+marker_name, marker_number : str
+xyz : tuple or None
+    approximate position of the marker X, Y, Z, meters
+receiver : tuple or None
+    (number, type, version) of the receiver
+antenna : tuple or None
+    (number, type) of the antenna
+interval : float or None
+    seconds
+first_epoch : datetime.datetime or None
+    time of the first observation
+"""
+
+ScanResult = namedtuple('ScanResult', ['read', 'unchanged', 'removed',
+                                       'failed'])
+ScanResult.__doc__ = """\
+The number of the files of the catalogue update by the outcome: read
+(new or changed), unchanged, removed, and failed to read.
+"""
+
+
+def open_rinex(filename):
+    """Returns binary file object of the plain or the gzipped file."""
+    if filename.lower().endswith('.gz'):
+        return gzip.open(filename, 'rb')
+    return open(filename, 'rb')
+
+
+def header_lines(filename, chunk_size=HEADER_CHUNK_SIZE):
+    """Returns the lines of the header of RINEX file including the 'END
+    OF HEADER' line. The file is read by chunks up to the end of the
+    header.
+
+    Parameters
+    ----------
+    filename : str
+    chunk_size : int, optional
+        bytes
+
+    Returns
+    -------
+    lines : list
+        str
+
+    Raises
+    ------
+    RinexObsFileError
+        when the end of the header is not found.
+    """
+    data = bytearray()
+    position = 0
+    end = -1
+    with open_rinex(filename) as rinex:
+        while end < 0:
+            chunk = rinex.read(chunk_size)
+            if not chunk or len(data) > MAX_HEADER_SIZE:
+                msg = "Can't find the end of the header: {}.".format(
+                    filename)
+                raise RinexObsFileError(msg)
+            data += chunk
+
+            # the label starts at the 61st column of the line
+            while True:
+                found = data.find(END_OF_HEADER, position)
+                if found < 0:
+                    position = max(len(data) - len(END_OF_HEADER), 0)
+                    break
+                position = found + 1
+                line_start = data.rfind(b'\n', 0, found) + 1
+                if found - line_start == 60:
+                    end = found + len(END_OF_HEADER)
+                    break
+
+    return data[:end].decode('latin-1').splitlines()
+
+
+def parse_float(value):
+    value = value.strip()
+    return float(value) if value else None
+
+
+def parse_header(lines):
+    """Returns StationHeader parsed from the lines of the header, see
+    header_lines.
+
+    Raises
+    ------
+    RinexObsFileError
+        when it can't parse a record.
+    """
+    fields = dict(
+        version=None,
+        marker_name='',
+        marker_number='',
+        xyz=None,
+        receiver=None,
+        antenna=None,
+        interval=None,
+        first_epoch=None,
+    )
+    for line in lines:
+        label = line[60:].strip().upper()
+        try:
+            if label == 'RINEX VERSION / TYPE':
+                fields['version'] = float(line[:9])
+            elif label == 'MARKER NAME':
+                fields['marker_name'] = line[:60].strip()
+            elif label == 'MARKER NUMBER':
+                fields['marker_number'] = line[:20].strip()
+            elif label == 'APPROX POSITION XYZ':
+                fields['xyz'] = tuple(
+                    float(line[i:i + 14]) for i in range(0, 42, 14))
+            elif label == 'REC # / TYPE / VERS':
+                fields['receiver'] = tuple(
+                    line[i:i + 20].strip() for i in range(0, 60, 20))
+            elif label == 'ANT # / TYPE':
+                fields['antenna'] = tuple(
+                    line[i:i + 20].strip() for i in range(0, 40, 20))
+            elif label == 'INTERVAL':
+                fields['interval'] = parse_float(line[:10])
+            elif label == 'TIME OF FIRST OBS':
+                sec = float(line[30:43])
+                fields['first_epoch'] = datetime.datetime(
+                    *(int(line[i:i + 6]) for i in range(0, 30, 6))
+                ) + datetime.timedelta(seconds=sec)
+        except ValueError:
+            msg = "Can't parse the header record: {}".format(line)
+            raise RinexObsFileError(msg)
+
+    if fields['version'] is None:
+        raise RinexObsFileError("Can't find 'RINEX VERSION / TYPE' record.")
+
+    return StationHeader(**fields)
+
+
+def read_header(filename, chunk_size=HEADER_CHUNK_SIZE):
+    """Returns StationHeader of the observation file.
+
+    Raises
+    ------
+    RinexObsFileError
+        when it can't read the header.
+    """
+    return parse_header(header_lines(filename, chunk_size))
+
+
+def find_files(roots, pattern=OBS_FILE_PATTERN):
+    """Yields absolute paths of the observation files in the directory
+    trees; the roots can also be the files.
+
+    """
+    for root in roots:
+        root = os.path.abspath(root)
+        if os.path.isfile(root):
+            yield root
+            continue
+        for directory, _, names in os.walk(root):
+            for name in sorted(names):
+                if pattern.search(name):
+                    yield os.path.join(directory, name)
+
+
+def header_to_json(header):
+    value = header._asdict()
+    if header.first_epoch is not None:
+        value['first_epoch'] = header.first_epoch.isoformat()
+    return value
+
+
+def header_from_json(value):
+    value = dict(value)
+    for name in ('xyz', 'receiver', 'antenna'):
+        if value[name] is not None:
+            value[name] = tuple(value[name])
+    epoch = value['first_epoch']
+    if epoch is not None:
+        epoch_format = '%Y-%m-%dT%H:%M:%S'
+        if '.' in epoch:
+            epoch_format += '.%f'
+        value['first_epoch'] = datetime.datetime.strptime(epoch,
+                                                          epoch_format)
+    return StationHeader(**value)
+
+
+class Catalogue:
+    """The catalogue of the headers of the observation files keyed by the
+    path.
+
+    Parameters
+    ----------
+    filename : str, optional
+        JSON file of the catalogue; it is loaded if exists.
+
+    Attributes
+    ----------
+    errors : dict
+        path -> the error message for the files which can't be read; they
+        are not read again until changed
+    """
+
+    def __init__(self, filename=None):
+        self.filename = filename
+        # path -> (mtime_ns, size, StationHeader or None)
+        self._entries = dict()
+        self.errors = dict()
+
+        if filename is not None and os.path.exists(filename):
+            self.load(filename)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, path):
+        return os.path.abspath(path) in self._entries
+
+    def __getitem__(self, path):
+        header = self._entries[os.path.abspath(path)][2]
+        if header is None:
+            raise KeyError(path)
+        return header
+
+    def items(self):
+        """Yields (path, StationHeader) sorted by the path; the files which
+        can't be read are skipped.
+
+        """
+        for path in sorted(self._entries):
+            header = self._entries[path][2]
+            if header is not None:
+                yield path, header
+
+    def update(self, *roots, workers=None, pattern=OBS_FILE_PATTERN):
+        """Scans the directory trees and reads the headers of the new and
+        the changed files in parallel; the entries of the files which no
+        longer exist under the roots are removed.
+
+        Parameters
+        ----------
+        roots : str
+            directories or files
+        workers : int, optional
+            number of threads, see concurrent.futures.ThreadPoolExecutor
+        pattern : re.Pattern, optional
+            names of the observation files
+
+        Returns
+        -------
+        result : ScanResult
+        """
+        seen = set()
+        changed = []
+        for path in find_files(roots, pattern):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            seen.add(path)
+            entry = self._entries.get(path)
+            if entry is None or entry[:2] != (stat.st_mtime_ns,
+                                              stat.st_size):
+                changed.append((path, stat.st_mtime_ns, stat.st_size))
+
+        def read(item):
+            try:
+                return read_header(item[0]), None
+            except (RinexObsFileError, OSError, EOFError) as error:
+                return None, str(error)
+
+        with ThreadPoolExecutor(workers) as executor:
+            headers = list(executor.map(read, changed))
+
+        failed = 0
+        for (path, mtime, size), (header, error) in zip(changed, headers):
+            self._entries[path] = (mtime, size, header)
+            if error is None:
+                self.errors.pop(path, None)
+            else:
+                self.errors[path] = error
+                failed += 1
+
+        removed = 0
+        roots = {os.path.abspath(r) for r in roots}
+        prefixes = tuple(os.path.join(r, '') for r in roots)
+        for path in list(self._entries):
+            if path in seen:
+                continue
+            if path in roots or path.startswith(prefixes):
+                del self._entries[path]
+                self.errors.pop(path, None)
+                removed += 1
+
+        return ScanResult(
+            read=len(changed) - failed,
+            unchanged=len(seen) - len(changed),
+            removed=removed,
+            failed=failed,
+        )
+
+    def load(self, filename=None):
+        """Loads the catalogue from JSON file.
+
+        """
+        filename = filename or self.filename
+        with open(filename) as catalogue_file:
+            content = json.load(catalogue_file)
+
+        self._entries = dict()
+        self.errors = dict(content.get('errors', {}))
+        for path, (mtime, size, header) in content['files'].items():
+            if header is not None:
+                header = header_from_json(header)
+            self._entries[path] = (mtime, size, header)
+
+    def save(self, filename=None):
+        """Saves the catalogue into JSON file; the file is replaced
+        atomically.
+
+        """
+        filename = filename or self.filename
+        content = dict(
+            version=CATALOGUE_VERSION,
+            files={
+                path: (mtime, size,
+                       None if header is None else header_to_json(header))
+                for path, (mtime, size, header) in self._entries.items()
+            },
+            errors=self.errors,
+        )
+
+        temporary = '{}.tmp'.format(filename)
+        with open(temporary, 'w') as catalogue_file:
+            json.dump(content, catalogue_file, indent=1, sort_keys=True)
+        os.replace(temporary, filename)
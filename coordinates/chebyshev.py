@@ -0,0 +1,271 @@
+"""
+Compression of the satellite orbits with piecewise Chebyshev polynomials.
+
+The trajectory of every satellite, computed by the broadcast propagators,
+is split into intervals of fixed length; the coordinates within an interval
+are interpolated at the Chebyshev points of the first kind. Evaluation
+requires only a few multiply-adds per point (the Clenshaw recurrence).
+
+A usage example::
+
+    orbits = ChebyshevOrbits.fit(filename, ['G', 'G'], [1, 2], start, end)
+    orbits.save('brdm2510.17p.npz')
+
+    orbits = ChebyshevOrbits.load('brdm2510.17p.npz')
+    xyz = orbits.satellite_xyz_many('G', 1, epochs)
+"""
+import numpy as np
+
+from coordinates.batch import (
+    broadcast_request,
+    satellite_index,
+    satellite_xyz_many,
+)
+from coordinates.exceptions import (
+    ChebyshevFitError,
+    NavMessageNotFoundError,
+)
+from coordinates.timescale import datetime2sec
+
+DEFAULT_INTERVAL = 900.
+DEFAULT_DEGREE = 10
+
+# check points per a node to verify the error of the approximation
+CHECKS_PER_NODE = 4
+
+
+def chebyshev_nodes(degree):
+    """Returns the Chebyshev points of the first kind in [-1, 1].
+
+    """
+    n = degree + 1
+    return np.cos(np.pi * (np.arange(n) + 0.5) / n)
+
+
+def interpolation_matrix(degree):
+    """Returns the matrix which converts values at the Chebyshev nodes into
+    the coefficients of the Chebyshev series.
+
+    """
+    n = degree + 1
+    k = np.arange(n)[:, np.newaxis]
+    j = np.arange(n)[np.newaxis, :]
+    matrix = 2. / n * np.cos(np.pi * k * (j + 0.5) / n)
+    matrix[0] /= 2
+    return matrix
+
+
+def clenshaw(coefficients, tau):
+    """Evaluates the Chebyshev series.
+
+    Parameters
+    ----------
+    coefficients : numpy.ndarray
+        (n, 3, degree + 1) coefficients, one series per point and axis
+
+    tau : numpy.ndarray
+        (n, ) points in [-1, 1]
+
+    Returns
+    -------
+    values : numpy.ndarray
+        (n, 3)
+    """
+    tau2 = 2 * tau[:, np.newaxis]
+    b_1 = np.zeros(coefficients.shape[:2])
+    b_2 = np.zeros(coefficients.shape[:2])
+    for k in range(coefficients.shape[2] - 1, 0, -1):
+        b_1, b_2 = coefficients[:, :, k] + tau2 * b_1 - b_2, b_1
+    return coefficients[:, :, 0] + tau2 / 2 * b_1 - b_2
+
+
+class ChebyshevOrbits:
+    """Piecewise Chebyshev approximation of the satellite orbits.
+
+    Parameters
+    ----------
+    satellites : array_like
+        (k, ) satellite systems
+
+    numbers : array_like
+        (k, ) satellite numbers
+
+    start : float
+        the start of the first interval, seconds since
+        coordinates.timescale.GPS_EPOCH in the system time
+
+    interval : float
+        length of the intervals, seconds
+
+    coefficients : numpy.ndarray
+        (k, intervals, 3, degree + 1) coefficients of the series
+
+    max_error : array_like
+        (k, ) the maximal error of the approximation at the check points,
+        meters
+    """
+
+    def __init__(self, satellites, numbers, start, interval, coefficients,
+                 max_error):
+        self.satellites = np.asarray(satellites, dtype=str)
+        self.numbers = np.asarray(numbers, dtype=int)
+        self.start = float(start)
+        self.interval = float(interval)
+        self.coefficients = np.asarray(coefficients, dtype=float)
+        self.max_error = np.asarray(max_error, dtype=float)
+
+        self.index = {
+            (str(s), int(n)): i
+            for i, (s, n) in enumerate(zip(self.satellites, self.numbers))
+        }
+
+    @property
+    def degree(self):
+        return self.coefficients.shape[-1] - 1
+
+    @property
+    def end(self):
+        return self.start + self.interval * self.coefficients.shape[1]
+
+    @classmethod
+    def fit(cls, filename, satellites, numbers, start, end,
+            interval=DEFAULT_INTERVAL, degree=DEFAULT_DEGREE,
+            tolerance=None):
+        """Fits the orbits of the satellites computed from the navigation
+        file.
+
+        Parameters
+        ----------
+        filename : str or file
+            navigation file
+
+        satellites, numbers : array_like
+            satellite systems and numbers
+
+        start, end : float or datetime.datetime
+            the range to fit; it is extended to the whole number of
+            intervals
+
+        interval : float, optional
+            length of the intervals, seconds
+
+        degree : int, optional
+            degree of the polynomials
+
+        tolerance : float, optional
+            the maximal allowed error, meters
+
+        Returns
+        -------
+        orbits : ChebyshevOrbits
+
+        Raises
+        ------
+        ChebyshevFitError
+            when the error exceeds the tolerance.
+        """
+        satellites, numbers = np.broadcast_arrays(
+            np.atleast_1d(np.asarray(satellites, dtype=str)),
+            np.atleast_1d(np.asarray(numbers, dtype=int)),
+        )
+        start, end = datetime2sec([start, end])
+
+        num_of_intervals = max(int(np.ceil((end - start) / interval)), 1)
+        interval_start = start + interval * np.arange(num_of_intervals)
+
+        nodes = (chebyshev_nodes(degree) + 1) / 2 * interval
+        nodes = (interval_start[:, np.newaxis] + nodes).ravel()
+
+        num_of_checks = CHECKS_PER_NODE * (degree + 1)
+        checks = (np.arange(num_of_checks) + 0.5) / num_of_checks
+        tau = 2 * checks - 1
+        checks = (interval_start[:, np.newaxis] + checks * interval).ravel()
+
+        matrix = interpolation_matrix(degree)
+
+        coefficients = np.empty(
+            (len(satellites), num_of_intervals, 3, degree + 1)
+        )
+        max_error = np.empty(len(satellites))
+
+        for i, (sat, num) in enumerate(zip(satellites, numbers)):
+            xyz = satellite_xyz_many(filename, sat, num, nodes)
+            xyz = xyz.reshape(num_of_intervals, degree + 1, 3)
+            coefficients[i] = np.einsum('kj,ijx->ixk', matrix, xyz)
+
+            std = satellite_xyz_many(filename, sat, num, checks)
+            test = clenshaw(
+                np.repeat(coefficients[i], num_of_checks, axis=0),
+                np.tile(tau, num_of_intervals),
+            )
+            max_error[i] = np.max(np.linalg.norm(test - std, axis=1))
+
+            if tolerance is not None and max_error[i] > tolerance:
+                msg = (
+                    'The error of the approximation {sat}{num:02d} '
+                    '{error:.3g} m exceeds the tolerance {tol:.3g} m.'
+                ).format(sat=sat, num=num, error=max_error[i], tol=tolerance)
+                raise ChebyshevFitError(msg)
+
+        return cls(satellites, numbers, start, interval, coefficients,
+                   max_error)
+
+    def save(self, filename):
+        """Saves the coefficients into the .npz file.
+
+        """
+        np.savez(
+            filename,
+            satellites=self.satellites,
+            numbers=self.numbers,
+            start=self.start,
+            interval=self.interval,
+            coefficients=self.coefficients,
+            max_error=self.max_error,
+        )
+
+    @classmethod
+    def load(cls, filename):
+        """Loads the coefficients from the .npz file.
+
+        """
+        with np.load(filename) as data:
+            return cls(
+                data['satellites'],
+                data['numbers'],
+                data['start'],
+                data['interval'],
+                data['coefficients'],
+                data['max_error'],
+            )
+
+    def satellite_xyz_many(self, satellite, number, epoch):
+        """Returns XYZ coordinates of the satellites for the epochs, see
+        coordinates.batch.satellite_xyz_many.
+
+        Raises
+        ------
+        NavMessageNotFoundError
+            when the satellite was not fitted or an epoch is out of the
+            fitted range.
+        """
+        satellite, number, sec = broadcast_request(satellite, number, epoch)
+
+        if np.any((sec < self.start) | (sec > self.end)):
+            raise NavMessageNotFoundError(
+                'The epoch is out of the fitted range.'
+            )
+
+        sat_index = satellite_index(self.index, satellite, number)
+
+        position = (sec - self.start) / self.interval
+        interval_index = np.minimum(
+            position.astype(int),
+            self.coefficients.shape[1] - 1,
+        )
+        tau = 2 * (position - interval_index) - 1
+
+        return clenshaw(
+            self.coefficients[sat_index, interval_index],
+            tau,
+        )
@@ -0,0 +1,190 @@
+"""
+Coverage and DOP maps over latitude-longitude grids.
+
+The satellite positions are computed once for all the epochs; the grid
+points are converted into geocentric coordinates once. Epochs are
+processed in parallel, the grid is processed by blocks of points.
+
+A usage example::
+
+    lon = np.arange(0, 360, 1.)
+    lat = np.arange(-90, 91, 1.)
+    result = coverage('brdm2510.17p', 'G', range(1, 33), epochs, lon, lat)
+    result.pdop  # (epochs, lat, lon)
+"""
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from coordinates.batch import satellite_xyz_grid
+from coordinates.geodesy import enu_matrix, lbh2xyz_array
+
+DEFAULT_MASK = 10.
+
+# grid points per block
+DEFAULT_BLOCK_SIZE = 4096
+
+Coverage = namedtuple('Coverage', ['visible', 'gdop', 'pdop', 'hdop', 'vdop'])
+Coverage.__doc__ = """\
+Coverage maps.
+
+visible : numpy.ndarray
+    (epochs, lat, lon) number of the satellites above the mask
+gdop, pdop, hdop, vdop : numpy.ndarray
+    (epochs, lat, lon) dilution of precision; NaN where less than four
+    satellites are visible
+"""
+
+
+def grid_points(lon, lat, height=0.):
+    """Returns geocentric coordinates and ENU frames of the grid points.
+
+    Parameters
+    ----------
+    lon, lat : array_like
+        (n, ) and (m, ) longitudes and latitudes of the grid, degrees
+
+    height : float, optional
+        meters
+
+    Returns
+    -------
+    xyz : numpy.ndarray
+        (m * n, 3) the points, latitude-major order
+    frames : numpy.ndarray
+        (m * n, 3, 3) see coordinates.geodesy.enu_matrix
+    """
+    grid_lat, grid_lon = np.meshgrid(lat, lon, indexing='ij')
+    grid_lat = grid_lat.ravel()
+    grid_lon = grid_lon.ravel()
+
+    xyz = np.column_stack(lbh2xyz_array(grid_lon, grid_lat, height))
+    frames = enu_matrix(np.radians(grid_lon), np.radians(grid_lat))
+    return xyz, frames
+
+
+def dilution_of_precision(points, frames, sat_xyz, mask):
+    """Returns the number of visible satellites and DOPs at the points.
+
+    Parameters
+    ----------
+    points : numpy.ndarray
+        (n, 3) geocentric coordinates of the points
+    frames : numpy.ndarray
+        (n, 3, 3) ENU frames of the points
+    sat_xyz : numpy.ndarray
+        (k, 3) satellite positions; NaN for absent satellites
+    mask : float
+        elevation mask, degrees
+
+    Returns
+    -------
+    visible, gdop, pdop, hdop, vdop : numpy.ndarray
+        (n, )
+    """
+    sat_xyz = sat_xyz[~np.isnan(sat_xyz).any(axis=1)]
+
+    los = sat_xyz[np.newaxis] - points[:, np.newaxis]
+    los /= np.sqrt(np.einsum('nki,nki->nk', los, los))[..., np.newaxis]
+    enu = np.matmul(los, np.swapaxes(frames, 1, 2))
+
+    weight = (enu[..., 2] >= np.sin(np.radians(mask))).astype(float)
+    visible = weight.sum(axis=1).astype(int)
+
+    # rows of the design matrix: (-e, -n, -u, 1)
+    design = np.concatenate([-enu, np.ones(enu.shape[:2] + (1,))], axis=2)
+    normal = np.matmul(
+        np.swapaxes(design * weight[..., np.newaxis], 1, 2),
+        design,
+    )
+
+    solvable = visible >= 4
+    normal[~solvable] = np.eye(4)
+    try:
+        cofactor = np.linalg.inv(normal)
+    except np.linalg.LinAlgError:
+        cofactor = np.linalg.pinv(normal)
+    diagonal = np.einsum('nii->ni', cofactor)
+    diagonal[~solvable] = np.nan
+
+    gdop = np.sqrt(diagonal.sum(axis=1))
+    pdop = np.sqrt(diagonal[:, :3].sum(axis=1))
+    hdop = np.sqrt(diagonal[:, :2].sum(axis=1))
+    vdop = np.sqrt(diagonal[:, 2])
+    return visible, gdop, pdop, hdop, vdop
+
+
+def coverage(source, satellites, numbers, epoch, lon, lat, height=0.,
+             mask=DEFAULT_MASK, block_size=DEFAULT_BLOCK_SIZE, workers=None,
+             **kwargs):
+    """Returns coverage and DOP maps.
+
+    Parameters
+    ----------
+    source : str, file or orbit object
+        see coordinates.batch.satellite_xyz_many
+
+    satellites, numbers : array_like
+        (k, ) satellite systems and numbers
+
+    epoch : array_like
+        (t, ) epochs, see coordinates.batch.satellite_xyz_grid
+
+    lon, lat : array_like
+        longitudes and latitudes of the grid, degrees
+
+    height : float, optional
+        height of the grid, meters
+
+    mask : float, optional
+        elevation mask, degrees
+
+    block_size : int, optional
+        grid points per block
+
+    workers : int, optional
+        number of threads, see concurrent.futures.ThreadPoolExecutor
+
+    kwargs
+        see coordinates.batch.satellite_xyz_grid
+
+    Returns
+    -------
+    coverage : Coverage
+    """
+    lon = np.atleast_1d(np.asarray(lon, dtype=float))
+    lat = np.atleast_1d(np.asarray(lat, dtype=float))
+
+    sat_xyz = satellite_xyz_grid(source, satellites, numbers, epoch,
+                                 **kwargs)
+    points, frames = grid_points(lon, lat, height)
+
+    num_of_epochs = sat_xyz.shape[1]
+    shape = (num_of_epochs, len(points))
+    result = Coverage(
+        np.empty(shape, dtype=int),
+        np.empty(shape),
+        np.empty(shape),
+        np.empty(shape),
+        np.empty(shape),
+    )
+
+    def process(t):
+        for begin in range(0, len(points), block_size):
+            block = slice(begin, begin + block_size)
+            values = dilution_of_precision(
+                points[block],
+                frames[block],
+                sat_xyz[:, t],
+                mask,
+            )
+            for out, value in zip(result, values):
+                out[t, block] = value
+
+    with ThreadPoolExecutor(workers) as executor:
+        list(executor.map(process, range(num_of_epochs)))
+
+    return Coverage(*(
+        value.reshape(num_of_epochs, len(lat), len(lon)) for value in result
+    ))
@@ -0,0 +1,164 @@
+"""
+Compiled ephemerides.
+
+The fields of the navigation message used by the propagators and the
+constants derived from them are computed once per message, see
+coordinates.sat.read_nav_data. The array form (one row per message) is
+used by the vectorized propagators, see coordinates.batch.
+"""
+from math import radians, sqrt
+
+import numpy as np
+
+from coordinates import datum
+
+# BDS GEO: inclination of the reference frame of the elements, radians
+BDS_GEO_TILT = radians(-5)
+
+
+class CompiledEphemeris:
+    """The base class of the compiled ephemerides.
+
+    Attributes
+    ----------
+    fields : tuple
+        names of the slots of the class and its bases
+    """
+    __slots__ = ()
+    fields = ()
+
+    def values(self):
+        """Returns the values of the fields."""
+        return tuple(getattr(self, name) for name in self.fields)
+
+    @classmethod
+    def columns(cls, array):
+        """Returns dictionary of the columns of the array form, see
+        ephemeris_array.
+
+        """
+        array = np.asarray(array, dtype=float)
+        return dict(zip(cls.fields, array.T))
+
+    def __eq__(self, other):
+        if type(self) is not type(other):
+            return NotImplemented
+        return self.values() == other.values()
+
+    def __repr__(self):
+        return '{cls}({values})'.format(
+            cls=type(self).__name__,
+            values=', '.join(
+                '{}={!r}'.format(name, value)
+                for name, value in zip(self.fields, self.values())
+            ),
+        )
+
+
+class KeplerEphemeris(CompiledEphemeris):
+    """Keplerian elements of GPS (GPS-way) navigation message.
+
+    Parameters
+    ----------
+    message : sequence
+        the navigation message, see coordinates.broadcast
+    """
+    __slots__ = (
+        'crs', 'dn', 'm0', 'cuc', 'e0', 'cus', 'a0', 'toe', 'cic', 'omega_0',
+        'cis', 'i0', 'crc', 'w0', 'omega_dot', 'i_dot',
+        # derived
+        'n', 'sqrt_1_e2', 'omega_rate', 'omega_toe',
+    )
+    fields = __slots__
+
+    def __init__(self, message):
+        self.crs = message[1]
+        self.dn = message[2]
+        self.m0 = message[3]
+        self.cuc = message[4]
+        self.e0 = message[5]
+        self.cus = message[6]
+        self.a0 = message[7] ** 2
+        self.toe = message[8]
+        self.cic = message[9]
+        self.omega_0 = message[10]
+        self.cis = message[11]
+        self.i0 = message[12]
+        self.crc = message[13]
+        self.w0 = message[14]
+        self.omega_dot = message[15]
+        self.i_dot = message[16]
+
+        # mean motion
+        self.n = sqrt(datum.mu / self.a0 ** 3) + self.dn
+        self.sqrt_1_e2 = sqrt(1 - self.e0 ** 2)
+
+        # rate and offset of the longitude of the ascending node
+        self.omega_rate = self.omega_dot - datum.omega
+        self.omega_toe = datum.omega * self.toe
+
+
+class GeoEphemeris(KeplerEphemeris):
+    """Keplerian elements of BDS GEO navigation message. The elements are
+    given in the inertial frame: the longitude of the ascending node
+    doesn't include the Earth rotation since toe (BDS ICD, 5.2.4.12).
+
+    """
+    __slots__ = ()
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.omega_rate = self.omega_dot
+
+
+class GloEphemeris(CompiledEphemeris):
+    """State vector of GLONASS (GLO-way) navigation message, meters.
+
+    Parameters
+    ----------
+    message : sequence
+        the navigation message, see coordinates.broadcast
+    """
+    __slots__ = (
+        'x0', 'vx', 'ax', 'y0', 'vy', 'ay', 'z0', 'vz', 'az',
+        # derived
+        'r2', 'first_sd', 'second_sd',
+    )
+    fields = __slots__
+
+    def __init__(self, message):
+        self.x0 = message[0] * 1000
+        self.vx = message[1] * 1000
+        self.ax = message[2] * 1000
+
+        self.y0 = message[4] * 1000
+        self.vy = message[5] * 1000
+        self.ay = message[6] * 1000
+
+        self.z0 = message[8] * 1000
+        self.vz = message[9] * 1000
+        self.az = message[10] * 1000
+
+        r = sqrt(self.x0 ** 2 + self.y0 ** 2 + self.z0 ** 2)
+        self.r2 = r ** 2
+
+        # - GLONASS ICD ver 5.1, 2008.
+        self.first_sd = -(datum.mu / r ** 3)
+        self.second_sd = (3 / 2. * datum.J0sqd * datum.mu * datum.ae ** 2 /
+                          r ** 5)
+
+
+def ephemeris_array(ephemerides):
+    """Returns the array form of the compiled ephemerides.
+
+    Parameters
+    ----------
+    ephemerides : sequence
+        compiled ephemerides of the same type
+
+    Returns
+    -------
+    array : numpy.ndarray
+        (n, p) the values of the fields, see CompiledEphemeris.columns
+    """
+    return np.array([e.values() for e in ephemerides], dtype=float)
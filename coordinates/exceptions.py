@@ -11,6 +11,13 @@ class RinexNavFileError(CoordinatesException):
     """
 
 
+class SP3FileError(CoordinatesException):
+    """
+    Raised by ``coordinates.sp3`` functions when parsing the SP3 file
+    fails.
+    """
+
+
 class SatSystemError(CoordinatesException):
     """
     Raised by ``coordinates.sat`` functions
@@ -29,3 +36,17 @@ class XYZNotFoundError(CoordinatesException):
     """
     Raised by coordinates.retrieve_xyz when nothing found.
     """
+
+
+class ChebyshevFitError(CoordinatesException):
+    """
+    Raised by ``coordinates.chebyshev.ChebyshevOrbits.fit`` when the error
+    of the approximation exceeds the tolerance.
+    """
+
+
+class RinexObsFileError(CoordinatesException):
+    """
+    Raised by ``coordinates.catalogue`` and ``coordinates.observations``
+    functions when parsing the observation file fails.
+    """
@@ -0,0 +1,195 @@
+"""
+Vectorized conversions between geocentric and geodetic coordinates.
+
+"""
+import numpy as np
+
+from coordinates import datum, jit
+
+# threshold of the latitude iterations, radians
+LATITUDE_THRESHOLD = 1e-12
+LATITUDE_MAX_ITERATIONS = 30
+
+
+def xyz2lbh_array(x, y, z, deg=True):
+    """Converts cartesian coordinates to geodetic coordinates, the
+    vectorized version of ``coordinates.xyz2lbh``.
+
+    Parameters
+    ----------
+    x, y, z : array_like
+        meters
+
+    deg : bool, optional
+        If True, l and b values will be converted into grad. Default is True.
+
+    Returns
+    -------
+    l, b : numpy.ndarray
+        longitude and latitude
+
+    h : numpy.ndarray
+        height, meters
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    z = np.asarray(z, dtype=float)
+
+    compiled = jit.kernel('xyz2lbh')
+    if compiled is not None:
+        x, y, z = np.broadcast_arrays(x, y, z)
+        lon, lat, h = compiled(x.ravel(), y.ravel(), z.ravel(), deg)
+        return (lon.reshape(x.shape), lat.reshape(x.shape),
+                h.reshape(x.shape))
+
+    e2 = datum.e ** 2
+    q = np.sqrt(x ** 2 + y ** 2)
+
+    # L - longitude
+    lon = np.where(
+        x == 0,
+        np.where(y > 0, np.pi / 2, 3 * np.pi / 2),
+        np.arctan2(y, x),
+    )
+
+    # B - latitude
+    lat = np.arctan2(z, q * (1 - e2))
+    for _ in range(LATITUDE_MAX_ITERATIONS):
+        sin_lat = np.sin(lat)
+        n = datum.a / np.sqrt(1 - e2 * sin_lat ** 2)
+        next_lat = np.arctan2(z + n * e2 * sin_lat, q)
+        converged = np.all(np.abs(next_lat - lat) <= LATITUDE_THRESHOLD)
+        lat = next_lat
+        if converged:
+            break
+
+    sin_lat = np.sin(lat)
+    n = datum.a / np.sqrt(1 - e2 * sin_lat ** 2)
+
+    # H - height
+    h = q * np.cos(lat) + z * sin_lat - n * (1 - e2 * sin_lat ** 2)
+
+    if deg:
+        lon = np.degrees(lon)
+        lat = np.degrees(lat)
+        lon = np.where(lon < 0, lon + 360, lon)
+
+    return lon, lat, h
+
+
+def lbh2xyz_array(lon, lat, h, deg=True):
+    """Converts geodetic coordinates to cartesian coordinates.
+
+    Parameters
+    ----------
+    lon, lat : array_like
+        longitude and latitude
+
+    h : array_like
+        height, meters
+
+    deg : bool, optional
+        If True, lon and lat are in grad. Default is True.
+
+    Returns
+    -------
+    x, y, z : numpy.ndarray
+        meters
+    """
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    h = np.asarray(h, dtype=float)
+
+    if deg:
+        lon = np.radians(lon)
+        lat = np.radians(lat)
+
+    e2 = datum.e ** 2
+    sin_lat = np.sin(lat)
+    n = datum.a / np.sqrt(1 - e2 * sin_lat ** 2)
+
+    x = (n + h) * np.cos(lat) * np.cos(lon)
+    y = (n + h) * np.cos(lat) * np.sin(lon)
+    z = (n * (1 - e2) + h) * sin_lat
+    return x, y, z
+
+
+def enu_matrix(lon, lat):
+    """Returns matrices which rotate geocentric vectors into the local
+    East, North, Up frame.
+
+    Parameters
+    ----------
+    lon, lat : array_like
+        (n, ) longitude and latitude, radians
+
+    Returns
+    -------
+    matrix : numpy.ndarray
+        (n, 3, 3)
+    """
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+
+    sin_lon, cos_lon = np.sin(lon), np.cos(lon)
+    sin_lat, cos_lat = np.sin(lat), np.cos(lat)
+    zero = np.zeros_like(lon)
+
+    return np.stack([
+        np.stack([-sin_lon, cos_lon, zero], axis=-1),
+        np.stack([-sin_lat * cos_lon, -sin_lat * sin_lon, cos_lat], axis=-1),
+        np.stack([cos_lat * cos_lon, cos_lat * sin_lon, sin_lat], axis=-1),
+    ], axis=-2)
+
+
+def receiver_frames(receivers):
+    """Returns ENU rotation matrices of the receivers.
+
+    Parameters
+    ----------
+    receivers : array_like
+        (n, 3) X, Y, Z, meters
+
+    Returns
+    -------
+    matrix : numpy.ndarray
+        (n, 3, 3) see enu_matrix
+    """
+    receivers = np.asarray(receivers, dtype=float).reshape(-1, 3)
+    lon, lat, _ = xyz2lbh_array(*receivers.T, deg=False)
+    return enu_matrix(lon, lat)
+
+
+def row_elevation(receivers, frames, sat_xyz):
+    """Returns elevation (degrees) of the satellites row by row.
+
+    Parameters
+    ----------
+    receivers : numpy.ndarray
+        (n, 3) or (3, )
+    frames : numpy.ndarray
+        (n, 3, 3) or (3, 3), see receiver_frames
+    sat_xyz : numpy.ndarray
+        (n, 3)
+    """
+    los = sat_xyz - receivers
+    distance = np.sqrt(np.einsum('...i,...i->...', los, los))
+    up = np.einsum('...i,...i->...', frames[..., 2, :], los) / distance
+    return np.degrees(np.arcsin(np.clip(up, -1, 1)))
+
+
+def row_azimuth_elevation(receivers, frames, sat_xyz):
+    """Returns azimuth and elevation (degrees) of the satellites row by row,
+    see row_elevation.
+
+    Returns
+    -------
+    azimuth, elevation : numpy.ndarray
+        (n, ) degrees
+    """
+    los = sat_xyz - receivers
+    distance = np.sqrt(np.einsum('...i,...i->...', los, los))
+    enu = np.einsum('...ij,...j->...i', frames, los) / distance[..., None]
+    azimuth = np.arctan2(enu[..., 0], enu[..., 1]) % (2 * np.pi)
+    elevation = np.arcsin(np.clip(enu[..., 2], -1, 1))
+    return np.degrees(azimuth), np.degrees(elevation)
@@ -0,0 +1,180 @@
+"""
+Geometry of many receivers against many satellites.
+
+The satellite positions are computed once for the epoch grid and
+broadcast against the receiver positions. The results are
+(stations, satellites, epochs) arrays; the computation is split into
+blocks to respect the memory budget.
+
+A usage example::
+
+    receivers = [retrieve_xyz(f) for f in obs_files]
+    result = geometry('brdm2510.17p', receivers, satellites, numbers, epochs)
+    visible = result.elevation > 10
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from coordinates.batch import satellite_xyz_grid
+from coordinates.geodesy import receiver_frames
+
+# bytes per (station, satellite, epoch) element including the temporaries
+ELEMENT_SIZE = 128
+
+DEFAULT_MEMORY_LIMIT = 256 * 1024 ** 2
+
+Geometry = namedtuple('Geometry', ['range', 'los', 'azimuth', 'elevation'])
+Geometry.__doc__ = """\
+Receiver-satellite geometry.
+
+range : numpy.ndarray
+    (stations, satellites, epochs) meters
+los : numpy.ndarray
+    (stations, satellites, epochs, 3) geocentric unit line-of-sight vectors
+azimuth, elevation : numpy.ndarray
+    (stations, satellites, epochs) degrees or radians
+"""
+
+
+def compute_geometry(receivers, sat_xyz, frames=None, deg=True):
+    """Returns the geometry of the receivers against the satellites.
+
+    Parameters
+    ----------
+    receivers : array_like
+        (s, 3) X, Y, Z of the receivers, meters
+
+    sat_xyz : numpy.ndarray
+        (k, m, 3) X, Y, Z of the satellites, meters
+
+    frames : numpy.ndarray, optional
+        (s, 3, 3) see coordinates.geodesy.receiver_frames
+
+    deg : bool, optional
+        azimuth and elevation in degrees, default is True
+
+    Returns
+    -------
+    geometry : Geometry
+    """
+    receivers = np.asarray(receivers, dtype=float).reshape(-1, 3)
+    if frames is None:
+        frames = receiver_frames(receivers)
+
+    los = sat_xyz[np.newaxis] - receivers[:, np.newaxis, np.newaxis, :]
+    distance = np.sqrt(np.einsum('skmi,skmi->skm', los, los))
+    los /= distance[..., np.newaxis]
+
+    enu = np.einsum('sij,skmj->skmi', frames, los)
+    azimuth = np.arctan2(enu[..., 0], enu[..., 1]) % (2 * np.pi)
+    elevation = np.arcsin(np.clip(enu[..., 2], -1, 1))
+
+    if deg:
+        azimuth = np.degrees(azimuth)
+        elevation = np.degrees(elevation)
+
+    return Geometry(distance, los, azimuth, elevation)
+
+
+def block_sizes(stations, satellites, epochs, memory_limit):
+    """Returns the number of stations and epochs per block.
+
+    """
+    budget = max(memory_limit // ELEMENT_SIZE, 1)
+    epochs_per_block = int(min(epochs, max(budget // satellites, 1)))
+    stations_per_block = int(min(
+        stations,
+        max(budget // (satellites * epochs_per_block), 1),
+    ))
+    return stations_per_block, epochs_per_block
+
+
+def iter_geometry(source, receivers, satellites, numbers, epoch,
+                  memory_limit=DEFAULT_MEMORY_LIMIT, deg=True, **kwargs):
+    """Yields the geometry by blocks of stations and epochs.
+
+    Parameters
+    ----------
+    source : str, file or orbit object
+        see coordinates.batch.satellite_xyz_many
+
+    receivers : array_like
+        (s, 3) X, Y, Z of the receivers, meters
+
+    satellites, numbers : array_like
+        (k, ) satellite systems and numbers
+
+    epoch : array_like
+        (m, ) epochs, see coordinates.batch.satellite_xyz_grid
+
+    memory_limit : int, optional
+        the budget of a block, bytes
+
+    deg : bool, optional
+        azimuth and elevation in degrees
+
+    kwargs
+        see coordinates.batch.satellite_xyz_grid
+
+    Yields
+    ------
+    stations : slice
+    epochs : slice
+    geometry : Geometry
+        geometry of the block
+    """
+    receivers = np.asarray(receivers, dtype=float).reshape(-1, 3)
+    sat_xyz = satellite_xyz_grid(source, satellites, numbers, epoch,
+                                 **kwargs)
+    frames = receiver_frames(receivers)
+
+    num_of_sats, num_of_epochs, _ = sat_xyz.shape
+    stations_per_block, epochs_per_block = block_sizes(
+        len(receivers), num_of_sats, num_of_epochs, memory_limit,
+    )
+
+    for s_begin in range(0, len(receivers), stations_per_block):
+        stations = slice(s_begin, s_begin + stations_per_block)
+        for e_begin in range(0, num_of_epochs, epochs_per_block):
+            epochs = slice(e_begin, e_begin + epochs_per_block)
+            yield stations, epochs, compute_geometry(
+                receivers[stations],
+                sat_xyz[:, epochs],
+                frames=frames[stations],
+                deg=deg,
+            )
+
+
+def geometry(source, receivers, satellites, numbers, epoch,
+             memory_limit=DEFAULT_MEMORY_LIMIT, deg=True, **kwargs):
+    """Returns the geometry of the receivers against the satellites, see
+    iter_geometry.
+
+    The result arrays are allocated at once, the memory limit applies to
+    the temporaries of the computation.
+
+    Returns
+    -------
+    geometry : Geometry
+    """
+    receivers = np.asarray(receivers, dtype=float).reshape(-1, 3)
+    result = None
+
+    blocks = iter_geometry(source, receivers, satellites, numbers, epoch,
+                           memory_limit=memory_limit, deg=deg, **kwargs)
+    for stations, epochs, block in blocks:
+        if result is None:
+            num_of_sats = block.range.shape[1]
+            num_of_epochs = len(np.atleast_1d(epoch))
+            shape = (len(receivers), num_of_sats, num_of_epochs)
+            result = Geometry(
+                np.empty(shape),
+                np.empty(shape + (3,)),
+                np.empty(shape),
+                np.empty(shape),
+            )
+        for out, value in zip(result, block):
+            out[stations, :, epochs] = value
+
+    return result
@@ -0,0 +1,231 @@
+"""
+Opt-in instrumentation of the hot paths.
+
+When enabled, the instrumented code keeps counters and cumulative timers
+per stage:
+
+- 'parse' -- parsing of the navigation files (coordinates.broadcast),
+  'parse.records' and the records parsed per file;
+- 'read_nav_data' -- reading of the navigation data on the cache miss;
+- 'find_message' -- lookup of the navigation message;
+- 'propagate' -- computation of the coordinates, 'propagate.rows';
+- 'kepler.solutions' and 'kepler.iterations' of the Kepler equation in
+  coordinates.sat.gps_sat_xyz.
+
+The statistics of the caches (hits, misses, hit rate) are taken from the
+cached functions. A usage example::
+
+    enable()
+    add_callback(lambda kind, name, value: print(kind, name, value))
+    ...
+    snapshot = stats()
+
+The instrumentation is enabled at start if COORDINATES_STATS environment
+variable is set (not empty). When disabled, the instrumented code makes a
+few calls which do nothing.
+"""
+import os
+import sys
+import threading
+from collections import defaultdict
+from time import perf_counter
+
+STATS_VARIABLE = 'COORDINATES_STATS'
+
+# the cached functions: (module, function)
+CACHES = (
+    ('coordinates.sat', 'read_nav_data'),
+    ('coordinates.sat', 'satellite_xyz'),
+    ('coordinates.batch', 'read_nav_arrays'),
+    ('coordinates.sp3', 'read_sp3'),
+)
+
+# checked by the instrumented code, see enable and disable
+enabled = bool(os.environ.get(STATS_VARIABLE))
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_timers = defaultdict(float)
+_files = defaultdict(int)
+_callbacks = []
+
+
+def enable():
+    """Enables the instrumentation."""
+    global enabled
+    enabled = True
+
+
+def disable():
+    """Disables the instrumentation; the collected values are kept."""
+    global enabled
+    enabled = False
+
+
+def reset():
+    """Clears the counters, the timers and the records per file."""
+    with _lock:
+        _counters.clear()
+        _timers.clear()
+        _files.clear()
+
+
+def add_callback(callback):
+    """Adds the callback which is called on every value recorded by the
+    enabled instrumentation, e.g. to export the values to a metrics system.
+
+    Parameters
+    ----------
+    callback : callable
+        callback(kind, name, value), where kind is 'counter' or 'timer'
+        and value is the increment or the duration in seconds
+    """
+    with _lock:
+        _callbacks.append(callback)
+
+
+def remove_callback(callback):
+    """Removes the callback, see add_callback."""
+    with _lock:
+        _callbacks.remove(callback)
+
+
+def _notify(kind, name, value):
+    for callback in tuple(_callbacks):
+        callback(kind, name, value)
+
+
+def count(name, value=1):
+    """Increments the counter."""
+    if not enabled:
+        return
+    with _lock:
+        _counters[name] += value
+    _notify('counter', name, value)
+
+
+def add_time(name, seconds):
+    """Adds the duration to the cumulative timer of the stage."""
+    if not enabled:
+        return
+    with _lock:
+        _timers[name] += seconds
+    _notify('timer', name, seconds)
+
+
+def start():
+    """Returns the start time of the stage or None when disabled, see
+    stop.
+
+    """
+    if enabled:
+        return perf_counter()
+    return None
+
+
+def stop(name, started):
+    """Adds the time elapsed since started to the timer of the stage and
+    returns the current time (the start of the next stage).
+
+    Parameters
+    ----------
+    name : str
+    started : float or None
+        see start
+
+    Returns
+    -------
+    now : float or None
+    """
+    if started is None or not enabled:
+        return None
+    now = perf_counter()
+    add_time(name, now - started)
+    return now
+
+
+def parsed(filename, rows):
+    """Iterates over the parsed rows; the time spent in the parser is added
+    to 'parse' timer, the number of the rows to 'parse.records' counter and
+    to the records of the file.
+
+    """
+    number = 0
+    elapsed = 0.
+    iterator = iter(rows)
+    while True:
+        started = perf_counter()
+        try:
+            row = next(iterator)
+        except StopIteration:
+            elapsed += perf_counter() - started
+            break
+        elapsed += perf_counter() - started
+        number += 1
+        yield row
+
+    add_time('parse', elapsed)
+    count('parse.records', number)
+    with _lock:
+        _files[file_key(filename)] += number
+
+
+def file_key(filename):
+    """Returns the name of the file or the representation of the file
+    object.
+
+    """
+    if isinstance(filename, str):
+        return filename
+    return getattr(filename, 'name', None) or repr(filename)
+
+
+def cache_stats():
+    """Returns the statistics of the caches of the imported modules.
+
+    Returns
+    -------
+    caches : dict
+        function -> dict(hits, misses, size, hit_rate)
+    """
+    caches = dict()
+    for module_name, name in CACHES:
+        module = sys.modules.get(module_name)
+        if module is None:
+            continue
+        info = getattr(module, name).cache_info()
+        calls = info.hits + info.misses
+        caches[name] = dict(
+            hits=info.hits,
+            misses=info.misses,
+            size=info.currsize,
+            hit_rate=info.hits / calls if calls else None,
+        )
+    return caches
+
+
+def stats():
+    """Returns the snapshot of the statistics.
+
+    Returns
+    -------
+    snapshot : dict
+        enabled : bool
+        counters : dict
+            name -> value
+        timers : dict
+            stage -> cumulative time, seconds
+        files : dict
+            file -> records parsed
+        caches : dict
+            see cache_stats
+    """
+    with _lock:
+        snapshot = dict(
+            enabled=enabled,
+            counters=dict(_counters),
+            timers=dict(_timers),
+            files=dict(_files),
+        )
+    snapshot['caches'] = cache_stats()
+    return snapshot
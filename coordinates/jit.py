@@ -0,0 +1,295 @@
+"""
+Optional JIT-compiled kernels (requires numba, ``pip install
+coordinates[numba]``).
+
+The kernels are fused loops over the rows: they don't create temporary
+arrays. They are used by the vectorized routines (see coordinates.kernels
+and coordinates.geodesy.xyz2lbh_array) when the 'numba' backend is
+selected; otherwise the NumPy path is used. numba is imported and the
+kernels are compiled on the first use of the backend.
+
+A usage example::
+
+    set_backend('numba')
+
+    with use_backend('numpy'):
+        ...
+
+The initial backend is taken from COORDINATES_BACKEND environment
+variable, 'numpy' by default or if the variable names an unknown or
+unavailable backend. The backend is global for all the threads.
+
+The kernels are serial loops which release the GIL, so the batch
+routines called from several threads (e.g. by
+concurrent.futures.ThreadPoolExecutor) run in parallel. numba parallel
+loops aren't used: the default (workqueue) threading layer of numba
+terminates the process when such kernels are called from several
+threads.
+"""
+import importlib.util
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+from coordinates import datum
+from coordinates.ephemeris import GloEphemeris, KeplerEphemeris
+
+BACKENDS = ('numpy', 'numba')
+DEFAULT_BACKEND = 'numpy'
+BACKEND_VARIABLE = 'COORDINATES_BACKEND'
+
+LOGGER = logging.getLogger(__name__)
+
+_state = dict(
+    backend=DEFAULT_BACKEND,
+    kernels=None,
+)
+
+# the kernels are compiled once whatever the number of the threads
+_build_lock = threading.Lock()
+
+
+def available_backends():
+    """Returns the names of the backends which can be used."""
+    if importlib.util.find_spec('numba') is None:
+        return BACKENDS[:1]
+    return BACKENDS
+
+
+def initial_backend():
+    """Returns the backend selected by COORDINATES_BACKEND environment
+    variable; unknown or unavailable backend is replaced by the default one
+    with a warning.
+
+    """
+    name = os.environ.get(BACKEND_VARIABLE) or DEFAULT_BACKEND
+    if name not in available_backends():
+        LOGGER.warning('%s=%s: the backend is unknown or unavailable, '
+                       '%s is used.', BACKEND_VARIABLE, name,
+                       DEFAULT_BACKEND)
+        return DEFAULT_BACKEND
+    return name
+
+
+_state['backend'] = initial_backend()
+
+
+def get_backend():
+    """Returns the name of the current backend."""
+    return _state['backend']
+
+
+def set_backend(name):
+    """Selects the backend of the vectorized routines.
+
+    Parameters
+    ----------
+    name : str
+        'numpy' or 'numba'
+
+    Raises
+    ------
+    ValueError
+        on unknown backend.
+
+    ImportError
+        when numba is not installed.
+    """
+    if name not in BACKENDS:
+        raise ValueError('Unknown backend: {}.'.format(name))
+    if name not in available_backends():
+        raise ImportError('numba is required: pip install coordinates[numba]')
+    _state['backend'] = name
+
+
+@contextmanager
+def use_backend(name):
+    """Selects the backend within the context, see set_backend."""
+    previous = get_backend()
+    set_backend(name)
+    try:
+        yield
+    finally:
+        _state['backend'] = previous
+
+
+def kernel(name):
+    """Returns the compiled kernel if the 'numba' backend is selected,
+    otherwise None.
+
+    """
+    if _state['backend'] != 'numba':
+        return None
+    if _state['kernels'] is None:
+        with _build_lock:
+            if _state['kernels'] is None:
+                _state['kernels'] = build_kernels()
+    return _state['kernels'][name]
+
+
+def build_kernels():
+    """Returns dictionary of the kernels compiled by numba.
+
+    """
+    import numba
+    import numpy as np
+
+    from coordinates.geodesy import (
+        LATITUDE_MAX_ITERATIONS,
+        LATITUDE_THRESHOLD,
+    )
+    from coordinates.kernels import KEPLER_MAX_ITERATIONS, KEPLER_TOLERANCE
+
+    omega = datum.omega
+    a = datum.a
+    e2 = datum.e ** 2
+
+    k = {name: i for i, name in enumerate(KeplerEphemeris.fields)}
+    crs, cuc, cus, crc = k['crs'], k['cuc'], k['cus'], k['crc']
+    cic, cis, i0, i_dot = k['cic'], k['cis'], k['i0'], k['i_dot']
+    m0, e, a0, toe = k['m0'], k['e0'], k['a0'], k['toe']
+    w0, n_, sqrt_1_e2 = k['w0'], k['n'], k['sqrt_1_e2']
+    omega_0, omega_rate, omega_toe = (k['omega_0'], k['omega_rate'],
+                                      k['omega_toe'])
+
+    g = {name: i for i, name in enumerate(GloEphemeris.fields)}
+    x0_, vx_, ax_ = g['x0'], g['vx'], g['ax']
+    y0_, vy_, ay_ = g['y0'], g['vy'], g['ay']
+    z0_, vz_, az_ = g['z0'], g['vz'], g['az']
+    r2_, first_sd_, second_sd_ = g['r2'], g['first_sd'], g['second_sd']
+
+    @numba.njit(nogil=True)
+    def gps_sat_xyz(ephemeris, sec):
+        xyz = np.empty((len(sec), 3))
+        for i in range(len(sec)):
+            eph = ephemeris[i]
+            e0 = eph[e]
+
+            tk = sec[i] - eph[toe]
+            if tk > 302400:
+                tk -= 604800
+            elif tk < -302400:
+                tk += 604800
+
+            mk = eph[m0] + eph[n_] * tk
+
+            ek = mk
+            for _ in range(KEPLER_MAX_ITERATIONS):
+                d_ek = (ek - e0 * np.sin(ek) - mk) / (1 - e0 * np.cos(ek))
+                ek -= d_ek
+                if abs(d_ek) <= KEPLER_TOLERANCE:
+                    break
+
+            sin_ek = np.sin(ek)
+            cos_ek = np.cos(ek)
+
+            fs = (eph[sqrt_1_e2] * sin_ek) / (1 - e0 * cos_ek)
+            fc = (cos_ek - e0) / (1 - e0 * cos_ek)
+            tettak = np.arctan2(fs, fc)
+
+            u0k = tettak + eph[w0]
+            cos_2u0k = np.cos(2 * u0k)
+            sin_2u0k = np.sin(2 * u0k)
+
+            uk = u0k + eph[cuc] * cos_2u0k + eph[cus] * sin_2u0k
+            rk = (eph[a0] * (1 + e0 * cos_ek) + eph[crc] * cos_2u0k +
+                  eph[crs] * sin_2u0k)
+            ik = (eph[i0] + (eph[cic] * cos_2u0k + eph[cis] * sin_2u0k) +
+                  eph[i_dot] * tk)
+
+            omega_k = eph[omega_0] + eph[omega_rate] * tk - eph[omega_toe]
+
+            cos_uk = np.cos(uk)
+            sin_uk = np.sin(uk)
+            cos_ok = np.cos(omega_k)
+            sin_ok = np.sin(omega_k)
+            cos_ik = np.cos(ik)
+
+            xyz[i, 0] = rk * (cos_uk * cos_ok - sin_uk * sin_ok * cos_ik)
+            xyz[i, 1] = rk * (cos_uk * sin_ok + sin_uk * cos_ok * cos_ik)
+            xyz[i, 2] = rk * sin_uk * np.sin(ik)
+        return xyz
+
+    @numba.njit(nogil=True)
+    def glo_sat_xyz(ephemeris, dt):
+        xyz = np.empty((len(dt), 3))
+        for i in range(len(dt)):
+            eph = ephemeris[i]
+            t = dt[i]
+            x0, vx, ax = eph[x0_], eph[vx_], eph[ax_]
+            y0, vy, ay = eph[y0_], eph[vy_], eph[ay_]
+            z0, vz, az = eph[z0_], eph[vz_], eph[az_]
+            r2 = eph[r2_]
+            first_sd = eph[first_sd_]
+            second_sd = eph[second_sd_]
+
+            x, y, z = x0, y0, z0
+            kx = ky = kz = 0.
+            sum_kx = sum_ky = sum_kz = 0.
+            for step in range(3):
+                if step:
+                    x = x0 + vx * t / 2. + kx * t / 8.
+                    y = y0 + vy * t / 2. + ky * t / 8.
+                    z = z0 + vz * t / 2. + kz * t / 8.
+
+                kx = (first_sd * x - second_sd * x * (1 - 5 * z ** 2 / r2) +
+                      omega ** 2 * x + 2 * omega * vy + ax) * t
+                ky = (first_sd * y - second_sd * y * (1 - 5 * z ** 2 / r2) +
+                      omega ** 2 * y - 2 * omega * vx + ay) * t
+                kz = (first_sd * z - second_sd * z * (3 - 5 * z ** 2 / r2) +
+                      az) * t
+
+                sum_kx += kx
+                sum_ky += ky
+                sum_kz += kz
+
+            xyz[i, 0] = x0 + vx * t + sum_kx * t / 6
+            xyz[i, 1] = y0 + vy * t + sum_ky * t / 6
+            xyz[i, 2] = z0 + vz * t + sum_kz * t / 6
+        return xyz
+
+    @numba.njit(nogil=True)
+    def xyz2lbh(x, y, z, deg):
+        lbh = np.empty((3, len(x)))
+        for i in range(len(x)):
+            q = np.sqrt(x[i] ** 2 + y[i] ** 2)
+
+            # L - longitude
+            if x[i] == 0:
+                lon = np.pi / 2 if y[i] > 0 else 3 * np.pi / 2
+            else:
+                lon = np.arctan2(y[i], x[i])
+
+            # B - latitude
+            lat = np.arctan2(z[i], q * (1 - e2))
+            for _ in range(LATITUDE_MAX_ITERATIONS):
+                sin_lat = np.sin(lat)
+                n = a / np.sqrt(1 - e2 * sin_lat ** 2)
+                next_lat = np.arctan2(z[i] + n * e2 * sin_lat, q)
+                converged = abs(next_lat - lat) <= LATITUDE_THRESHOLD
+                lat = next_lat
+                if converged:
+                    break
+
+            sin_lat = np.sin(lat)
+            n = a / np.sqrt(1 - e2 * sin_lat ** 2)
+
+            # H - height
+            lbh[2, i] = (q * np.cos(lat) + z[i] * sin_lat -
+                         n * (1 - e2 * sin_lat ** 2))
+
+            if deg:
+                lon = np.degrees(lon)
+                lat = np.degrees(lat)
+                if lon < 0:
+                    lon += 360
+            lbh[0, i] = lon
+            lbh[1, i] = lat
+        return lbh
+
+    return dict(
+        gps_sat_xyz=gps_sat_xyz,
+        glo_sat_xyz=glo_sat_xyz,
+        xyz2lbh=xyz2lbh,
+    )
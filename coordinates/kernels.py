@@ -0,0 +1,218 @@
+"""
+Vectorized propagators of the broadcast ephemerides.
+
+The kernels accept the array form of the compiled ephemerides (see
+coordinates.ephemeris) and compute coordinates for all the rows at once.
+The compiled kernels are used when the 'numba' backend is selected, see
+coordinates.jit.
+"""
+import numpy as np
+
+from coordinates import datum, jit
+from coordinates.ephemeris import (
+    BDS_GEO_TILT,
+    GloEphemeris,
+    KeplerEphemeris,
+)
+
+# Kepler's equation
+KEPLER_MAX_ITERATIONS = 30
+KEPLER_TOLERANCE = 1e-15
+
+
+def gps_sat_xyz_array(ephemeris, sec):
+    """Returns geocentric coordinates XYZ of the GPS (GPS-way) satellites,
+    the vectorized version of ``coordinates.sat.gps_sat_xyz``.
+
+    Parameters
+    ----------
+    ephemeris : numpy.ndarray
+        (n, p) compiled ephemerides, see KeplerEphemeris.columns
+
+    sec : numpy.ndarray
+        (n, ) seconds since the start of the week
+
+    Returns
+    -------
+    xyz : numpy.ndarray
+        (n, 3) X, Y, Z, meters
+    """
+    compiled = jit.kernel('gps_sat_xyz')
+    if compiled is not None:
+        return compiled(
+            np.ascontiguousarray(ephemeris, dtype=float),
+            np.ascontiguousarray(sec, dtype=float),
+        )
+
+    columns = KeplerEphemeris.columns(ephemeris)
+    e0 = columns['e0']
+    a0 = columns['a0']
+
+    tk = sec - columns['toe']
+    tk = np.where(tk > 302400, tk - 604800, tk)
+    tk = np.where(tk < -302400, tk + 604800, tk)
+
+    mk = columns['m0'] + columns['n'] * tk
+
+    ek = mk.copy()
+    for _ in range(KEPLER_MAX_ITERATIONS):
+        d_ek = (ek - e0 * np.sin(ek) - mk) / (1 - e0 * np.cos(ek))
+        ek -= d_ek
+        if np.all(np.abs(d_ek) <= KEPLER_TOLERANCE):
+            break
+
+    sin_ek = np.sin(ek)
+    cos_ek = np.cos(ek)
+
+    fs = (columns['sqrt_1_e2'] * sin_ek) / (1 - e0 * cos_ek)
+    fc = (cos_ek - e0) / (1 - e0 * cos_ek)
+    tettak = np.arctan2(fs, fc)
+
+    u0k = tettak + columns['w0']
+    cos_2u0k = np.cos(2 * u0k)
+    sin_2u0k = np.sin(2 * u0k)
+
+    uk = u0k + columns['cuc'] * cos_2u0k + columns['cus'] * sin_2u0k
+    rk = (a0 * (1 + e0 * cos_ek) + columns['crc'] * cos_2u0k +
+          columns['crs'] * sin_2u0k)
+    ik = (columns['i0'] +
+          (columns['cic'] * cos_2u0k + columns['cis'] * sin_2u0k) +
+          columns['i_dot'] * tk)
+
+    omega_k = (columns['omega_0'] + columns['omega_rate'] * tk -
+               columns['omega_toe'])
+
+    cos_uk = np.cos(uk)
+    sin_uk = np.sin(uk)
+    cos_ok = np.cos(omega_k)
+    sin_ok = np.sin(omega_k)
+    cos_ik = np.cos(ik)
+
+    xyz = np.empty((len(tk), 3))
+    xyz[:, 0] = rk * (cos_uk * cos_ok - sin_uk * sin_ok * cos_ik)
+    xyz[:, 1] = rk * (cos_uk * sin_ok + sin_uk * cos_ok * cos_ik)
+    xyz[:, 2] = rk * sin_uk * np.sin(ik)
+    return xyz
+
+
+def bds_geo_sat_xyz_array(ephemeris, sec):
+    """Returns geocentric coordinates XYZ of BDS GEO satellites, the
+    vectorized version of ``coordinates.sat.bds_geo_sat_xyz``.
+
+    Parameters
+    ----------
+    ephemeris : numpy.ndarray
+        (n, p) compiled ephemerides, see GeoEphemeris
+
+    sec : numpy.ndarray
+        (n, ) seconds since the start of the week
+
+    Returns
+    -------
+    xyz : numpy.ndarray
+        (n, 3) X, Y, Z, meters
+    """
+    inertial = gps_sat_xyz_array(ephemeris, sec)
+
+    tk = sec - KeplerEphemeris.columns(ephemeris)['toe']
+    tk = np.where(tk > 302400, tk - 604800, tk)
+    tk = np.where(tk < -302400, tk + 604800, tk)
+
+    return geo_rotation_array(inertial, datum.omega * tk)
+
+
+def geo_rotation_array(xyz, angle):
+    """Rotates BDS GEO coordinates into ECEF: R_Z(angle) R_X(-5 degrees).
+
+    """
+    cos_tilt, sin_tilt = np.cos(BDS_GEO_TILT), np.sin(BDS_GEO_TILT)
+    cos_a, sin_a = np.cos(angle), np.sin(angle)
+
+    x = xyz[:, 0]
+    y = cos_tilt * xyz[:, 1] + sin_tilt * xyz[:, 2]
+    z = -sin_tilt * xyz[:, 1] + cos_tilt * xyz[:, 2]
+
+    result = np.empty_like(xyz)
+    result[:, 0] = cos_a * x + sin_a * y
+    result[:, 1] = -sin_a * x + cos_a * y
+    result[:, 2] = z
+    return result
+
+
+def glo_sat_xyz_array(ephemeris, dt):
+    """Returns geocentric coordinates XYZ of the GLONASS (GLO-way)
+    satellites, the vectorized version of ``coordinates.sat.glo_sat_xyz``.
+
+    Parameters
+    ----------
+    ephemeris : numpy.ndarray
+        (n, p) compiled ephemerides, see GloEphemeris.columns
+
+    dt : numpy.ndarray
+        (n, ) difference between time of the ephemeris and observation
+        time, seconds
+
+    Returns
+    -------
+    xyz : numpy.ndarray
+        (n, 3) X, Y, Z, meters
+    """
+    compiled = jit.kernel('glo_sat_xyz')
+    if compiled is not None:
+        return compiled(
+            np.ascontiguousarray(ephemeris, dtype=float),
+            np.ascontiguousarray(dt, dtype=float),
+        )
+
+    columns = GloEphemeris.columns(ephemeris)
+
+    # meters
+    x0, vX, aX = columns['x0'], columns['vx'], columns['ax']
+    y0, vY, aY = columns['y0'], columns['vy'], columns['ay']
+    z0, vZ, aZ = columns['z0'], columns['vz'], columns['az']
+
+    r2 = columns['r2']
+    first_sd = columns['first_sd']
+    second_sd = columns['second_sd']
+
+    def fx(x, z):
+        return (first_sd * x - second_sd * x * (1 - 5 * z ** 2 / r2) +
+                datum.omega ** 2 * x + 2 * datum.omega * vY + aX)
+
+    def fy(y, z):
+        return (first_sd * y - second_sd * y * (1 - 5 * z ** 2 / r2) +
+                datum.omega ** 2 * y - 2 * datum.omega * vX + aY)
+
+    def fz(z):
+        return (first_sd * z - second_sd * z * (3 - 5 * z ** 2 / r2) +
+                aZ)
+
+    # 1
+    kx1 = fx(x0, z0) * dt
+    ky1 = fy(y0, z0) * dt
+    kz1 = fz(z0) * dt
+
+    x1 = x0 + vX * dt / 2. + kx1 * dt / 8.
+    y1 = y0 + vY * dt / 2. + ky1 * dt / 8.
+    z1 = z0 + vZ * dt / 2. + kz1 * dt / 8.
+
+    # 2
+    kx2 = fx(x1, z1) * dt
+    ky2 = fy(y1, z1) * dt
+    kz2 = fz(z1) * dt
+
+    x2 = x0 + vX * dt / 2. + kx2 * dt / 8.
+    y2 = y0 + vY * dt / 2. + ky2 * dt / 8.
+    z2 = z0 + vZ * dt / 2. + kz2 * dt / 8.
+
+    # 3
+    kx3 = fx(x2, z2) * dt
+    ky3 = fy(y2, z2) * dt
+    kz3 = fz(z2) * dt
+
+    # result
+    xyz = np.empty((len(dt), 3))
+    xyz[:, 0] = x0 + vX * dt + (kx1 + kx2 + kx3) * dt / 6
+    xyz[:, 1] = y0 + vY * dt + (ky1 + ky2 + ky3) * dt / 6
+    xyz[:, 2] = z0 + vZ * dt + (kz1 + kz2 + kz3) * dt / 6
+    return xyz
@@ -0,0 +1,452 @@
+"""
+Streaming reader of RINEX 2.11 and 3.x observation files.
+
+The file is read sequentially; the observations are yielded by blocks of
+whole epochs as arrays with one row per satellite per epoch, so the memory
+is bounded by the size of the block whatever the size of the file. The
+rows of a block join directly with the satellite positions, see
+``block_xyz`` and ``coordinates.batch.satellite_xyz_many``.
+
+A usage example::
+
+    obs = rnx_obs('aspa1870.17o')
+    for block in obs:
+        xyz = block_xyz('brdc1870.17n', block, obs.header.time_system)
+        phase = block.values[:, block.obs_types.index('L1')]
+"""
+import datetime
+import io
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+
+import numpy as np
+
+from coordinates.batch import (
+    NAV_TIME_SYSTEM,
+    group_request,
+    satellite_xyz_many,
+)
+from coordinates.broadcast import RinexNavFile
+from coordinates.catalogue import open_rinex, parse_header
+from coordinates.exceptions import (
+    NavMessageNotFoundError,
+    RinexObsFileError,
+    SatSystemError,
+)
+from coordinates.timescale import datetime2sec, from_gps, to_gps
+
+# epochs per block
+DEFAULT_BLOCK_SIZE = 500
+
+# width of the observation field: F14.3, LLI, and signal strength
+FIELD_WIDTH = 16
+VALUE_WIDTH = 14
+
+# RINEX 2: observations per line and satellites per epoch line
+OBS_PER_LINE_V2 = 5
+SATS_PER_LINE_V2 = 12
+
+# systems of RINEX 2 files; the observation types are the same for all
+SYSTEMS_V2 = 'GRSECJI'
+
+# the time systems of the files -> coordinates.timescale systems
+TIME_SYSTEMS = dict(
+    GPS='G',
+    GAL='E',
+    BDT='C',
+    QZS='J',
+    IRN='I',
+    GLO='UTC',
+)
+
+ObsHeader = namedtuple('ObsHeader', [
+    'version', 'station', 'obs_types', 'columns', 'time_system',
+])
+ObsHeader.__doc__ = """\
+The header of the observation file.
+
+version : float
+station : coordinates.catalogue.StationHeader
+obs_types : dict
+    system -> the observation types of the system
+columns : tuple
+    all the observation types (the columns of the blocks)
+time_system : str
+    the time system of the epochs, see coordinates.timescale ('G', 'E',
+    'UTC', ...)
+"""
+
+ObsBlock = namedtuple('ObsBlock', [
+    'epoch', 'satellite', 'number', 'values', 'lli', 'ssi', 'obs_types',
+])
+ObsBlock.__doc__ = """\
+Observations of several epochs, one row per satellite per epoch.
+
+epoch : numpy.ndarray
+    (n, ) seconds since coordinates.timescale.GPS_EPOCH in the time system
+    of the file
+satellite : numpy.ndarray
+    (n, ) satellite systems
+number : numpy.ndarray
+    (n, ) satellite numbers
+values : numpy.ndarray
+    (n, k) the observations; NaN if absent
+lli, ssi : numpy.ndarray
+    (n, k) loss of lock indicator and signal strength, int8; 0 if blank
+obs_types : tuple
+    (k, ) the observation types of the columns, see ObsHeader.columns
+"""
+
+
+@contextmanager
+def open_obs(filename):
+    """Returns text file object of the plain or the gzipped file; the file
+    objects are used as is.
+
+    """
+    if not isinstance(filename, str):
+        yield filename
+        return
+
+    with open_rinex(filename) as raw:
+        yield io.TextIOWrapper(raw, encoding='latin-1')
+
+
+def read_header(file_object):
+    """Reads the header from the file and returns ObsHeader.
+
+    Raises
+    ------
+    RinexObsFileError
+        on unexpected end of the file or unsupported file.
+    """
+    lines = []
+    for line in file_object:
+        lines.append(line)
+        if line[60:73] == 'END OF HEADER':
+            break
+    else:
+        raise RinexObsFileError('Unexpected end of the file.')
+
+    if lines[0][60:].startswith('CRINEX'):
+        raise RinexObsFileError(
+            'Hatanaka compressed files are not supported.')
+
+    station = parse_header(lines)
+    version = station.version
+
+    obs_types = OrderedDict()
+    time_system = 'GPS'
+    pending = []
+    for line in lines:
+        label = line[60:].strip()
+        if label == '# / TYPES OF OBSERV':
+            if line[:6].strip():
+                pending = [int(line[:6])]
+            pending += line[6:60].split()
+            types = tuple(pending[1:])
+            if len(types) == pending[0]:
+                for system in SYSTEMS_V2:
+                    obs_types[system] = types
+        elif label == 'SYS / # / OBS TYPES':
+            if line[0] != ' ':
+                pending = [line[0], int(line[3:6])]
+            pending += line[7:60].split()
+            types = tuple(pending[2:])
+            if len(types) == pending[1]:
+                obs_types[pending[0]] = types
+        elif label == 'TIME OF FIRST OBS':
+            time_system = line[48:51].strip() or time_system
+
+    if time_system not in TIME_SYSTEMS:
+        msg = 'Unknown time system: {}.'.format(time_system)
+        raise RinexObsFileError(msg)
+
+    columns = tuple(OrderedDict.fromkeys(
+        t for types in obs_types.values() for t in types))
+
+    return ObsHeader(version, station, obs_types, columns,
+                     TIME_SYSTEMS[time_system])
+
+
+def next_line(file_object):
+    try:
+        return next(file_object).rstrip('\r\n')
+    except StopIteration:
+        raise RinexObsFileError('Unexpected end of the file.')
+
+
+def epoch_sec(year, month, day, hour, minute, sec):
+    return datetime2sec(
+        datetime.datetime(year, month, day, hour, minute)) + sec
+
+
+class RinexObsFile:
+    """RINEX observation file which yields ObsBlock objects.
+
+    Parameters
+    ----------
+    filename : str or file
+        plain or gzipped file
+    block_size : int, optional
+        epochs per block
+
+    Attributes
+    ----------
+    header : ObsHeader
+    """
+
+    def __init__(self, filename, block_size=DEFAULT_BLOCK_SIZE):
+        self.filename = filename
+        self.block_size = block_size
+        with open_obs(filename) as file_object:
+            self.header = read_header(file_object)
+            if not isinstance(filename, str):
+                file_object.seek(0)
+
+        # system -> indices of its types in the columns
+        self._index = {
+            system: np.array([self.header.columns.index(t) for t in types],
+                             dtype=int)
+            for system, types in self.header.obs_types.items()
+        }
+
+    def __iter__(self):
+        if self.header.version >= 3:
+            parse_epoch = self.parse_epoch_v3
+        else:
+            parse_epoch = self.parse_epoch_v2
+
+        with open_obs(self.filename) as file_object:
+            read_header(file_object)
+
+            rows = []
+            epochs = 0
+            for line in file_object:
+                line = line.rstrip('\r\n')
+                if not line.strip():
+                    continue
+                epochs += parse_epoch(line, file_object, rows)
+                if epochs >= self.block_size:
+                    yield self.make_block(rows)
+                    rows = []
+                    epochs = 0
+
+            if rows:
+                yield self.make_block(rows)
+
+            if not isinstance(self.filename, str):
+                file_object.seek(0)
+
+    def parse_epoch_v3(self, line, file_object, rows):
+        """Parses the epoch record and the observations of the epoch into
+        rows: (epoch, system, number, data); returns the number of the
+        epochs parsed (0 for the event records).
+
+        """
+        if line[0] != '>':
+            msg = "Can't read epoch: {}.".format(line)
+            raise RinexObsFileError(msg)
+        try:
+            flag = int(line[31])
+            num_of_records = int(line[32:35])
+            if flag > 1:
+                # events and cycle slips: one record per line
+                for _ in range(num_of_records):
+                    next_line(file_object)
+                return 0
+            sec = epoch_sec(int(line[2:6]), int(line[7:9]), int(line[10:12]),
+                            int(line[13:15]), int(line[16:18]),
+                            float(line[18:29]))
+        except (ValueError, IndexError):
+            msg = "Can't read epoch: {}.".format(line)
+            raise RinexObsFileError(msg)
+
+        for _ in range(num_of_records):
+            record = next_line(file_object)
+            system = record[0]
+            try:
+                number = int(record[1:3])
+            except ValueError:
+                msg = "Can't read satellite: {}.".format(record)
+                raise RinexObsFileError(msg)
+            rows.append((sec, system, number, record[3:]))
+        return 1
+
+    def parse_epoch_v2(self, line, file_object, rows):
+        """See parse_epoch_v3."""
+        try:
+            flag = int(line[28])
+            num_of_records = int(line[29:32])
+        except (ValueError, IndexError):
+            msg = "Can't read epoch: {}.".format(line)
+            raise RinexObsFileError(msg)
+
+        if 1 < flag < 6:
+            # events: the special records
+            for _ in range(num_of_records):
+                next_line(file_object)
+            return 0
+
+        # the list of the satellites is continued on the next lines
+        satellites = line[32:68]
+        for _ in range((num_of_records - 1) // SATS_PER_LINE_V2):
+            satellites += next_line(file_object)[32:68]
+
+        num_of_types = len(self.header.columns)
+        lines_per_sat = -(-num_of_types // OBS_PER_LINE_V2)
+        width = OBS_PER_LINE_V2 * FIELD_WIDTH
+
+        if flag == 6:
+            # cycle slips: the same format as the observations
+            for _ in range(num_of_records * lines_per_sat):
+                next_line(file_object)
+            return 0
+
+        try:
+            year = int(line[1:3])
+            year += 2000 if year < 80 else 1900
+            sec = epoch_sec(year, int(line[4:6]), int(line[7:9]),
+                            int(line[10:12]), int(line[13:15]),
+                            float(line[15:26]))
+        except ValueError:
+            msg = "Can't read epoch: {}.".format(line)
+            raise RinexObsFileError(msg)
+
+        for i in range(num_of_records):
+            sat = satellites[i * 3:i * 3 + 3]
+            system = sat[0] if sat[0] != ' ' else 'G'
+            try:
+                number = int(sat[1:])
+            except ValueError:
+                msg = "Can't read satellite: {}.".format(line)
+                raise RinexObsFileError(msg)
+            data = ''.join(next_line(file_object).ljust(width)[:width]
+                           for _ in range(lines_per_sat))
+            rows.append((sec, system, number, data))
+        return 1
+
+    def make_block(self, rows):
+        """Returns ObsBlock of the parsed rows."""
+        num_of_rows = len(rows)
+        num_of_columns = len(self.header.columns)
+
+        epoch = np.array([r[0] for r in rows], dtype=float)
+        satellite = np.array([r[1] for r in rows], dtype='<U1')
+        number = np.array([r[2] for r in rows], dtype=int)
+
+        values = np.full((num_of_rows, num_of_columns), np.nan)
+        lli = np.zeros((num_of_rows, num_of_columns), dtype=np.int8)
+        ssi = np.zeros((num_of_rows, num_of_columns), dtype=np.int8)
+
+        for system in np.unique(satellite).tolist():
+            if system not in self._index:
+                msg = 'No observation types of the system: {}.'.format(
+                    system)
+                raise RinexObsFileError(msg)
+            index = self._index[system]
+            in_system = np.flatnonzero(satellite == system)
+            sys_values, sys_lli, sys_ssi = decode_fields(
+                [rows[i][3] for i in in_system.tolist()],
+                len(index),
+            )
+            values[in_system[:, None], index] = sys_values
+            lli[in_system[:, None], index] = sys_lli
+            ssi[in_system[:, None], index] = sys_ssi
+
+        return ObsBlock(epoch, satellite, number, values, lli, ssi,
+                        self.header.columns)
+
+
+def decode_fields(data, num_of_fields):
+    """Returns the values, LLI and signal strength of the observation
+    records.
+
+    Parameters
+    ----------
+    data : list
+        str, the fields of the observations of a satellite
+    num_of_fields : int
+
+    Returns
+    -------
+    values : numpy.ndarray
+        (n, num_of_fields)
+    lli, ssi : numpy.ndarray
+        (n, num_of_fields)
+
+    Raises
+    ------
+    RinexObsFileError
+        when it can't parse the values.
+    """
+    width = num_of_fields * FIELD_WIDTH
+    text = ''.join(d.ljust(width)[:width] for d in data)
+    raw = np.frombuffer(text.encode('latin-1'), dtype=np.uint8).reshape(
+        len(data), num_of_fields, FIELD_WIDTH)
+
+    fields = np.ascontiguousarray(raw[:, :, :VALUE_WIDTH])
+    blank = np.all(fields == ord(' '), axis=2)
+    fields = fields.view('S{}'.format(VALUE_WIDTH))[:, :, 0]
+    fields[blank] = b'nan'
+    try:
+        values = fields.astype(np.float64)
+    except ValueError as error:
+        raise RinexObsFileError("Can't parse the observations: {}".format(
+            error))
+
+    indicators = raw[:, :, VALUE_WIDTH:].astype(np.int8) - ord('0')
+    indicators[(indicators < 0) | (indicators > 9)] = 0
+    return values, indicators[:, :, 0], indicators[:, :, 1]
+
+
+def rnx_obs(filename, block_size=DEFAULT_BLOCK_SIZE):
+    """Returns RinexObsFile object, see RinexObsFile.
+
+    """
+    return RinexObsFile(filename, block_size)
+
+
+def block_xyz(filename, block, time_system='G', leap_seconds=None):
+    """Returns XYZ coordinates of the satellites of the rows of the block.
+
+    Parameters
+    ----------
+    filename : str, file or orbit object
+        see coordinates.batch.satellite_xyz_many
+
+    block : ObsBlock
+
+    time_system : str, optional
+        the time system of the epochs, see ObsHeader.time_system
+
+    leap_seconds : int, optional
+        GPS - UTC; by default it is read from the navigation file when
+        needed
+
+    Returns
+    -------
+    xyz : numpy.ndarray
+        (n, 3) X, Y, Z, meters; NaN for the satellites without navigation
+        messages for the epochs.
+    """
+    is_orbit = hasattr(filename, 'satellite_xyz_many')
+    if leap_seconds is None and not is_orbit and (
+            time_system == 'UTC' or 'R' in block.satellite):
+        leap_seconds = RinexNavFile.retrieve_leap_seconds(filename)
+
+    sec = to_gps(block.epoch, time_system, leap_seconds)
+
+    xyz = np.full((len(sec), 3), np.nan)
+    for system, number, index in group_request(block.satellite,
+                                               block.number):
+        sat_sec = sec[index]
+        if not is_orbit and system in NAV_TIME_SYSTEM:
+            sat_sec = from_gps(sat_sec, NAV_TIME_SYSTEM[system],
+                               leap_seconds)
+        try:
+            xyz[index] = satellite_xyz_many(filename, system, number,
+                                            sat_sec)
+        except (NavMessageNotFoundError, SatSystemError):
+            pass
+    return xyz
@@ -0,0 +1,220 @@
+"""
+Prediction of the satellite passes.
+
+The elevation is sampled on a coarse grid for all the stations and
+satellites at once; rise and set times are refined by bisection only
+where the elevation crosses the mask, the culmination is refined by the
+golden section search.
+
+A usage example::
+
+    passes = predict_passes('brdm2510.17p', receivers, satellites, numbers,
+                            start, end, mask=10)
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from coordinates.batch import satellite_xyz_grid
+from coordinates.broadcast import RinexNavFile
+from coordinates.geodesy import receiver_frames, row_elevation
+from coordinates.geometry import geometry
+from coordinates.timescale import datetime2sec
+
+DEFAULT_STEP = 300.
+DEFAULT_MASK = 10.
+
+# seconds
+DEFAULT_TOLERANCE = 0.1
+
+GOLDEN_RATIO = (np.sqrt(5) - 1) / 2
+
+Pass = namedtuple('Pass', [
+    'station',
+    'satellite',
+    'number',
+    'rise',
+    'culmination',
+    'set',
+    'max_elevation',
+])
+Pass.__doc__ = """\
+Satellite pass over a station.
+
+station : int
+    index of the receiver
+satellite : str
+number : int
+rise, culmination, set : float
+    seconds since coordinates.timescale.GPS_EPOCH; rise (set) is NaN if
+    the satellite is above the mask at the start (end) of the range
+max_elevation : float
+    degrees
+"""
+
+
+def bisect_crossings(func, lo, hi, rising, mask, tolerance):
+    """Returns the times where func crosses the mask.
+
+    Parameters
+    ----------
+    func : callable
+        func(sec) -> elevation, vectorized
+    lo, hi : numpy.ndarray
+        (n, ) brackets of the crossings
+    rising : numpy.ndarray
+        (n, ) bool, func(lo) < mask <= func(hi)
+    mask : float
+    tolerance : float
+    """
+    lo = lo.copy()
+    hi = hi.copy()
+    while len(lo) and np.max(hi - lo) > tolerance:
+        mid = (lo + hi) / 2
+        above = func(mid) >= mask
+        to_hi = above == rising
+        hi = np.where(to_hi, mid, hi)
+        lo = np.where(to_hi, lo, mid)
+    return (lo + hi) / 2
+
+
+def golden_maximum(func, lo, hi, tolerance):
+    """Returns the times and values of the maxima of func.
+
+    """
+    a = lo.copy()
+    b = hi.copy()
+    while len(a) and np.max(b - a) > tolerance:
+        c = b - GOLDEN_RATIO * (b - a)
+        d = a + GOLDEN_RATIO * (b - a)
+        left = func(c) > func(d)
+        b = np.where(left, d, b)
+        a = np.where(left, a, c)
+    t = (a + b) / 2
+    return t, func(t)
+
+
+def predict_passes(source, receivers, satellites, numbers, start, end,
+                   step=DEFAULT_STEP, mask=DEFAULT_MASK,
+                   tolerance=DEFAULT_TOLERANCE, **kwargs):
+    """Returns the passes of the satellites over the receivers.
+
+    Parameters
+    ----------
+    source : str, file or orbit object
+        see coordinates.batch.satellite_xyz_many
+
+    receivers : array_like
+        (s, 3) X, Y, Z of the receivers, meters
+
+    satellites, numbers : array_like
+        (k, ) satellite systems and numbers
+
+    start, end : float or datetime.datetime
+        the range of the prediction
+
+    step : float, optional
+        step of the coarse grid, seconds; it must be less than the
+        shortest pass to find
+
+    mask : float, optional
+        elevation mask, degrees
+
+    tolerance : float, optional
+        accuracy of the times, seconds
+
+    kwargs
+        see coordinates.batch.satellite_xyz_grid
+
+    Returns
+    -------
+    passes : list
+        list of Pass sorted by station and culmination time
+    """
+    receivers = np.asarray(receivers, dtype=float).reshape(-1, 3)
+    satellites, numbers = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(satellites, dtype=str)),
+        np.atleast_1d(np.asarray(numbers, dtype=int)),
+    )
+    start, end = datetime2sec([start, end])
+
+    # the header is read once instead of every step of the refinement, see
+    # coordinates.batch.satellite_xyz_grid
+    is_nav = not hasattr(source, 'satellite_xyz_many')
+    if (is_nav and kwargs.get('gps_time', True) and
+            kwargs.get('leap_seconds') is None and 'R' in satellites):
+        kwargs['leap_seconds'] = RinexNavFile.retrieve_leap_seconds(source)
+
+    grid = np.arange(start, end, step)
+    # the grid is empty when start == end
+    if not grid.size or grid[-1] < end:
+        grid = np.append(grid, end)
+
+    elevation = geometry(source, receivers, satellites, numbers, grid,
+                         **kwargs).elevation
+    frames = receiver_frames(receivers)
+
+    passes = []
+    for k, (sat, num) in enumerate(zip(satellites.tolist(),
+                                       numbers.tolist())):
+        above = elevation[:, k] >= mask
+
+        def func(sec, station):
+            xyz = satellite_xyz_grid(source, sat, num, sec, **kwargs)[0]
+            return row_elevation(receivers[station], frames[station], xyz)
+
+        # crossings
+        station, index = np.nonzero(above[:, 1:] != above[:, :-1])
+        rising = ~above[station, index]
+        times = bisect_crossings(
+            lambda sec: func(sec, station),
+            grid[index],
+            grid[index + 1],
+            rising,
+            mask,
+            tolerance,
+        )
+
+        # passes: (station, rise, set, first and last index on the grid)
+        bounds = []
+        for s in range(len(receivers)):
+            in_station = station == s
+            events = list(zip(
+                times[in_station].tolist(),
+                rising[in_station].tolist(),
+                index[in_station].tolist(),
+            ))
+            rise, first = (np.nan, 0) if above[s, 0] else (None, None)
+            for t, is_rising, i in events:
+                if is_rising:
+                    rise, first = t, i + 1
+                elif rise is not None:
+                    bounds.append((s, rise, t, first, i))
+                    rise = None
+            if rise is not None:
+                bounds.append((s, rise, np.nan, first, len(grid) - 1))
+
+        if not bounds:
+            continue
+
+        # culminations
+        p_station = np.array([b[0] for b in bounds])
+        peak = np.array([
+            b[3] + np.argmax(elevation[b[0], k, b[3]:b[4] + 1])
+            for b in bounds
+        ])
+        lo = grid[np.maximum(peak - 1, 0)]
+        hi = grid[np.minimum(peak + 1, len(grid) - 1)]
+        culmination, max_elevation = golden_maximum(
+            lambda sec: func(sec, p_station),
+            lo,
+            hi,
+            tolerance,
+        )
+
+        for (s, rise, set_, _, _), t, e in zip(bounds, culmination,
+                                               max_elevation):
+            passes.append(Pass(s, sat, num, rise, t, set_, e))
+
+    passes.sort(key=lambda p: (p.station, p.culmination))
+    return passes
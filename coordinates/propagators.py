@@ -0,0 +1,109 @@
+"""
+Registry of the propagators of the broadcast ephemerides.
+
+A propagator is registered for the satellite systems and, optionally, for
+a class of their satellites (e.g. BDS GEO); the propagator of the class
+takes precedence over the propagator of the system. The built-in
+propagators are registered by coordinates.sat.
+
+A usage example::
+
+    register_propagator(
+        {'C'},
+        Propagator('my_meo', KeplerEphemeris, my_xyz, my_xyz_array),
+        satellite_class='MEO',
+    )
+"""
+from collections import namedtuple
+
+from coordinates.exceptions import SatSystemError
+
+Propagator = namedtuple('Propagator', ['name', 'compile', 'scalar', 'batch'])
+Propagator.__doc__ = """\
+Propagator of the broadcast ephemerides.
+
+name : str
+compile : callable
+    compile(message) -> compiled ephemeris, see coordinates.ephemeris
+scalar : callable
+    scalar(ephemeris, t) -> (x, y, z); ephemeris is the compiled ephemeris
+    or the message
+batch : callable
+    batch(ephemerides, t) -> (n, 3) array; ephemerides is (n, p) array
+    form of the compiled ephemerides, t is (n, ) array
+
+t is seconds since the beginning of the week for GPS-way systems and
+seconds since the message epoch for GLO-way systems, see
+coordinates.sat.find_message.
+"""
+
+# system -> class -> satellite numbers
+SATELLITE_CLASSES = dict(
+    C=dict(
+        GEO={1, 2, 3, 4, 5, 59, 60, 61, 62, 63},
+        IGSO={6, 7, 8, 9, 10, 13, 16, 38, 39, 40},
+    ),
+)
+
+# (system, class or None) -> Propagator
+PROPAGATORS = dict()
+
+
+def satellite_class(satellite, number):
+    """Returns the class of the satellite or None, see SATELLITE_CLASSES.
+
+    """
+    for name, numbers in SATELLITE_CLASSES.get(satellite, {}).items():
+        if number in numbers:
+            return name
+    return None
+
+
+def register_propagator(satellites, propagator, satellite_class=None):
+    """Registers the propagator for the satellite systems.
+
+    Parameters
+    ----------
+    satellites : iterable
+        satellite systems
+
+    propagator : Propagator
+
+    satellite_class : str, optional
+        the class of the satellites, see SATELLITE_CLASSES; by default
+        the propagator is used for all the satellites of the systems
+    """
+    for satellite in satellites:
+        PROPAGATORS[(satellite, satellite_class)] = propagator
+
+
+def find_propagator(satellite, number=None):
+    """Returns the propagator of the satellite.
+
+    Parameters
+    ----------
+    satellite : str
+        satellite system
+
+    number : int, optional
+        satellite number; if it's None the propagator of the system is
+        returned
+
+    Returns
+    -------
+    propagator : Propagator
+
+    Raises
+    ------
+    SatSystemError
+        when there is no propagator for the system.
+    """
+    if number is not None:
+        key = (satellite, satellite_class(satellite, number))
+        if key in PROPAGATORS:
+            return PROPAGATORS[key]
+
+    try:
+        return PROPAGATORS[(satellite, None)]
+    except KeyError:
+        raise SatSystemError(satellite)
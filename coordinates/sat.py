@@ -1,12 +1,35 @@
 import datetime
 from collections import defaultdict
-from functools import lru_cache
-from math import sqrt, sin, cos, atan2
+from itertools import count
+from math import sin, cos, atan2
 from operator import itemgetter
 
-from coordinates import datum
+from coordinates import datum, instrument
 from coordinates.broadcast import rnx_nav
+from coordinates.cache import file_cache
+from coordinates.ephemeris import (
+    BDS_GEO_TILT,
+    GeoEphemeris,
+    GloEphemeris,
+    KeplerEphemeris,
+)
 from coordinates.exceptions import SatSystemError, NavMessageNotFoundError
+from coordinates.kernels import (
+    bds_geo_sat_xyz_array,
+    glo_sat_xyz_array,
+    gps_sat_xyz_array,
+)
+from coordinates.propagators import (
+    Propagator,
+    find_propagator,
+    register_propagator,
+)
+from coordinates.timescale import (
+    EPOCH_START,
+    datetime2sec,
+    sec2datetime,
+    week_sec,
+)
 
 # GPS, BDS, Galileo, and IRNSS
 GPS_WAY = {'G', 'C', 'E', 'I'}
@@ -16,12 +39,25 @@ GLO_WAY = {'R', 'S', 'J'}
 
 KNOWN_SYSTEMS = GPS_WAY | GLO_WAY
 
-EPOCH_START = dict(
-    G=datetime.datetime(1980, 1, 6, 0, 0, 0),  # GPS
-    C=datetime.datetime(2006, 1, 1, 0, 0, 0),  # BDS
-    E=datetime.datetime(1999, 8, 22, 0, 0, 13),  # Galileo
-    I=datetime.datetime(1999, 8, 21, 23, 59, 47),  # IRNSS
-)
+# systems with the Keplerian elements in the message
+KEPLER_MESSAGE = GPS_WAY | {'J'}
+
+# indices in the message: IODE, toe, SV health, transmission time, and
+# fit interval for the Keplerian messages; health for the others
+IODE_INDEX = 0
+TOE_INDEX = 8
+HEALTH_INDEX = dict(G=21, E=21, C=21, I=21, J=21, R=3, S=3)
+TRANSMISSION_INDEX = 24
+FIT_INTERVAL_INDEX = 25
+
+# the fit interval is transmitted by GPS and QZSS only: hours for GPS
+# (0 means 4 hours), the flag for QZSS
+FIT_INTERVAL_SYSTEMS = {'G', 'J'}
+MIN_FIT_INTERVAL = 4
+
+# QZSS: 0 means 2 hours, 1 means more than 2 hours (the length isn't
+# transmitted); other values are taken as hours
+QZSS_FIT_INTERVAL = {0: 2, 1: None}
 
 
 def get_week_sec(epoch, epoch_start):
@@ -61,10 +97,7 @@ def get_dt(msg_epoch, obs_epoch):
     """Returns delta between msg_epoch and obs_epoch in seconds.
 
     """
-    if obs_epoch >= msg_epoch:
-        return (obs_epoch - msg_epoch).seconds
-    else:
-        return (msg_epoch - obs_epoch).seconds * -1
+    return (obs_epoch - msg_epoch).total_seconds()
 
 
 def reference_time(satellite, epoch):
@@ -108,30 +141,51 @@ def find_message(nav_data, satellite, number, epoch):
     """Returns a navigation message and timedelta between the message
     time and the epoch.
 
+    The epoch is either datetime.datetime or the number of seconds since
+    coordinates.timescale.GPS_EPOCH in the system time.
+
+    """
+    dt, record = find_record(nav_data, satellite, number, epoch)
+    return dt, record['message']
+
+
+def find_record(nav_data, satellite, number, epoch):
+    """Returns a navigation record and timedelta between the message
+    time and the epoch, see find_message.
+
     """
     if satellite not in KNOWN_SYSTEMS:
         raise SatSystemError(satellite)
 
-    try:
-        satellite_messages = nav_data[(satellite, number)]
-    except KeyError:
+    # nav_data is shared by the cache: the lookup mustn't add the keys
+    satellite_messages = nav_data.get((satellite, number))
+    if not satellite_messages:
         msg = 'No such satellite: {sat}{num}'.format(
             sat=satellite,
             num=number,
         )
         raise NavMessageNotFoundError(msg)
 
+    is_datetime = isinstance(epoch, datetime.datetime)
+
     # Returns the first for GPS, BDS, Galileo, and IRNSS
     if satellite in GPS_WAY:
         message = satellite_messages[0]
         # время с начала недели
-        dt = reference_time(satellite, epoch)
+        if is_datetime:
+            dt = reference_time(satellite, epoch)
+        else:
+            dt = week_sec(epoch, satellite)
 
     # Returns the nearest for GLONASS, SBAS, and QZSS
     elif satellite in GLO_WAY:
-        message = nearest_message(satellite_messages, epoch)
         # разница между сообщением и набл
-        dt = get_dt(message['epoch'], epoch)
+        if is_datetime:
+            message = nearest_message(satellite_messages, epoch)
+            dt = get_dt(message['epoch'], epoch)
+        else:
+            message = nearest_message(satellite_messages, sec2datetime(epoch))
+            dt = epoch - datetime2sec(message['epoch'])
     else:
         raise NavMessageNotFoundError(
             'Navigation message not found: {sat}{num} {epoch}'.format(
@@ -141,7 +195,7 @@ def find_message(nav_data, satellite, number, epoch):
             )
         )
 
-    return dt, message['message']
+    return dt, message
 
 
 def gps_sat_xyz(ephemeris, sec):
@@ -149,8 +203,8 @@ def gps_sat_xyz(ephemeris, sec):
 
     Parameters
     ----------
-    ephemeris : list
-        list with ephemeris
+    ephemeris : list or KeplerEphemeris
+        list with ephemeris or the compiled ephemeris
 
     sec : float
         amount of seconds since the start of the week, seconds
@@ -168,58 +222,55 @@ def gps_sat_xyz(ephemeris, sec):
     # threshold
     # e_ps = 2e-15
 
-    crs = ephemeris[1]
-    dn = ephemeris[2]
-    m0 = ephemeris[3]
-    cuc = ephemeris[4]
-    e0 = ephemeris[5]
-    cus = ephemeris[6]
-    a0 = ephemeris[7] ** 2
-    toe = ephemeris[8]
-    cic = ephemeris[9]
-    omega_0 = ephemeris[10]
-    cis = ephemeris[11]
-    i0 = ephemeris[12]
-    crc = ephemeris[13]
-    w0 = ephemeris[14]
-    omega_dot = ephemeris[15]
-    i_dot = ephemeris[16]
-
-    tk = sec - toe
+    if not isinstance(ephemeris, KeplerEphemeris):
+        ephemeris = KeplerEphemeris(ephemeris)
+
+    e0 = ephemeris.e0
+    a0 = ephemeris.a0
+
+    tk = sec - ephemeris.toe
 
     if tk > 302400:
         tk -= 604800
     elif tk < -302400:
         tk += 604800
 
-    n = sqrt(datum.mu / a0 ** 3) + dn
-    mk = m0 + n * tk
+    mk = ephemeris.m0 + ephemeris.n * tk
 
     ek = mk
     ek_1 = ek + 1
 
-    prv_d_ek = 0
-    cur_d_ek = 1
     #   while ( abs(ek-ek_1) > e_ps ):
-    while prv_d_ek != cur_d_ek:
+    # until the correction stops changing
+    for iterations in count(1):
         prv_d_ek = abs(ek - ek_1)
         ek_1 = ek
         ek = ek_1 - (ek_1 - e0 * sin(ek_1) - mk) / (1 - e0 * cos(ek_1))
         cur_d_ek = abs(ek - ek_1)
-        # print prv_d_ek, cur_d_ek
+        if prv_d_ek == cur_d_ek:
+            break
+
+    if instrument.enabled:
+        instrument.count('kepler.solutions')
+        instrument.count('kepler.iterations', iterations)
 
-    fs = (sqrt(1 - e0 ** 2) * sin(ek)) / (1 - e0 * cos(ek))
+    fs = (ephemeris.sqrt_1_e2 * sin(ek)) / (1 - e0 * cos(ek))
     fc = (cos(ek) - e0) / (1 - e0 * cos(ek))
     tettak = atan2(fs, fc)
 
-    u0k = tettak + w0
-    uk = u0k + cuc * cos(2 * u0k) + cus * sin(2 * u0k)
+    u0k = tettak + ephemeris.w0
+    uk = (u0k + ephemeris.cuc * cos(2 * u0k) +
+          ephemeris.cus * sin(2 * u0k))
 
-    rk = a0 * (1 + e0 * cos(ek)) + crc * cos(2 * u0k) + crs * sin(2 * u0k)
+    rk = (a0 * (1 + e0 * cos(ek)) + ephemeris.crc * cos(2 * u0k) +
+          ephemeris.crs * sin(2 * u0k))
 
-    ik = i0 + (cic * cos(2 * u0k) + cis * sin(2 * u0k)) + i_dot * tk
+    ik = (ephemeris.i0 +
+          (ephemeris.cic * cos(2 * u0k) + ephemeris.cis * sin(2 * u0k)) +
+          ephemeris.i_dot * tk)
 
-    omega_k = omega_0 + (omega_dot - datum.omega) * tk - datum.omega * toe
+    omega_k = (ephemeris.omega_0 + ephemeris.omega_rate * tk -
+               ephemeris.omega_toe)
 
     x = rk * (cos(uk) * cos(omega_k) - sin(uk) * sin(omega_k) * cos(ik))
     y = rk * (cos(uk) * sin(omega_k) + sin(uk) * cos(omega_k) * cos(ik))
@@ -233,8 +284,8 @@ def glo_sat_xyz(ephemeris, dt):
 
     Parameters
     ----------
-    ephemeris : list
-        list with ephemeris
+    ephemeris : list or GloEphemeris
+        list with ephemeris or the compiled ephemeris
 
     dt : float
         difference between time of the ephemeris and observation time, seconds
@@ -249,39 +300,32 @@ def glo_sat_xyz(ephemeris, dt):
         Z, meters
     """
 
-    # meters
-    x0 = ephemeris[0] * 1000
-    vX = ephemeris[1] * 1000
-    aX = ephemeris[2] * 1000
+    if not isinstance(ephemeris, GloEphemeris):
+        ephemeris = GloEphemeris(ephemeris)
 
-    y0 = ephemeris[4] * 1000
-    vY = ephemeris[5] * 1000
-    aY = ephemeris[6] * 1000
-
-    z0 = ephemeris[8] * 1000
-    vZ = ephemeris[9] * 1000
-    aZ = ephemeris[10] * 1000
+    # meters
+    x0, vX, aX = ephemeris.x0, ephemeris.vx, ephemeris.ax
+    y0, vY, aY = ephemeris.y0, ephemeris.vy, ephemeris.ay
+    z0, vZ, aZ = ephemeris.z0, ephemeris.vz, ephemeris.az
 
     if dt == 0:
         return x0, y0, z0
 
-    r = sqrt(x0 ** 2 + y0 ** 2 + z0 ** 2)
-
-    # - GLONASS ICD ver 5.1, 2008.
-    first_sd = -(datum.mu / r ** 3)
-    second_sd = 3 / 2. * datum.J0sqd * datum.mu * datum.ae ** 2 / r ** 5
+    r2 = ephemeris.r2
+    first_sd = ephemeris.first_sd
+    second_sd = ephemeris.second_sd
 
     # - x, y, z
     fx = lambda x, z: (first_sd * x - second_sd * x *
-                       (1 - 5 * z ** 2 / r ** 2) +
+                       (1 - 5 * z ** 2 / r2) +
                        datum.omega ** 2 * x + 2 * datum.omega * vY + aX)
 
     fy = lambda y, z: (first_sd * y - second_sd * y *
-                       (1 - 5 * z ** 2 / r ** 2) +
+                       (1 - 5 * z ** 2 / r2) +
                        datum.omega ** 2 * y - 2 * datum.omega * vX + aY)
 
     fz = lambda z: (first_sd * z - second_sd * z *
-                    (3 - 5 * z ** 2 / r ** 2) + aZ)
+                    (3 - 5 * z ** 2 / r2) + aZ)
 
     x = dict()
     kx = dict()
@@ -325,48 +369,282 @@ def glo_sat_xyz(ephemeris, dt):
     return xyz
 
 
-def xyz_calculator(satellite):
+def bds_geo_sat_xyz(ephemeris, sec):
+    """Returns geocentric coordinates XYZ of the BDS GEO satellite
+    (BDS ICD, 5.2.4.12).
+
+    Parameters
+    ----------
+    ephemeris : list or GeoEphemeris
+        list with ephemeris or the compiled ephemeris
+
+    sec : float
+        amount of seconds since the start of the week, seconds
+
+    Returns
+    -------
+    x : float
+        X, meters
+    y : float
+        Y, meters
+    z : float
+        Z, meters
+    """
+    if not isinstance(ephemeris, GeoEphemeris):
+        ephemeris = GeoEphemeris(ephemeris)
+
+    # coordinates in the inertial frame of the elements
+    xg, yg, zg = gps_sat_xyz(ephemeris, sec)
+
+    tk = sec - ephemeris.toe
+    if tk > 302400:
+        tk -= 604800
+    elif tk < -302400:
+        tk += 604800
+
+    # R_X(-5 degrees)
+    y = cos(BDS_GEO_TILT) * yg + sin(BDS_GEO_TILT) * zg
+    z = -sin(BDS_GEO_TILT) * yg + cos(BDS_GEO_TILT) * zg
+
+    # R_Z(omega * tk)
+    angle = datum.omega * tk
+    x = cos(angle) * xg + sin(angle) * y
+    y = -sin(angle) * xg + cos(angle) * y
+
+    return x, y, z
+
+
+KEPLER_PROPAGATOR = Propagator(
+    'kepler',
+    KeplerEphemeris,
+    gps_sat_xyz,
+    gps_sat_xyz_array,
+)
+BDS_GEO_PROPAGATOR = Propagator(
+    'bds_geo',
+    GeoEphemeris,
+    bds_geo_sat_xyz,
+    bds_geo_sat_xyz_array,
+)
+GLO_PROPAGATOR = Propagator(
+    'glo',
+    GloEphemeris,
+    glo_sat_xyz,
+    glo_sat_xyz_array,
+)
+
+register_propagator(GPS_WAY, KEPLER_PROPAGATOR)
+register_propagator({'C'}, BDS_GEO_PROPAGATOR, satellite_class='GEO')
+register_propagator(GLO_WAY, GLO_PROPAGATOR)
+
+
+def xyz_calculator(satellite, number=None):
     """Возвращает калькулятор XYZ в зависимости от спутниковой системы.
 
+    The calculator is the scalar entry of the propagator, see
+    coordinates.propagators.find_propagator.
+
     """
-    if satellite in GPS_WAY:
-        return gps_sat_xyz
-    elif satellite in GLO_WAY:
-        return glo_sat_xyz
+    return find_propagator(satellite, number).scalar
+
+
+def compile_ephemeris(satellite, message, number=None):
+    """Returns the compiled ephemeris of the message according to the
+    satellite system, see coordinates.ephemeris and
+    coordinates.propagators.find_propagator.
+
+    """
+    return find_propagator(satellite, number).compile(message)
+
+
+class NavData(defaultdict):
+    """Navigation data: lists of the records keyed by (satellite, number).
+    The data returned by read_nav_data is frozen (see freeze): the absent
+    satellite raises KeyError.
+
+    Attributes
+    ----------
+    dropped : dict
+        the number of the dropped records by reason: 'duplicate',
+        'unhealthy', and 'fit_interval'
+    errors : list
+        coordinates.broadcast.NavParseError of the malformed records
+        skipped by the parser, see read_nav_data
+    """
+
+    def __init__(self):
+        super().__init__(list)
+        self.dropped = dict(duplicate=0, unhealthy=0, fit_interval=0)
+        self.errors = []
+
+    def freeze(self):
+        """Stops adding the absent keys on the lookup."""
+        self.default_factory = None
+
+
+def message_key(satellite, record):
+    """Returns the key which is the same for the duplicates of the
+    navigation record: (epoch, IODE, toe) for the Keplerian messages,
+    epoch for the others.
+
+    """
+    if satellite in KEPLER_MESSAGE:
+        message = record['message']
+        return record['epoch'], message[IODE_INDEX], message[TOE_INDEX]
+    return record['epoch']
+
+
+def is_healthy(satellite, message):
+    """Returns False if the SV health field of the message is not zero.
+
+    """
+    index = HEALTH_INDEX.get(satellite)
+    return index is None or not message[index]
+
+
+def is_within_fit_interval(satellite, message):
+    """Returns False if the message was transmitted outside of its fit
+    interval. Always True for the systems without the fit interval and for
+    the QZSS messages with the flag of the fit interval longer than 2
+    hours.
+
+    """
+    if satellite not in FIT_INTERVAL_SYSTEMS:
+        return True
+
+    value = message[FIT_INTERVAL_INDEX]
+    if satellite == 'J':
+        hours = QZSS_FIT_INTERVAL.get(value, value)
+        if hours is None:
+            return True
     else:
-        raise SatSystemError(satellite)
+        hours = max(value, MIN_FIT_INTERVAL)
 
+    dt = message[TRANSMISSION_INDEX] - message[TOE_INDEX]
+    if dt > 302400:
+        dt -= 604800
+    elif dt < -302400:
+        dt += 604800
 
-@lru_cache(maxsize=8)
-def read_nav_data(filename):
+    return abs(dt) <= hours * 3600 / 2
+
+
+@file_cache(maxsize=8, single_flight=True)
+def read_nav_data(filename, healthy_only=False, check_fit_interval=False,
+                  errors='strict'):
     """Returns dictionary which contains navigation data from the file.
     Navigation records are sorted by epoch.
 
+    Every record holds the epoch, the message, and the compiled ephemeris
+    of the message (see compile_ephemeris).
+
+    Duplicates of the records (see message_key), which are typical for the
+    merged files, are dropped; the first one is kept.
+
+    Parameters
+    ----------
+    filename : str or file
+
+    healthy_only : bool, optional
+        drop the records of the unhealthy satellites, see is_healthy
+
+    check_fit_interval : bool, optional
+        drop the records transmitted outside of the fit interval, see
+        is_within_fit_interval
+
+    errors : str, optional
+        'strict' -- raise RinexNavFileError on the malformed record;
+        'skip' -- skip the malformed records and keep going, the skipped
+        records are listed in NavData.errors, see
+        coordinates.broadcast.RinexNavFile.iter_bytes
+
+    Returns
+    -------
+    nav_data : NavData
     """
-    nav_data = defaultdict(list)
-    for row in rnx_nav(filename):
+    started = instrument.start()
+
+    nav_file = rnx_nav(filename)
+    rows = nav_file.iter_bytes(errors)
+    if instrument.enabled:
+        rows = instrument.parsed(filename, rows)
+
+    nav_data = NavData()
+    seen = set()
+    for row in rows:
         satellite, number, epoch, sv_clock, message = row
         record = {'epoch': epoch, 'message': message}
+
+        key = (satellite, number, message_key(satellite, record))
+        if key in seen:
+            nav_data.dropped['duplicate'] += 1
+            continue
+        seen.add(key)
+
+        if healthy_only and not is_healthy(satellite, message):
+            nav_data.dropped['unhealthy'] += 1
+            continue
+
+        if (check_fit_interval and
+                not is_within_fit_interval(satellite, message)):
+            nav_data.dropped['fit_interval'] += 1
+            continue
+
+        record['ephemeris'] = compile_ephemeris(satellite, message, number)
         nav_data[(satellite, number)].append(record)
 
+    nav_data.errors = nav_file.errors
+
     for sat in nav_data:
         nav_data[sat].sort(key=itemgetter('epoch'))
+    nav_data.freeze()
 
+    instrument.stop('read_nav_data', started)
     return nav_data
 
 
-@lru_cache(maxsize=None)
-def satellite_xyz(filename, satellite, number, epoch):
+@file_cache(maxsize=None, pass_key=True)
+def satellite_xyz(file_key, satellite, number, epoch):
     """Returns XYZ coordinates of the satellite with number
 
+    The epoch is either datetime.datetime or the number of seconds since
+    coordinates.timescale.GPS_EPOCH in the system time, see
+    coordinates.timescale. Use coordinates.batch.satellite_xyz_many to
+    compute coordinates for arrays of epochs.
+
+    Instead of the navigation file an orbit object (e.g.
+    coordinates.sp3.SP3Orbits) can be passed; such object provides
+    satellite_xyz_many(satellite, number, epoch) method.
+
+    The coordinates of BDS GEO satellites (C01-C05, C59-C63) are computed
+    by the GEO algorithm of the BDS ICD (see bds_geo_sat_xyz); before
+    v1.1.0 they were computed as for other satellites and differed by
+    thousands of kilometers.
+
     """
-    calculate = xyz_calculator(satellite)
-    data = read_nav_data(filename)
-    dt, message = find_message(
+    filename = file_key.filename
+    if hasattr(filename, 'satellite_xyz_many'):
+        xyz = filename.satellite_xyz_many(satellite, number, epoch)[0]
+        return tuple(xyz.tolist())
+
+    calculate = xyz_calculator(satellite, number)
+    # the key of the file is computed once
+    data = read_nav_data.keyed(file_key)
+
+    if instrument.enabled:
+        started = instrument.start()
+        dt, record = find_record(data, satellite, number, epoch)
+        started = instrument.stop('find_message', started)
+        xyz = calculate(record['ephemeris'], dt)
+        instrument.stop('propagate', started)
+        instrument.count('propagate.rows')
+        return xyz
+
+    dt, record = find_record(
         data,
         satellite,
         number,
         epoch,
     )
-    xyz = calculate(message, dt)
+    xyz = calculate(record['ephemeris'], dt)
     return xyz
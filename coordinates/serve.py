@@ -0,0 +1,497 @@
+"""
+Local orbit-query server.
+
+The server keeps the navigation data of the files in memory and answers
+JSON requests over HTTP::
+
+    $ python -m coordinates.serve brdm2510.17p brdm2520.17p --port 8057
+
+    POST /xyz
+        {"nav": "brdm2510.17p", "satellite": ["G", "R"], "number": [1, 5],
+         "epoch": ["2017-09-08T01:50:00", "2017-09-08T01:50:00"]}
+        -> {"xyz": [[x, y, z], [x, y, z]]}
+
+    POST /azel
+        the same with "receiver": [x, y, z]
+        -> {"azimuth": [...], "elevation": [...]}, degrees
+
+    GET /stats
+        -> coordinates.instrument.stats() and "server": the requests,
+           the batches, the latency, and the throughput
+
+"nav" is the name of the file given to the server; it can be omitted when
+the server has one file. The epochs are seconds since GPS_EPOCH in the
+system time or ISO 8601 strings (see coordinates.batch.satellite_xyz_many);
+the parameters are broadcast against each other. The file modified on the
+disk is read again.
+
+The concurrent requests are collected during the batch window and
+computed by one call of the vectorized propagators per file (see
+coordinates.batch.nav_arrays_xyz), so a lone request waits for the window.
+
+The server listens on 127.0.0.1 by default and has no authentication;
+don't expose it to the network.
+"""
+import argparse
+import json
+import logging
+import os
+import queue
+import threading
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from time import perf_counter
+
+import numpy as np
+
+from coordinates import __version__, instrument
+from coordinates.batch import broadcast_request, nav_arrays_xyz
+from coordinates.batch import read_nav_arrays
+from coordinates.cache import cache_key
+from coordinates.exceptions import CoordinatesException
+from coordinates.geodesy import receiver_frames, row_azimuth_elevation
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8057
+
+# the requests are collected for BATCH_WINDOW seconds or until the batch
+# has MAX_BATCH_ROWS rows
+BATCH_WINDOW = 0.002
+MAX_BATCH_ROWS = 100000
+
+# the number of the last requests used for the latency percentiles
+LATENCY_SAMPLES = 10000
+LATENCY_PERCENTILES = (50, 90, 99)
+
+
+class NavStore():
+    """Navigation data of the files kept in memory, see
+    coordinates.batch.read_nav_arrays.
+
+    Parameters
+    ----------
+    files : list of str
+        paths; the files are referred by their names (basenames)
+    """
+
+    def __init__(self, files):
+        self.paths = OrderedDict()
+        for path in files:
+            name = os.path.basename(path)
+            if name in self.paths:
+                raise ValueError('Duplicate file name: {}'.format(name))
+            self.paths[name] = path
+        self._arrays = dict()
+        self._lock = threading.Lock()
+
+    def name(self, nav=None):
+        """Returns the name of the file, the only one if nav is None."""
+        if nav is None:
+            if len(self.paths) != 1:
+                raise ValueError('"nav" is required: {}'.format(
+                    ', '.join(self.paths)))
+            return next(iter(self.paths))
+        if nav not in self.paths:
+            raise ValueError('Unknown navigation file: {}'.format(nav))
+        return nav
+
+    def arrays(self, name):
+        """Returns the navigation data of the file; the file is read again
+        when it is modified.
+
+        """
+        path = self.paths[name]
+        key = cache_key(path)
+        with self._lock:
+            entry = self._arrays.get(name)
+            if entry is None or entry[0] != key:
+                entry = key, read_nav_arrays(path)
+                self._arrays[name] = entry
+        return entry[1]
+
+    def load(self):
+        """Reads all the files."""
+        for name in self.paths:
+            self.arrays(name)
+
+
+class ServerStats():
+    """Counters and latency of the server; the values are also recorded by
+    coordinates.instrument ('serve.*') when it is enabled.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = perf_counter()
+        self.requests = 0
+        self.errors = 0
+        self.rows = 0
+        self.batches = 0
+        self.batched_requests = 0
+        self.batch_time = 0.
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def request(self, seconds, rows, error=False):
+        """Records the handled request."""
+        with self._lock:
+            self.requests += 1
+            self.errors += error
+            self.rows += rows
+            self.latencies.append(seconds)
+        instrument.count('serve.requests')
+        instrument.count('serve.rows', rows)
+        instrument.add_time('serve.latency', seconds)
+
+    def batch(self, requests, seconds):
+        """Records the computed batch."""
+        with self._lock:
+            self.batches += 1
+            self.batched_requests += requests
+            self.batch_time += seconds
+        instrument.count('serve.batches')
+        instrument.add_time('serve.propagate', seconds)
+
+    def snapshot(self):
+        """Returns the statistics.
+
+        Returns
+        -------
+        snapshot : dict
+            uptime : float
+                seconds
+            requests, errors, rows, batches : int
+            requests_per_batch : float or None
+            requests_per_second, rows_per_second : float
+                since the start
+            batch_time : float
+                cumulative time of the computation, seconds
+            latency : dict
+                mean, max, and p50, p90, p99 of the last requests,
+                seconds
+        """
+        with self._lock:
+            uptime = perf_counter() - self.started
+            latencies = np.array(self.latencies)
+            snapshot = dict(
+                uptime=uptime,
+                requests=self.requests,
+                errors=self.errors,
+                rows=self.rows,
+                batches=self.batches,
+                requests_per_batch=(self.batched_requests / self.batches
+                                    if self.batches else None),
+                requests_per_second=self.requests / uptime,
+                rows_per_second=self.rows / uptime,
+                batch_time=self.batch_time,
+            )
+
+        latency = dict.fromkeys(
+            ['mean', 'max'] + ['p{}'.format(p) for p in LATENCY_PERCENTILES])
+        if latencies.size:
+            latency['mean'] = float(latencies.mean())
+            latency['max'] = float(latencies.max())
+            for p in LATENCY_PERCENTILES:
+                latency['p{}'.format(p)] = float(np.percentile(latencies, p))
+        snapshot['latency'] = latency
+        return snapshot
+
+
+class Job():
+    """The request waiting for the batch."""
+    __slots__ = ('name', 'satellite', 'number', 'sec', 'done', 'result',
+                 'error')
+
+    def __init__(self, name, satellite, number, sec):
+        self.name = name
+        self.satellite = satellite
+        self.number = number
+        self.sec = sec
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class Batcher():
+    """Collects the concurrent requests and computes them by batches in the
+    background thread.
+
+    Parameters
+    ----------
+    store : NavStore
+    stats : ServerStats
+    window : float, optional
+        seconds
+    max_rows : int, optional
+    """
+
+    def __init__(self, store, stats, window=BATCH_WINDOW,
+                 max_rows=MAX_BATCH_ROWS):
+        self.store = store
+        self.stats = stats
+        self.window = window
+        self.max_rows = max_rows
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run,
+                                       name='coordinates-batcher')
+        self.thread.daemon = True
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.queue.put(None)
+        self.thread.join()
+
+    def submit(self, name, satellite, number, sec):
+        """Returns XYZ coordinates of the satellites, see
+        coordinates.batch.nav_arrays_xyz; waits for the batch.
+
+        """
+        job = Job(name, satellite, number, sec)
+        self.queue.put(job)
+        job.done.wait()
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def collect(self):
+        """Returns the jobs of the next batch or None on stop."""
+        job = self.queue.get()
+        if job is None:
+            return None
+        jobs = [job]
+        rows = len(job.sec)
+        deadline = perf_counter() + self.window
+        while rows < self.max_rows:
+            timeout = deadline - perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                job = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if job is None:
+                # stop after the batch
+                self.queue.put(None)
+                break
+            jobs.append(job)
+            rows += len(job.sec)
+        return jobs
+
+    def run(self):
+        while True:
+            jobs = self.collect()
+            if jobs is None:
+                return
+            groups = OrderedDict()
+            for job in jobs:
+                groups.setdefault(job.name, []).append(job)
+            for name, group in groups.items():
+                try:
+                    self.compute(name, group)
+                finally:
+                    for job in group:
+                        job.done.set()
+
+    def compute(self, name, jobs):
+        """Computes the jobs of the file by one call."""
+        try:
+            xyz = self.propagate(name, jobs)
+        except Exception as error:
+            if len(jobs) == 1:
+                jobs[0].error = error
+                return
+            # the failed requests are found one by one
+            for job in jobs:
+                self.compute(name, [job])
+            return
+
+        bounds = np.cumsum([len(job.sec) for job in jobs])[:-1]
+        for job, result in zip(jobs, np.split(xyz, bounds)):
+            job.result = result
+
+    def propagate(self, name, jobs):
+        started = perf_counter()
+        xyz = nav_arrays_xyz(
+            self.store.arrays(name),
+            np.concatenate([job.satellite for job in jobs]),
+            np.concatenate([job.number for job in jobs]),
+            np.concatenate([job.sec for job in jobs]),
+        )
+        self.stats.batch(len(jobs), perf_counter() - started)
+        return xyz
+
+
+def parse_epoch(epoch):
+    """Returns the epochs of the request: numbers or datetime64 values."""
+    epoch = np.asarray(epoch)
+    if epoch.dtype.kind in 'US':
+        return epoch.astype('datetime64[us]')
+    return epoch.astype(float)
+
+
+class OrbitServer(ThreadingMixIn, HTTPServer):
+    """HTTP server of the orbit queries, see make_server."""
+    daemon_threads = True
+
+    def __init__(self, address, store, window=BATCH_WINDOW,
+                 max_rows=MAX_BATCH_ROWS):
+        self.store = store
+        self.stats = ServerStats()
+        self.batcher = Batcher(store, self.stats, window, max_rows)
+        HTTPServer.__init__(self, address, OrbitRequestHandler)
+        self.batcher.start()
+
+    def server_close(self):
+        HTTPServer.server_close(self)
+        self.batcher.stop()
+
+    def query(self, kind, query):
+        """Returns the response to the query and the number of its rows.
+
+        Parameters
+        ----------
+        kind : str
+            'xyz' or 'azel'
+        query : dict
+        """
+        if not isinstance(query, dict):
+            raise ValueError('The query must be an object')
+        name = self.store.name(query.get('nav'))
+        satellite, number, sec = broadcast_request(
+            query['satellite'],
+            query['number'],
+            parse_epoch(query['epoch']),
+        )
+        if kind == 'azel':
+            receiver = np.asarray(query['receiver'], dtype=float).reshape(3)
+
+        xyz = self.batcher.submit(name, satellite, number, sec)
+
+        if kind == 'xyz':
+            return dict(xyz=xyz.tolist()), len(sec)
+        azimuth, elevation = row_azimuth_elevation(
+            receiver, receiver_frames(receiver)[0], xyz)
+        response = dict(azimuth=azimuth.tolist(),
+                        elevation=elevation.tolist())
+        return response, len(sec)
+
+    def snapshot(self):
+        """Returns the statistics, see coordinates.instrument.stats."""
+        snapshot = instrument.stats()
+        snapshot['server'] = self.stats.snapshot()
+        snapshot['server']['files'] = list(self.store.paths)
+        return snapshot
+
+
+class OrbitRequestHandler(BaseHTTPRequestHandler):
+    server_version = 'coordinates/{}'.format(__version__)
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path != '/stats':
+            self.send_json(404, dict(error='Not found'))
+            return
+        self.send_json(200, self.server.snapshot())
+
+    def do_POST(self):
+        kind = self.path.lstrip('/')
+        if kind not in ('xyz', 'azel'):
+            self.send_json(404, dict(error='Not found'))
+            return
+
+        started = perf_counter()
+        rows = 0
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            query = json.loads(self.rfile.read(length).decode('utf-8'))
+            response, rows = self.server.query(kind, query)
+            status = 200
+        except KeyError as error:
+            response = dict(error='Missing field: {}'.format(error))
+            status = 400
+        except (ValueError, TypeError, CoordinatesException) as error:
+            response = dict(error=str(error))
+            status = 400
+        except Exception as error:
+            LOGGER.exception('Failed to handle the request')
+            response = dict(error=str(error))
+            status = 500
+
+        self.send_json(status, response)
+        self.server.stats.request(perf_counter() - started, rows,
+                                  status != 200)
+
+    def send_json(self, status, value):
+        body = json.dumps(value).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        LOGGER.debug('%s - %s', self.address_string(), format % args)
+
+
+def make_server(files, host=DEFAULT_HOST, port=DEFAULT_PORT,
+                window=BATCH_WINDOW, max_rows=MAX_BATCH_ROWS):
+    """Returns the server with the navigation files loaded; call
+    serve_forever to start it, shutdown and server_close to stop.
+
+    Parameters
+    ----------
+    files : list of str
+        navigation files
+    host : str, optional
+    port : int, optional
+        0 -- any free port, see server_address
+    window : float, optional
+        batch window, seconds
+    max_rows : int, optional
+        the maximum number of rows of the batch
+
+    Returns
+    -------
+    server : OrbitServer
+    """
+    store = NavStore(files)
+    store.load()
+    return OrbitServer((host, port), store, window, max_rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m coordinates.serve',
+        description='Local server of the satellite positions.',
+    )
+    parser.add_argument('files', nargs='+', help='navigation files')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--window', type=float, default=BATCH_WINDOW,
+                        help='batch window, seconds')
+    parser.add_argument('--max-rows', type=int, default=MAX_BATCH_ROWS,
+                        help='the maximum number of rows of the batch')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    instrument.enable()
+
+    server = make_server(args.files, args.host, args.port, args.window,
+                         args.max_rows)
+    LOGGER.info('Serving %s on http://%s:%d', ', '.join(server.store.paths),
+                *server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,344 @@
+"""
+Columnar output of the batch results.
+
+The sinks write chunks of columns (numpy arrays) into Parquet or Feather
+files (requires pyarrow, ``pip install coordinates[arrow]``) or HDF5
+files (requires h5py, ``pip install coordinates[hdf5]``). Numeric and
+string columns are passed to the writers without conversion into Python
+objects; 2-D columns such as (n, 3) XYZ become fixed size lists (Arrow)
+or 2-D datasets (HDF5).
+
+A usage example::
+
+    with ParquetSink('orbits.parquet') as sink:
+        write_orbits(sink, 'brdm2510.17p', satellites, numbers, epochs)
+"""
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+import numpy as np
+
+from coordinates.batch import broadcast_request, satellite_xyz_many
+from coordinates.geodesy import xyz2lbh_array
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+try:
+    import h5py
+except ImportError:
+    h5py = None
+
+# rows per chunk
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+
+class ColumnSink(ABC):
+    """The base class of the sinks.
+
+    Parameters
+    ----------
+    filename : str
+        output file
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def write(self, columns):
+        """Writes a chunk of the columns.
+
+        Parameters
+        ----------
+        columns : mapping
+            name -> numpy.ndarray; all the arrays must have the same length
+
+        Raises
+        ------
+        ValueError
+            when the lengths of the columns differ.
+        """
+        columns = OrderedDict(
+            (name, np.ascontiguousarray(value))
+            for name, value in columns.items()
+        )
+        lengths = {len(value) for value in columns.values()}
+        if len(lengths) != 1:
+            raise ValueError('The columns must have the same length.')
+
+        self.write_columns(columns)
+        self.rows += lengths.pop()
+
+    @abstractmethod
+    def write_columns(self, columns):
+        """Writes the checked chunk of the columns, see write."""
+
+    def close(self):
+        pass
+
+
+def strings_to_arrow(array):
+    """Returns pyarrow string array for the numpy array of ASCII strings
+    ('U' or 'S'); the values are taken from the numpy buffer without
+    Python objects.
+
+    """
+    array = np.ascontiguousarray(array.reshape(-1).astype('S'))
+    width = array.dtype.itemsize
+    # numpy drops the trailing zero bytes of the fixed size strings
+    lengths = np.char.str_len(array)
+    chars = array.view(np.uint8).reshape(len(array), width)
+    data = chars[np.arange(width) < lengths[:, np.newaxis]]
+
+    offsets = np.zeros(len(array) + 1, dtype=np.int32)
+    np.cumsum(lengths, out=offsets[1:])
+    return pyarrow.StringArray.from_buffers(
+        len(array), pyarrow.py_buffer(offsets), pyarrow.py_buffer(data))
+
+
+def to_arrow(array):
+    """Returns pyarrow array for the numpy array. Numeric arrays are not
+    copied.
+
+    """
+    if array.dtype.kind in 'US':
+        return strings_to_arrow(array)
+    if array.ndim == 1:
+        return pyarrow.array(array)
+    values = pyarrow.array(array.reshape(-1))
+    return pyarrow.FixedSizeListArray.from_arrays(values, array.shape[1])
+
+
+class ArrowSink(ColumnSink):
+    """The base class of pyarrow sinks.
+
+    """
+
+    def __init__(self, filename):
+        if pyarrow is None:
+            raise ImportError(
+                'pyarrow is required: pip install coordinates[arrow]'
+            )
+        super().__init__(filename)
+        self.writer = None
+
+    @abstractmethod
+    def new_writer(self, schema):
+        """Returns the pyarrow writer of the file for the schema."""
+
+    def write_columns(self, columns):
+        batch = pyarrow.RecordBatch.from_arrays(
+            [to_arrow(value) for value in columns.values()],
+            names=list(columns),
+        )
+        if self.writer is None:
+            self.writer = self.new_writer(batch.schema)
+        self.writer.write_batch(batch)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+class ParquetSink(ArrowSink):
+    """Writes the columns into the Parquet file.
+
+    Parameters
+    ----------
+    filename : str
+        output file
+
+    compression : str, optional
+        see pyarrow.parquet.ParquetWriter
+    """
+
+    def __init__(self, filename, compression='snappy'):
+        super().__init__(filename)
+        self.compression = compression
+
+    def new_writer(self, schema):
+        return pyarrow.parquet.ParquetWriter(
+            self.filename,
+            schema,
+            compression=self.compression,
+        )
+
+
+class FeatherSink(ArrowSink):
+    """Writes the columns into the Feather (Arrow IPC) file.
+
+    """
+
+    def new_writer(self, schema):
+        return pyarrow.ipc.new_file(self.filename, schema)
+
+
+class HDF5Sink(ColumnSink):
+    """Writes the columns into the HDF5 file as resizable datasets.
+
+    Parameters
+    ----------
+    filename : str
+        output file
+
+    group : str, optional
+        the group of the datasets
+
+    compression : str, optional
+        see h5py.Group.create_dataset
+    """
+
+    def __init__(self, filename, group='/', compression=None):
+        if h5py is None:
+            raise ImportError(
+                'h5py is required: pip install coordinates[hdf5]'
+            )
+        super().__init__(filename)
+        self.file = h5py.File(filename, 'w')
+        self.group = self.file.require_group(group)
+        self.compression = compression
+
+    def write_columns(self, columns):
+        for name, value in columns.items():
+            if value.dtype.kind == 'U':
+                value = np.char.encode(value, 'ascii')
+
+            if name not in self.group:
+                self.group.create_dataset(
+                    name,
+                    shape=(0,) + value.shape[1:],
+                    maxshape=(None,) + value.shape[1:],
+                    dtype=value.dtype,
+                    chunks=True,
+                    compression=self.compression,
+                )
+
+            dataset = self.group[name]
+            dataset.resize(self.rows + len(value), axis=0)
+            dataset[self.rows:] = value
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+
+def orbit_columns(satellite, number, epoch, xyz, velocity=None, clock=None,
+                  geodetic=False):
+    """Returns columns of the orbit results.
+
+    Parameters
+    ----------
+    satellite, number, epoch : array_like
+        see coordinates.batch.satellite_xyz_many
+
+    xyz : numpy.ndarray
+        (n, 3) X, Y, Z, meters
+
+    velocity : numpy.ndarray, optional
+        (n, 3) meters per second
+
+    clock : numpy.ndarray, optional
+        (n, ) seconds
+
+    geodetic : bool, optional
+        add longitude, latitude (degrees) and height (meters)
+
+    Returns
+    -------
+    columns : OrderedDict
+        epoch, system, prn, xyz[, velocity][, clock][, lon, lat, h]
+    """
+    satellite, number, sec = broadcast_request(satellite, number, epoch)
+
+    columns = OrderedDict()
+    columns['epoch'] = sec
+    columns['system'] = satellite.astype('U1')
+    columns['prn'] = number.astype(np.int16)
+    columns['xyz'] = np.asarray(xyz, dtype=float)
+
+    if velocity is not None:
+        columns['velocity'] = np.asarray(velocity, dtype=float)
+
+    if clock is not None:
+        columns['clock'] = np.asarray(clock, dtype=float)
+
+    if geodetic:
+        lon, lat, h = xyz2lbh_array(*columns['xyz'].T)
+        columns['lon'] = lon
+        columns['lat'] = lat
+        columns['h'] = h
+
+    return columns
+
+
+def write_orbits(sink, source, satellite, number, epoch,
+                 chunk_size=DEFAULT_CHUNK_SIZE, geodetic=False,
+                 velocity=None, clock=None):
+    """Computes positions of the satellites by chunks and writes them into
+    the sink.
+
+    Parameters
+    ----------
+    sink : ColumnSink
+
+    source : str, file or orbit object
+        see coordinates.batch.satellite_xyz_many
+
+    satellite, number, epoch : array_like
+        see coordinates.batch.satellite_xyz_many
+
+    chunk_size : int, optional
+        rows per chunk
+
+    geodetic : bool, optional
+        see orbit_columns
+
+    velocity : array_like, optional
+        (n, 3) meters per second, the rows of the (broadcast) request
+
+    clock : array_like, optional
+        (n, ) seconds, the rows of the (broadcast) request
+
+    The velocities and the clock corrections aren't computed; they are
+    written as given, chunk by chunk along with the positions.
+    """
+    satellite, number, sec = broadcast_request(satellite, number, epoch)
+    if velocity is not None:
+        velocity = np.asarray(velocity, dtype=float).reshape(-1, 3)
+    if clock is not None:
+        clock = np.asarray(clock, dtype=float).reshape(-1)
+    for name, value in (('velocity', velocity), ('clock', clock)):
+        if value is not None and len(value) != len(sec):
+            raise ValueError(
+                'The length of {} must be {}.'.format(name, len(sec)))
+
+    for begin in range(0, len(sec), chunk_size):
+        chunk = slice(begin, begin + chunk_size)
+        xyz = satellite_xyz_many(
+            source,
+            satellite[chunk],
+            number[chunk],
+            sec[chunk],
+        )
+        sink.write(orbit_columns(
+            satellite[chunk],
+            number[chunk],
+            sec[chunk],
+            xyz,
+            velocity=None if velocity is None else velocity[chunk],
+            clock=None if clock is None else clock[chunk],
+            geodetic=geodetic,
+        ))
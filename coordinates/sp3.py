@@ -0,0 +1,537 @@
+"""
+Precise orbits in the SP3 (c, d) format.
+
+The positions are read into contiguous arrays and interpolated with a
+sliding window Lagrange polynomial. An ``SP3Orbits`` object can be passed
+to ``coordinates.sat.satellite_xyz`` and
+``coordinates.batch.satellite_xyz_many`` instead of the navigation file.
+
+``write_sp3`` and ``export_sp3`` write the orbits computed from the
+navigation files in the SP3-d format.
+"""
+import datetime
+
+import numpy as np
+
+from coordinates.batch import (
+    broadcast_request,
+    satellite_index,
+    satellite_xyz_grid,
+)
+from coordinates.broadcast import IOWrapper, RinexNavFile
+from coordinates.cache import file_cache
+from coordinates.exceptions import NavMessageNotFoundError, SP3FileError
+from coordinates.timescale import (
+    SECONDS_IN_DAY,
+    SECONDS_IN_WEEK,
+    datetime2sec,
+    sec2datetime,
+)
+
+# number of points of the Lagrange polynomial
+DEFAULT_ORDER = 10
+
+# bad or absent values
+BAD_CLOCK = 999999.
+BAD_CLOCK_RECORD = 999999.999999
+
+# epochs per a chunk of the output
+DEFAULT_CHUNK_SIZE = 96
+
+# MJD of coordinates.timescale.GPS_EPOCH
+GPS_EPOCH_MJD = 44244
+
+# satellite ids per '+' record
+SATS_PER_RECORD = 17
+
+WRITE_BUFFER_SIZE = 1 << 20
+
+
+def parse_sp3_epoch(line):
+    """Returns the epoch of the '*' record, seconds since
+    coordinates.timescale.GPS_EPOCH.
+
+    Raises
+    ------
+    SP3FileError
+        when it can't parse the record.
+    """
+    try:
+        epoch = datetime.datetime(
+            int(line[3:7]), int(line[8:10]), int(line[11:13]),
+            int(line[14:16]), int(line[17:19]),
+        )
+        sec = float(line[20:31])
+    except ValueError:
+        msg = "Can't read epoch: {}.".format(line.rstrip())
+        raise SP3FileError(msg)
+    return datetime2sec(epoch) + sec
+
+
+def parse_sp3_satellite(sat_id):
+    """Returns satellite system and number from the satellite id.
+
+    """
+    system = sat_id[0]
+    if system == ' ':
+        system = 'G'
+    return system, int(sat_id[1:3])
+
+
+class SP3Orbits:
+    """Satellite positions and clocks from an SP3 file.
+
+    Attributes
+    ----------
+    epochs : numpy.ndarray
+        (m, ) seconds since coordinates.timescale.GPS_EPOCH in the time
+        system of the file
+
+    satellites : numpy.ndarray
+        (k, ) satellite systems
+
+    numbers : numpy.ndarray
+        (k, ) satellite numbers
+
+    positions : numpy.ndarray
+        (k, m, 3) X, Y, Z, meters; NaN for absent values
+
+    clocks : numpy.ndarray
+        (k, m) clock corrections, seconds; NaN for absent values
+
+    time_system : str
+        'GPS', 'GLO', 'GAL', 'UTC', ...
+    """
+
+    def __init__(self, epochs, satellites, numbers, positions, clocks,
+                 time_system='GPS', order=DEFAULT_ORDER):
+        self.epochs = np.asarray(epochs, dtype=float)
+        self.satellites = np.asarray(satellites, dtype=str)
+        self.numbers = np.asarray(numbers, dtype=int)
+        self.positions = np.asarray(positions, dtype=float)
+        self.clocks = np.asarray(clocks, dtype=float)
+        self.time_system = time_system
+        self.order = order
+
+        self.index = {
+            (str(s), int(n)): i
+            for i, (s, n) in enumerate(zip(self.satellites, self.numbers))
+        }
+
+    def satellite_index(self, satellite, number):
+        """Returns indices of the satellites in the arrays.
+
+        Raises
+        ------
+        NavMessageNotFoundError
+            when there is no such satellite.
+        """
+        return satellite_index(self.index, satellite, number)
+
+    def satellite_xyz_many(self, satellite, number, epoch):
+        """Returns XYZ coordinates of the satellites for the epochs, see
+        coordinates.batch.satellite_xyz_many. The epochs are in the time
+        system of the file.
+
+        Raises
+        ------
+        NavMessageNotFoundError
+            when there is no such satellite or an epoch is out of the file.
+        """
+        satellite, number, sec = broadcast_request(satellite, number, epoch)
+        sat_index = self.satellite_index(satellite, number)
+        return lagrange_interpolate(
+            self.epochs,
+            self.positions,
+            sat_index,
+            sec,
+            self.order,
+        )
+
+
+def lagrange_interpolate(epochs, values, sat_index, sec, order=DEFAULT_ORDER):
+    """Interpolates the values with the sliding window Lagrange polynomial.
+
+    Parameters
+    ----------
+    epochs : numpy.ndarray
+        (m, ) sorted epochs of the values
+
+    values : numpy.ndarray
+        (k, m, d) values of k satellites
+
+    sat_index : numpy.ndarray
+        (n, ) indices of the satellites
+
+    sec : numpy.ndarray
+        (n, ) epochs to interpolate the values to
+
+    order : int, optional
+        number of points in the window
+
+    Returns
+    -------
+    values : numpy.ndarray
+        (n, d); NaN if there is an absent value in the window
+
+    Raises
+    ------
+    NavMessageNotFoundError
+        when an epoch is out of the epochs range.
+    """
+    if np.any((sec < epochs[0]) | (sec > epochs[-1])):
+        raise NavMessageNotFoundError(
+            'The epoch is out of the orbit file.'
+        )
+
+    order = min(order, len(epochs))
+
+    start = np.searchsorted(epochs, sec) - order // 2
+    np.clip(start, 0, len(epochs) - order, out=start)
+    window = start[:, np.newaxis] + np.arange(order)
+
+    nodes = epochs[window]
+    diff = sec[:, np.newaxis] - nodes
+
+    # w_j = prod_{k != j} (t - t_k) / (t_j - t_k)
+    denominator = nodes[:, :, np.newaxis] - nodes[:, np.newaxis, :]
+    numerator = np.broadcast_to(
+        diff[:, np.newaxis, :],
+        denominator.shape,
+    ).copy()
+    diagonal = np.arange(order)
+    denominator[:, diagonal, diagonal] = 1
+    numerator[:, diagonal, diagonal] = 1
+    weights = np.prod(numerator / denominator, axis=2)
+
+    return np.einsum(
+        'nj,njd->nd',
+        weights,
+        values[sat_index[:, np.newaxis], window],
+    )
+
+
+def parse_positions(records):
+    """Returns positions (km) and clocks (microseconds) from the
+    'P' records.
+
+    """
+    if not records:
+        return np.empty((0, 4))
+    text = ' '.join(r[4:60] for r in records)
+    try:
+        values = np.array(text.split(), dtype=float)
+        return values.reshape(len(records), 4)
+    except ValueError:
+        # an empty field or fields without separator
+        values = []
+        for record in records:
+            try:
+                values.append(
+                    [float(record[i:i + 14]) for i in range(4, 60, 14)]
+                )
+            except ValueError:
+                msg = "Can't read the position: {}".format(record.rstrip())
+                raise SP3FileError(msg)
+        return np.array(values)
+
+
+@file_cache(maxsize=8, single_flight=True)
+def read_sp3(filename, order=DEFAULT_ORDER):
+    """Reads the SP3 file.
+
+    Parameters
+    ----------
+    filename : str or file
+
+    order : int, optional
+        number of points of the interpolating polynomial
+
+    Returns
+    -------
+    orbits : SP3Orbits
+
+    Raises
+    ------
+    SP3FileError
+        when it can't parse the file.
+    """
+    time_system = None
+    satellites = []
+    epochs = []
+
+    # sat_index, epoch_index and the record of every position
+    sat_index = []
+    epoch_index = []
+    records = []
+
+    index = dict()
+
+    with IOWrapper(filename) as sp3:
+        try:
+            header = next(sp3)
+        except StopIteration:
+            raise SP3FileError('Unexpected end of the file.')
+
+        if header[0] != '#' or header[1] not in 'cd':
+            msg = 'Unsupported SP3 file: {}'.format(header.rstrip())
+            raise SP3FileError(msg)
+
+        in_header = True
+        for line in sp3:
+            if line.startswith('*'):
+                in_header = False
+                epochs.append(parse_sp3_epoch(line))
+
+            elif line.startswith('P') and not in_header:
+                sat = parse_sp3_satellite(line[1:4])
+                if sat not in index:
+                    index[sat] = len(index)
+                    satellites.append(sat)
+                sat_index.append(index[sat])
+                epoch_index.append(len(epochs) - 1)
+                records.append(line)
+
+            elif line.startswith('%c') and time_system is None:
+                time_system = line[9:12].strip()
+
+            elif line.startswith('EOF'):
+                break
+
+    values = parse_positions(records)
+
+    positions = np.full((len(satellites), len(epochs), 3), np.nan)
+    clocks = np.full((len(satellites), len(epochs)), np.nan)
+
+    if records:
+        xyz = values[:, :3] * 1000
+        xyz[np.all(values[:, :3] == 0, axis=1)] = np.nan
+        clock = values[:, 3] * 1e-6
+        clock[values[:, 3] >= BAD_CLOCK] = np.nan
+
+        positions[sat_index, epoch_index] = xyz
+        clocks[sat_index, epoch_index] = clock
+
+    return SP3Orbits(
+        epochs,
+        [s for s, _ in satellites],
+        [n for _, n in satellites],
+        positions,
+        clocks,
+        time_system=time_system or 'GPS',
+        order=order,
+    )
+
+
+def sp3_header(epochs, sat_ids, coord_system, orbit_type, agency):
+    """Returns the header of the SP3-d file as a list of lines.
+
+    """
+    first = sec2datetime(epochs[0])
+    interval = epochs[1] - epochs[0] if len(epochs) > 1 else 0.
+
+    week, sow = divmod(epochs[0], SECONDS_IN_WEEK)
+    mjd, fraction = divmod(epochs[0], SECONDS_IN_DAY)
+
+    lines = [
+        '#dP{:4d} {:2d} {:2d} {:2d} {:2d} {:11.8f} {:7d} ORBIT {:5s} '
+        '{:3s} {:4s}'.format(
+            first.year, first.month, first.day, first.hour, first.minute,
+            first.second + first.microsecond * 1e-6, len(epochs),
+            coord_system, orbit_type, agency,
+        ),
+        '## {:4d} {:15.8f} {:14.8f} {:5d} {:15.13f}'.format(
+            int(week), sow, interval, int(mjd) + GPS_EPOCH_MJD,
+            fraction / SECONDS_IN_DAY,
+        ),
+    ]
+
+    num_of_records = max(5, -(-len(sat_ids) // SATS_PER_RECORD))
+    ids = sat_ids + ['  0'] * (num_of_records * SATS_PER_RECORD -
+                               len(sat_ids))
+    for i in range(num_of_records):
+        chunk = ''.join(
+            ids[i * SATS_PER_RECORD:(i + 1) * SATS_PER_RECORD]
+        )
+        if i == 0:
+            lines.append('+  {:3d}   {}'.format(len(sat_ids), chunk))
+        else:
+            lines.append('+        {}'.format(chunk))
+
+    for _ in range(num_of_records):
+        lines.append('++       ' + '  0' * SATS_PER_RECORD)
+
+    lines += [
+        '%c M  cc GPS ccc cccc cccc cccc cccc ccccc ccccc ccccc ccccc',
+        '%c cc cc ccc ccc cccc cccc cccc cccc ccccc ccccc ccccc ccccc',
+        '%f  1.2500000  1.025000000  0.00000000000  0.000000000000000',
+        '%f  0.0000000  0.000000000  0.00000000000  0.000000000000000',
+        '%i    0    0    0    0      0      0      0      0         0',
+        '%i    0    0    0    0      0      0      0      0         0',
+        '/* broadcast orbits',
+        '/* computed by coordinates',
+        '/*',
+        '/*',
+    ]
+    return lines
+
+
+def sp3_records(epochs, sat_ids, xyz):
+    """Returns epoch and position records of the SP3 file.
+
+    Parameters
+    ----------
+    epochs : numpy.ndarray
+        (m, ) GPS time
+    sat_ids : list
+        (k, ) satellite ids
+    xyz : numpy.ndarray
+        (k, m, 3) positions, meters; NaN for absent values
+    """
+    xyz = np.where(np.isnan(xyz), 0, xyz / 1000)
+    lines = []
+    for j, sec in enumerate(epochs):
+        epoch = sec2datetime(sec)
+        lines.append('*  {:4d} {:2d} {:2d} {:2d} {:2d} {:11.8f}'.format(
+            epoch.year, epoch.month, epoch.day, epoch.hour, epoch.minute,
+            epoch.second + epoch.microsecond * 1e-6,
+        ))
+        lines += [
+            'P%s%14.6f%14.6f%14.6f%14.6f' % (
+                sat_id, x, y, z, BAD_CLOCK_RECORD,
+            )
+            for sat_id, (x, y, z) in zip(sat_ids, xyz[:, j].tolist())
+        ]
+    return lines
+
+
+def write_sp3(out, source, epochs, satellites, numbers, leap_seconds=None,
+              chunk_size=DEFAULT_CHUNK_SIZE, coord_system='IGS14',
+              orbit_type='BCT', agency='GNSS'):
+    """Writes positions of the satellites computed from the source into the
+    SP3-d file.
+
+    The positions are computed by coordinates.batch.satellite_xyz_grid
+    and written by chunks of epochs, so the memory use doesn't depend on
+    the number of epochs.
+
+    Parameters
+    ----------
+    out : str or file
+        output file
+
+    source : str, file or orbit object
+        navigation file or an orbit object, see
+        coordinates.batch.satellite_xyz_many
+
+    epochs : array_like
+        epochs, GPS time; they are converted into the system time of
+        every satellite for navigation files
+
+    satellites, numbers : array_like
+        satellite systems and numbers
+
+    leap_seconds : int, optional
+        GPS - UTC; by default it is read from the navigation file
+
+    chunk_size : int, optional
+        epochs per chunk
+
+    coord_system, orbit_type, agency : str, optional
+        the header values
+
+    Satellites without navigation messages for the epochs are written as
+    bad (zero) positions.
+    """
+    epochs = np.atleast_1d(datetime2sec(epochs))
+    satellites, numbers = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(satellites, dtype=str)),
+        np.atleast_1d(np.asarray(numbers, dtype=int)),
+    )
+    sat_ids = [
+        '{}{:02d}'.format(s, n)
+        for s, n in zip(satellites.tolist(), numbers.tolist())
+    ]
+
+    # the header is read once instead of once per chunk, see
+    # coordinates.batch.satellite_xyz_grid
+    is_nav = not hasattr(source, 'satellite_xyz_many')
+    if is_nav and leap_seconds is None and 'R' in satellites:
+        leap_seconds = RinexNavFile.retrieve_leap_seconds(source)
+
+    with IOWrapper(out, 'w', WRITE_BUFFER_SIZE) as sp3:
+        header = sp3_header(epochs, sat_ids, coord_system, orbit_type,
+                            agency)
+        sp3.write('\n'.join(header) + '\n')
+
+        for begin in range(0, len(epochs), chunk_size):
+            chunk = epochs[begin:begin + chunk_size]
+
+            xyz = satellite_xyz_grid(
+                source,
+                satellites,
+                numbers,
+                chunk,
+                leap_seconds=leap_seconds,
+            )
+            lines = sp3_records(chunk, sat_ids, xyz)
+            sp3.write('\n'.join(lines) + '\n')
+
+        sp3.write('EOF\n')
+
+
+def export_sp3(source, start, end, step, satellites, numbers,
+               filename_format, **kwargs):
+    """Writes daily SP3 files for the epochs from start to end.
+
+    Parameters
+    ----------
+    source : str, file, orbit object or callable
+        navigation file, an orbit object, or a function which takes the
+        beginning of the day (datetime.datetime) and returns one of them
+
+    start, end : float or datetime.datetime
+        GPS time, the end is not included
+
+    step : float
+        seconds
+
+    satellites, numbers : array_like
+        satellite systems and numbers
+
+    filename_format : str
+        format of the output file names, it is formatted with the
+        beginning of the day, e.g. 'brd{:%Y%j}.sp3'
+
+    kwargs
+        see write_sp3
+
+    Returns
+    -------
+    filenames : list
+        written files
+    """
+    start, end = datetime2sec([start, end])
+    epochs = np.arange(start, end, step)
+
+    filenames = []
+    days = np.floor_divide(epochs, SECONDS_IN_DAY)
+    for day in np.unique(days):
+        day_start = sec2datetime(day * SECONDS_IN_DAY)
+
+        day_source = source
+        if callable(source):
+            day_source = source(day_start)
+
+        filename = filename_format.format(day_start)
+        write_sp3(
+            filename,
+            day_source,
+            epochs[days == day],
+            satellites,
+            numbers,
+            **kwargs
+        )
+        filenames.append(filename)
+
+    return filenames
@@ -0,0 +1,592 @@
+"""
+Synthetic RINEX files.
+
+The generator produces navigation records with realistic orbital elements
+(the constellations are modelled by near-circular orbits in the orbital
+planes, GEO satellites are stationary) and writes them in RINEX 2 or 3
+format, and the observation files with random observations. It works
+offline and scales to any number of records, e.g. for the benchmarks and
+the stress tests.
+
+A usage example::
+
+    records = nav_records(datetime.datetime(2017, 9, 8), hours=24,
+                          duplicates=0.3)
+    with open('synthetic.17p', 'w') as nav_file:
+        write_nav(nav_file, records)
+"""
+import datetime
+from math import atan2, cos, pi, radians, sin, sqrt
+
+import numpy as np
+
+from coordinates import datum
+from coordinates.broadcast import RinexNavFile
+from coordinates.ephemeris import BDS_GEO_TILT
+from coordinates.propagators import satellite_class
+from coordinates.sat import KEPLER_MESSAGE, TRANSMISSION_INDEX
+from coordinates.timescale import (
+    GPS_EPOCH,
+    SECONDS_IN_WEEK,
+    datetime2sec,
+    week_sec,
+)
+
+# the number of satellites
+DEFAULT_SATELLITES = dict(G=32, R=24, E=24, C=30, J=4, I=7, S=3)
+
+# interval between the messages, seconds
+MESSAGE_INTERVAL = dict(G=7200, R=1800, E=600, C=3600, J=3600, I=7200, S=360)
+
+GEO_SEMI_AXIS = (datum.mu / datum.omega ** 2) ** (1 / 3)
+
+# orbits: semi-major axis, meters; inclination, degrees; number of planes
+ORBITS = dict(
+    G=(26559.7e3, 55., 6),
+    R=(25510.0e3, 64.8, 3),
+    E=(29600.3e3, 56., 3),
+    C=(27906.1e3, 55., 3),
+    J=(GEO_SEMI_AXIS, 41., 4),
+    I=(GEO_SEMI_AXIS, 29., 2),
+    S=(GEO_SEMI_AXIS, 0., 1),
+)
+
+# orbits of the classes of the satellites, see
+# coordinates.propagators.SATELLITE_CLASSES
+CLASS_ORBITS = {
+    ('C', 'GEO'): (GEO_SEMI_AXIS, 0., 1),
+    ('C', 'IGSO'): (GEO_SEMI_AXIS, 55., 3),
+}
+
+# the week number in the messages: system week = GPS week - offset
+WEEK_OFFSET = dict(G=0, E=0, C=1356, J=0, I=0)
+
+# the system of the weeks of toe
+WEEK_SYSTEM = dict(J='G')
+
+# the fit interval: hours for GPS, the flag for QZSS (0 means 2 hours)
+FIT_INTERVAL = dict(G=4., J=0.)
+
+# shift of the transmission time of the duplicates, seconds
+DUPLICATE_DELAY = 30.
+
+# mean motion difference, rates of the node and the inclination,
+# radians per second
+MEAN_MOTION_DIFFERENCE = 4.5e-9
+NODE_RATE = -8e-9
+INCLINATION_RATE = 1e-10
+
+LEAP_SECONDS = 18
+
+
+def transmission_time(toe):
+    """Returns the transmission time of the message, half an hour before
+    toe, seconds of the week.
+
+    """
+    return (toe - 1800) % SECONDS_IN_WEEK
+
+
+class SyntheticSatellite:
+    """Orbital elements of a synthetic satellite.
+
+    Parameters
+    ----------
+    satellite : str
+        satellite system
+    number : int
+    random : numpy.random.RandomState
+    """
+
+    def __init__(self, satellite, number, random):
+        self.satellite = satellite
+        self.number = number
+        self.orbit_class = satellite_class(satellite, number)
+
+        semi_axis, inclination, planes = CLASS_ORBITS.get(
+            (satellite, self.orbit_class),
+            ORBITS[satellite],
+        )
+        self.semi_axis = semi_axis
+        self.inclination = radians(inclination)
+        self.node = 2 * pi * ((number - 1) % planes) / planes
+        self.latitude = random.uniform(-pi, pi)
+        self.mean_motion = sqrt(datum.mu / semi_axis ** 3)
+        if satellite in KEPLER_MESSAGE:
+            self.mean_motion += MEAN_MOTION_DIFFERENCE
+
+        self.eccentricity = random.uniform(0.001, 0.02)
+        self.perigee = random.uniform(-pi, pi)
+        self.harmonics = random.uniform(-1, 1, 6) * (
+            1e-6, 1e-6, 1e-7, 1e-7, 200., 200.,
+        )
+        self.clock = (random.uniform(-5e-4, 5e-4),
+                      random.uniform(-1e-11, 1e-11))
+
+    def argument(self, sec):
+        """Returns the argument of latitude, radians."""
+        return self.latitude + self.mean_motion * sec
+
+    def kepler_message(self, sec, issue):
+        """Returns the clock and the Keplerian message for the epoch.
+
+        Parameters
+        ----------
+        sec : float
+            seconds since GPS_EPOCH in the system time
+        issue : int
+            the number of the message
+        """
+        if self.orbit_class == 'GEO':
+            return self.geo_message(sec, issue)
+
+        toe = float(week_sec(sec, WEEK_SYSTEM.get(self.satellite,
+                                                  self.satellite)))
+        week = int(sec // SECONDS_IN_WEEK) - WEEK_OFFSET[self.satellite]
+
+        mean_anomaly = self.argument(sec) - self.perigee
+        mean_anomaly = atan2(sin(mean_anomaly), cos(mean_anomaly))
+
+        cuc, cus, cic, cis, crc, crs = self.harmonics
+        iode = float(issue % 256)
+
+        # the messages of the week are consistent with each other
+        node = self.node + NODE_RATE * toe
+        inclination = self.inclination + INCLINATION_RATE * toe
+
+        message = (
+            iode, crs, MEAN_MOTION_DIFFERENCE, mean_anomaly,
+            cuc, self.eccentricity, cus, sqrt(self.semi_axis),
+            toe, cic, node, cis,
+            inclination, crc, self.perigee, NODE_RATE,
+            INCLINATION_RATE, 1., float(week), 0.,
+            2., 0., 5e-9, iode,
+            transmission_time(toe), FIT_INTERVAL.get(self.satellite, 0.),
+        )
+        return self.clock + (0.,), message
+
+    def geo_message(self, sec, issue):
+        """Returns the clock and the message of the BDS GEO satellite: the
+        elements of the stationary orbit in the frame tilted by 5 degrees,
+        see coordinates.ephemeris.GeoEphemeris.
+
+        """
+        toe = float(week_sec(sec, self.satellite))
+        week = int(sec // SECONDS_IN_WEEK) - WEEK_OFFSET[self.satellite]
+        iode = float(issue % 256)
+
+        # the longitude of the satellite is the argument of latitude
+        mean_anomaly = atan2(sin(self.latitude - pi),
+                             cos(self.latitude - pi))
+
+        message = (
+            iode, 0., 0., mean_anomaly,
+            0., 0., 0., sqrt(self.semi_axis),
+            toe, 0., pi + datum.omega * toe, 0.,
+            -BDS_GEO_TILT, 0., 0., 0.,
+            0., 1., float(week), 0.,
+            2., 0., 5e-9, iode,
+            transmission_time(toe), 0.,
+        )
+        return self.clock + (0.,), message
+
+    def glo_message(self, sec, issue=0):
+        """Returns the clock and the GLONASS-like message (ECEF state
+        vector, km) of GLONASS or SBAS satellite for the epoch.
+
+        """
+        u = self.argument(sec)
+        r = self.semi_axis
+        v = r * self.mean_motion
+        cos_i, sin_i = cos(self.inclination), sin(self.inclination)
+        cos_o, sin_o = cos(self.node), sin(self.node)
+
+        # inertial
+        x = r * (cos_o * cos(u) - sin_o * sin(u) * cos_i)
+        y = r * (sin_o * cos(u) + cos_o * sin(u) * cos_i)
+        z = r * sin(u) * sin_i
+        vx = v * (-cos_o * sin(u) - sin_o * cos(u) * cos_i)
+        vy = v * (-sin_o * sin(u) + cos_o * cos(u) * cos_i)
+        vz = v * cos(u) * sin_i
+
+        # ECEF
+        theta = datum.omega * sec
+        cos_t, sin_t = cos(theta), sin(theta)
+        xe = cos_t * x + sin_t * y
+        ye = -sin_t * x + cos_t * y
+        vxe = cos_t * vx + sin_t * vy + datum.omega * ye
+        vye = -sin_t * vx + cos_t * vy - datum.omega * xe
+
+        if self.satellite == 'S':
+            # URA, IODN
+            extra = (2., float(issue % 256))
+            clock = (self.clock[0], self.clock[1],
+                     float(sec % SECONDS_IN_WEEK))
+        else:
+            # frequency number, age
+            extra = (float(self.number % 14 - 7), 0.)
+            clock = (-self.clock[0], 0., float(sec % 86400))
+
+        message = (
+            xe / 1e3, vxe / 1e3, 0., 0.,
+            ye / 1e3, vye / 1e3, 0., extra[0],
+            z / 1e3, vz / 1e3, 0., extra[1],
+        )
+        return clock, message
+
+
+def nav_records(start, hours=24, satellites=None, seed=0, duplicates=0.):
+    """Returns navigation records sorted by epoch, in the format of
+    coordinates.broadcast.rnx_nav.
+
+    Parameters
+    ----------
+    start : datetime.datetime
+        the first epoch
+    hours : float, optional
+        the time span
+    satellites : dict, optional
+        system -> the number of satellites, see DEFAULT_SATELLITES
+    seed : int, optional
+        seed of the random elements
+    duplicates : float, optional
+        the mean number of the duplicates of a record, as in the merged
+        files; the duplicates of the Keplerian messages differ in the
+        transmission time, see coordinates.sat.message_key
+
+    Returns
+    -------
+    records : list
+        (system, number, epoch, sv_clock, message)
+    """
+    if satellites is None:
+        satellites = DEFAULT_SATELLITES
+    random = np.random.RandomState(seed)
+
+    start_sec = datetime2sec(start)
+    records = []
+    for system in sorted(satellites):
+        interval = MESSAGE_INTERVAL[system]
+        times = np.arange(0, hours * 3600, interval)
+        for number in range(1, satellites[system] + 1):
+            sat = SyntheticSatellite(system, number, random)
+            for issue, dt in enumerate(times.tolist()):
+                sec = start_sec + dt
+                if system in KEPLER_MESSAGE:
+                    clock, message = sat.kepler_message(sec, issue)
+                else:
+                    clock, message = sat.glo_message(sec, issue)
+                epoch = GPS_EPOCH + datetime.timedelta(seconds=sec)
+                records.append((system, number, epoch, clock, message))
+
+    if duplicates:
+        copies = np.floor(duplicates + random.random_sample(len(records)))
+        for index in np.flatnonzero(copies).tolist():
+            for copy in range(1, int(copies[index]) + 1):
+                records.append(duplicate_record(records[index], copy))
+
+    # the sort is stable: a duplicate follows the original record
+    records.sort(key=lambda r: (r[2], r[0], r[1]))
+    return records
+
+
+def duplicate_record(record, copy=1):
+    """Returns the duplicate of the navigation record received by another
+    station of the network.
+
+    """
+    system, number, epoch, clock, message = record
+    if system in KEPLER_MESSAGE:
+        message = list(message)
+        message[TRANSMISSION_INDEX] = (
+            message[TRANSMISSION_INDEX] + copy * DUPLICATE_DELAY
+        ) % SECONDS_IN_WEEK
+        message = tuple(message)
+    return system, number, epoch, clock, message
+
+
+# RINEX 2 navigation files: system -> file type
+NAV_FILE_TYPES_V2 = dict(
+    G='N: GPS NAV DATA',
+    R='G: GLONASS NAV DATA',
+    S='H: GEO NAV MSG DATA',
+)
+
+
+def format_values(values, exponent='e'):
+    line = ''.join('{:19.12e}'.format(v) for v in values)
+    if exponent != 'e':
+        line = line.replace('e', exponent)
+    return line
+
+
+def write_nav(out, records, leap_seconds=LEAP_SECONDS, version=3.03):
+    """Writes the records as RINEX navigation file.
+
+    Parameters
+    ----------
+    out : file
+        text file
+    records : iterable
+        see nav_records
+    leap_seconds : int, optional
+    version : float, optional
+        RINEX version: 3.03 or 2.11. RINEX 2 file holds the records of one
+        system (GPS, GLONASS or SBAS) and uses Fortran exponents.
+
+    Raises
+    ------
+    ValueError
+        when the records can't be written in RINEX 2.
+    """
+    if version >= 3:
+        write_nav_v3(out, records, leap_seconds, version)
+    else:
+        write_nav_v2(out, list(records), leap_seconds, version)
+
+
+def write_nav_header(out, version, file_type, system, leap_seconds):
+    out.write('{:9.2f}{:11s}{:20s}{:20s}{}\n'.format(
+        version, '', file_type, system, 'RINEX VERSION / TYPE'))
+    out.write('{:20s}{:20s}{:20s}{}\n'.format(
+        'coordinates', 'synthetic', '', 'PGM / RUN BY / DATE'))
+    out.write('{:6d}{:54s}{}\n'.format(leap_seconds, '', 'LEAP SECONDS'))
+    out.write('{:60s}{}\n'.format('', 'END OF HEADER'))
+
+
+def write_nav_v3(out, records, leap_seconds, version):
+    write_nav_header(out, version, 'NAVIGATION DATA', 'M (Mixed)',
+                     leap_seconds)
+
+    per_orbit = RinexNavFile.values_per_orbit
+    for system, number, epoch, clock, message in records:
+        out.write('{}{:02d} {:%Y %m %d %H %M %S}{}\n'.format(
+            system, number, epoch, format_values(clock)))
+        i = 0
+        for count in per_orbit[system]:
+            out.write('    {}\n'.format(format_values(message[i:i + count])))
+            i += count
+
+
+def write_nav_v2(out, records, leap_seconds, version):
+    systems = {r[0] for r in records}
+    if len(systems) > 1:
+        msg = 'RINEX 2 file holds one system, got: {}.'.format(
+            ', '.join(sorted(systems)))
+        raise ValueError(msg)
+
+    system = systems.pop() if systems else 'G'
+    if system not in NAV_FILE_TYPES_V2:
+        raise ValueError('{} is not supported by RINEX 2.'.format(system))
+
+    write_nav_header(out, version, NAV_FILE_TYPES_V2[system], '',
+                     leap_seconds)
+
+    per_orbit = RinexNavFile.values_per_orbit
+    for system, number, epoch, clock, message in records:
+        sec = epoch.second + epoch.microsecond / 1e6
+        out.write('{:2d} {:02d}{:3d}{:3d}{:3d}{:3d}{:5.1f}{}\n'.format(
+            number, epoch.year % 100, epoch.month, epoch.day, epoch.hour,
+            epoch.minute, sec, format_values(clock, 'D')))
+        i = 0
+        for count in per_orbit[system]:
+            out.write('   {}\n'.format(
+                format_values(message[i:i + count], 'D')))
+            i += count
+
+
+# observation types of RINEX 3 files
+OBS_TYPES = dict(
+    G=('C1C', 'L1C', 'D1C', 'S1C', 'C2W', 'L2W', 'D2W', 'S2W', 'C5Q', 'L5Q'),
+    R=('C1C', 'L1C', 'D1C', 'S1C', 'C2P', 'L2P', 'D2P', 'S2P'),
+    E=('C1C', 'L1C', 'D1C', 'S1C', 'C5Q', 'L5Q', 'C7Q', 'L7Q'),
+    C=('C2I', 'L2I', 'D2I', 'S2I', 'C7I', 'L7I', 'D7I', 'S7I'),
+    J=('C1C', 'L1C', 'S1C', 'C2L', 'L2L', 'S2L'),
+    I=('C5A', 'L5A', 'D5A', 'S5A'),
+    S=('C1C', 'L1C', 'D1C', 'S1C'),
+)
+
+# observation types of RINEX 2 files
+OBS_TYPES_V2 = ('L1', 'L2', 'L5', 'C1', 'P1', 'C2', 'P2', 'C5', 'S1', 'S2')
+
+SYSTEM_NAMES = dict(G='GPS', R='GLONASS', E='GALILEO', C='BEIDOU',
+                    J='QZSS', I='IRNSS', S='SBAS')
+
+
+def write_obs_header(out, start, position, systems='GRECJIS',
+                     obs_types=None, interval=30., version=3.03,
+                     marker='SYNT', leap_seconds=LEAP_SECONDS):
+    """Writes the header of RINEX observation file.
+
+    Parameters
+    ----------
+    out : file
+        text file
+    start : datetime.datetime
+        time of the first observation, GPS time
+    position : sequence
+        approximate position of the marker X, Y, Z, meters
+    systems : str, optional
+        satellite systems of the observations
+    obs_types : dict or sequence, optional
+        system -> observation types for RINEX 3 (see OBS_TYPES), the
+        observation types of all the systems for RINEX 2 (see OBS_TYPES_V2)
+    interval : float, optional
+        seconds
+    version : float, optional
+        RINEX version: 3.03 or 2.11
+    marker : str, optional
+        the name of the marker
+    leap_seconds : int, optional
+    """
+    if len(systems) == 1:
+        system = '{} ({})'.format(systems, SYSTEM_NAMES[systems])
+    else:
+        system = 'M (MIXED)'
+
+    out.write('{:9.2f}{:11s}{:20s}{:20s}{}\n'.format(
+        version, '', 'OBSERVATION DATA', system, 'RINEX VERSION / TYPE'))
+    out.write('{:20s}{:20s}{:20s}{}\n'.format(
+        'coordinates', 'synthetic', '', 'PGM / RUN BY / DATE'))
+    out.write('{:60s}{}\n'.format(marker, 'MARKER NAME'))
+    out.write('{:20s}{:20s}{:20s}{}\n'.format(
+        '1', 'SYNTHETIC', '1.0', 'REC # / TYPE / VERS'))
+    out.write('{:20s}{:20s}{:20s}{}\n'.format(
+        '1', 'SYNTHETIC       NONE', '', 'ANT # / TYPE'))
+    out.write('{:14.4f}{:14.4f}{:14.4f}{:18s}{}\n'.format(
+        *position, '', 'APPROX POSITION XYZ'))
+    out.write('{:14.4f}{:14.4f}{:14.4f}{:18s}{}\n'.format(
+        0., 0., 0., '', 'ANTENNA: DELTA H/E/N'))
+
+    if version >= 3:
+        if obs_types is None:
+            obs_types = {s: OBS_TYPES[s] for s in systems}
+        for s in systems:
+            write_labelled(out, '{}  {:3d}'.format(s, len(obs_types[s])),
+                           ' {:3s}', obs_types[s], 13,
+                           'SYS / # / OBS TYPES')
+    else:
+        if obs_types is None:
+            obs_types = OBS_TYPES_V2
+        out.write('{:6d}{:6d}{:48s}{}\n'.format(
+            1, 1, '', 'WAVELENGTH FACT L1/2'))
+        write_labelled(out, '{:6d}'.format(len(obs_types)), '{:>6s}',
+                       obs_types, 9, '# / TYPES OF OBSERV')
+
+    out.write('{:10.3f}{:50s}{}\n'.format(interval, '', 'INTERVAL'))
+    out.write('{:6d}{:54s}{}\n'.format(leap_seconds, '', 'LEAP SECONDS'))
+    sec = start.second + start.microsecond / 1e6
+    out.write('{:6d}{:6d}{:6d}{:6d}{:6d}{:13.7f}{:>8s}{:9s}{}\n'.format(
+        start.year, start.month, start.day, start.hour, start.minute, sec,
+        'GPS', '', 'TIME OF FIRST OBS'))
+    out.write('{:60s}{}\n'.format('', 'END OF HEADER'))
+
+
+def write_labelled(out, head, item_format, items, per_line, label):
+    """Writes the list of the items in the header records: the head and
+    up to per_line items in every record.
+
+    """
+    for i in range(0, max(len(items), 1), per_line):
+        line = head if i == 0 else ' ' * len(head)
+        line += ''.join(item_format.format(t) for t in items[i:i + per_line])
+        out.write('{:60s}{}\n'.format(line, label))
+
+
+# observed satellites of every system, see write_obs
+OBS_SATELLITES = dict(G=10, R=8, E=8, C=8, J=2, I=2, S=2)
+
+# typical values of the observations by the type: pseudorange, meters;
+# carrier phase, cycles; Doppler, Hz; signal strength, dB-Hz
+OBS_VALUES = dict(
+    C=(2.2e7, 2e6),
+    P=(2.2e7, 2e6),
+    L=(1.1e8, 1e7),
+    D=(0., 3e3),
+    S=(42., 5.),
+)
+
+OBS_PER_LINE_V2 = 5
+SATS_PER_LINE_V2 = 12
+
+
+def write_obs(out, start, position, epochs, systems='GRECJIS',
+              satellites=None, interval=30., version=3.03, seed=0,
+              missing=0.05):
+    """Writes RINEX observation file with the random observations.
+
+    Parameters
+    ----------
+    out : file
+        text file
+    start : datetime.datetime
+        time of the first observation, GPS time
+    position : sequence
+        approximate position of the marker X, Y, Z, meters
+    epochs : int
+        the number of the epochs
+    systems : str, optional
+        satellite systems of the observations
+    satellites : dict, optional
+        system -> the number of the observed satellites, see
+        OBS_SATELLITES
+    interval : float, optional
+        seconds
+    version : float, optional
+        RINEX version: 3.03 or 2.11
+    seed : int, optional
+    missing : float, optional
+        the fraction of the blank observations
+    """
+    write_obs_header(out, start, position, systems=systems,
+                     interval=interval, version=version)
+
+    if satellites is None:
+        satellites = {s: OBS_SATELLITES[s] for s in systems}
+    observed = [(s, n) for s in systems for n in range(1, satellites[s] + 1)]
+
+    rng = np.random.RandomState(seed)
+    for i in range(epochs):
+        epoch = start + datetime.timedelta(seconds=i * interval)
+        sec = epoch.second + epoch.microsecond / 1e6
+        if version >= 3:
+            out.write('> {:4d} {:02d} {:02d} {:02d} {:02d}{:11.7f}  0{:3d}'
+                      '\n'.format(epoch.year, epoch.month, epoch.day,
+                                  epoch.hour, epoch.minute, sec,
+                                  len(observed)))
+        else:
+            sats = ''.join('{}{:02d}'.format(s, n) for s, n in observed)
+            width = SATS_PER_LINE_V2 * 3
+            out.write(' {:02d} {:2d} {:2d} {:2d} {:2d}{:11.7f}  0{:3d}'
+                      '{}\n'.format(epoch.year % 100, epoch.month, epoch.day,
+                                    epoch.hour, epoch.minute, sec,
+                                    len(observed), sats[:width]))
+            for j in range(width, len(sats), width):
+                out.write('{:32s}{}\n'.format('', sats[j:j + width]))
+
+        for system, number in observed:
+            if version >= 3:
+                obs_types = OBS_TYPES[system]
+            else:
+                obs_types = OBS_TYPES_V2
+            fields = [obs_field(rng, t[0], missing) for t in obs_types]
+            if version >= 3:
+                out.write('{}{:02d}{}\n'.format(
+                    system, number, ''.join(fields).rstrip()))
+            else:
+                for j in range(0, len(fields), OBS_PER_LINE_V2):
+                    out.write('{}\n'.format(
+                        ''.join(fields[j:j + OBS_PER_LINE_V2]).rstrip()))
+
+
+def obs_field(rng, kind, missing):
+    """Returns the random observation field: F14.3, LLI, and signal
+    strength.
+
+    """
+    if rng.random_sample() < missing:
+        return ' ' * 16
+    mean, spread = OBS_VALUES[kind]
+    value = mean + spread * rng.standard_normal()
+    lli = '1' if kind == 'L' and rng.random_sample() < 0.01 else ' '
+    return '{:14.3f}{}{:1d}'.format(value, lli, rng.randint(5, 10))
@@ -0,0 +1,200 @@
+"""
+Numeric representation of GNSS epochs.
+
+An epoch is represented as float64 seconds since 1980-01-06 00:00:00 of a
+continuous time scale (no leap seconds inside the scale). Arrays of such
+numbers are used instead of ``datetime.datetime`` objects in the batch
+computations. The time system of a numeric epoch is the same as the time
+system of the corresponding ``datetime.datetime``: seconds are counted from
+the origin in GPS time for GPS epochs, in BDT for BDS epochs, in UTC(SU) + 3h
+for GLONASS epochs, etc. Use ``to_gps``, ``from_gps`` and ``convert`` to
+move epochs between the systems.
+"""
+import datetime
+
+import numpy as np
+
+from coordinates.exceptions import SatSystemError
+
+GPS_EPOCH = datetime.datetime(1980, 1, 6, 0, 0, 0)
+_GPS_EPOCH64 = np.datetime64('1980-01-06T00:00:00', 'us')
+_ONE_SECOND = np.timedelta64(1, 's')
+
+SECONDS_IN_DAY = 86400
+SECONDS_IN_WEEK = 604800
+
+EPOCH_START = dict(
+    G=datetime.datetime(1980, 1, 6, 0, 0, 0),  # GPS
+    C=datetime.datetime(2006, 1, 1, 0, 0, 0),  # BDS
+    E=datetime.datetime(1999, 8, 22, 0, 0, 13),  # Galileo
+    I=datetime.datetime(1999, 8, 21, 23, 59, 47),  # IRNSS
+)
+
+# origins of the weeks, seconds since GPS_EPOCH
+WEEK_START = {
+    s: (e - GPS_EPOCH).total_seconds() for s, e in EPOCH_START.items()
+}
+
+# system time - GPS time, seconds; UTC-based systems also depend on the
+# leap seconds
+SYSTEM_OFFSET = dict(
+    G=0.,  # GPS
+    E=0.,  # Galileo, GST is steered to GPS time
+    I=0.,  # IRNSS
+    J=0.,  # QZSS
+    S=0.,  # SBAS, broadcast in GPS time
+    C=-14.,  # BDS, BDT = GPS - 14 s
+)
+
+# UTC + hours
+UTC_OFFSET = dict(
+    UTC=0.,
+    R=3 * 60 * 60.,  # GLONASS, UTC(SU) + 3h
+)
+
+
+def datetime2sec(epoch):
+    """Converts epoch(s) into seconds since GPS_EPOCH.
+
+    Parameters
+    ----------
+    epoch : datetime.datetime, sequence or numpy.ndarray
+        A datetime, a sequence of datetimes or an array of numpy.datetime64.
+        Numeric values are returned as float64 without changes.
+
+    Returns
+    -------
+    seconds : float or numpy.ndarray
+        The time system of the result is the same as the time system of
+        the epoch.
+    """
+    if isinstance(epoch, datetime.datetime):
+        return (epoch - GPS_EPOCH).total_seconds()
+
+    epoch = np.asarray(epoch)
+
+    if epoch.dtype.kind == 'O':
+        epoch = epoch.astype('datetime64[us]')
+
+    if epoch.dtype.kind == 'M':
+        return (epoch - _GPS_EPOCH64) / _ONE_SECOND
+
+    return epoch.astype(np.float64)
+
+
+def sec2datetime(sec):
+    """Converts seconds since GPS_EPOCH back into epoch(s).
+
+    Parameters
+    ----------
+    sec : float or array_like
+
+    Returns
+    -------
+    epoch : datetime.datetime or numpy.ndarray
+        datetime.datetime for a scalar, numpy.datetime64[us] array
+        otherwise.
+    """
+    if np.ndim(sec) == 0:
+        return GPS_EPOCH + datetime.timedelta(seconds=float(sec))
+
+    microsec = np.round(np.asarray(sec, dtype=np.float64) * 1e+6)
+    return _GPS_EPOCH64 + microsec.astype('timedelta64[us]')
+
+
+def system_offset(system, leap_seconds=None):
+    """Returns difference between the system time and GPS time in seconds.
+
+    Parameters
+    ----------
+    system : str
+        Satellite system ('G', 'R', 'E', 'C', ...) or 'UTC'.
+
+    leap_seconds : int, optional
+        GPS - UTC, seconds; e.g. from the LEAP SECONDS record of the
+        navigation file. Required for UTC-based systems.
+
+    Returns
+    -------
+    offset : float
+
+    Raises
+    ------
+    SatSystemError
+        on unknown system.
+
+    ValueError
+        when leap_seconds required but not given.
+    """
+    if system in SYSTEM_OFFSET:
+        return SYSTEM_OFFSET[system]
+
+    if system in UTC_OFFSET:
+        if leap_seconds is None:
+            msg = 'Leap seconds are required to convert {} time.'.format(
+                system
+            )
+            raise ValueError(msg)
+        return UTC_OFFSET[system] - leap_seconds
+
+    raise SatSystemError(system)
+
+
+def to_gps(sec, system, leap_seconds=None):
+    """Converts seconds of the system time into seconds of GPS time.
+
+    """
+    return sec - system_offset(system, leap_seconds)
+
+
+def from_gps(sec, system, leap_seconds=None):
+    """Converts seconds of GPS time into seconds of the system time.
+
+    """
+    return sec + system_offset(system, leap_seconds)
+
+
+def convert(sec, source, target, leap_seconds=None):
+    """Converts seconds of the source system time into seconds of the target
+    system time.
+
+    """
+    if source == target:
+        return sec
+    offset = (system_offset(target, leap_seconds) -
+              system_offset(source, leap_seconds))
+    return sec + offset
+
+
+def week_sec(sec, satellite):
+    """Returns seconds since the beginning of the week of the satellite
+    system, see also ``coordinates.sat.reference_time``.
+
+    Parameters
+    ----------
+    sec : float or numpy.ndarray
+        seconds since GPS_EPOCH in the system time
+
+    satellite : str
+
+    Returns
+    -------
+    seconds : float or numpy.ndarray
+    """
+    if satellite not in WEEK_START:
+        raise SatSystemError(satellite)
+    return (sec - WEEK_START[satellite]) % SECONDS_IN_WEEK
+
+
+def day_sec(sec):
+    """Returns seconds since the beginning of the day.
+
+    """
+    return sec % SECONDS_IN_DAY
+
+
+def day(sec):
+    """Returns days since GPS_EPOCH.
+
+    """
+    return np.floor_divide(sec, SECONDS_IN_DAY)
@@ -44,11 +44,14 @@ setup(
 
     packages=find_packages(exclude=['docs', 'tests']),
 
-    install_requires=[],
+    install_requires=['numpy'],
 
     python_requires='>=3',
 
     extras_require={
         'test': ['pytest'],
+        'arrow': ['pyarrow'],
+        'hdf5': ['h5py'],
+        'numba': ['numba'],
     },
 )
@@ -0,0 +1,131 @@
+import asyncio
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+
+import numpy as np
+import pytest
+
+from coordinates import aio
+from coordinates.batch import satellite_xyz_many
+from coordinates.cache import file_cache
+from coordinates.sat import read_nav_data, satellite_xyz
+
+START = datetime.datetime(2017, 9, 8, 0, 20, 0)
+RECEIVER = (-6100258.869, -996506.167, -1567978.863)
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def slow_function(release):
+    calls = []
+
+    @file_cache(maxsize=4, single_flight=True)
+    def read(filename, scale=1):
+        calls.append(filename)
+        release.wait(5)
+        return len(filename) * scale
+
+    return read, calls
+
+
+def test_load_nav(nav_iter_v3):
+    content = nav_iter_v3.getvalue()
+
+    async def main():
+        return await asyncio.gather(
+            aio.load_nav(nav_iter_v3),
+            aio.load_nav(StringIO(content)),
+            aio.load_nav(StringIO(content), healthy_only=True),
+        )
+
+    first, second, healthy = run(main())
+    assert first is second is read_nav_data(StringIO(content))
+    assert healthy == read_nav_data(StringIO(content), True)
+    assert nav_iter_v3.tell() == 0
+
+
+def test_coalesced():
+    release = threading.Event()
+    read, calls = slow_function(release)
+
+    async def main():
+        requests = [aio.coalesced(read, 'abc') for _ in range(4)]
+        requests.append(aio.coalesced(read, 'abc', 2))
+        gathered = asyncio.gather(*requests)
+        await asyncio.sleep(0.05)
+        release.set()
+        return await gathered
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        aio.set_executor(executor)
+        try:
+            assert run(main()) == [3, 3, 3, 3, 6]
+        finally:
+            aio.set_executor(None)
+    assert calls == ['abc', 'abc']
+
+
+def test_cancel():
+    release = threading.Event()
+    read, calls = slow_function(release)
+
+    async def main():
+        cancelled = asyncio.ensure_future(aio.coalesced(read, 'abc'))
+        kept = asyncio.ensure_future(aio.coalesced(read, 'abc'))
+        await asyncio.sleep(0.05)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        return await kept
+
+    assert run(main()) == 3
+    assert calls == ['abc']
+    assert read.cache_info().currsize == 1
+
+
+def test_errors(nav_iter_v3):
+    broken = StringIO(nav_iter_v3.getvalue().replace('G01', 'X01'))
+
+    async def main():
+        return await asyncio.gather(aio.load_nav(broken),
+                                    aio.load_nav(broken),
+                                    return_exceptions=True)
+
+    errors = run(main())
+    assert len(errors) == 2
+    assert all(isinstance(e, Exception) for e in errors)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, aio.CHUNK_SIZE])
+def test_satellite_xyz_many(nav_file_v3, chunk_size):
+    epochs = [START + datetime.timedelta(minutes=15 * i) for i in range(10)]
+    satellites = np.array(['G', 'S'] * 5)
+    numbers = np.array([1, 20] * 5)
+
+    with nav_file_v3 as filename:
+        expected = satellite_xyz_many(filename, satellites, numbers, epochs)
+        visible = satellite_xyz_many(filename, satellites, numbers, epochs,
+                                     receiver=RECEIVER, elevation_mask=-90)
+
+        xyz = run(aio.satellite_xyz_many(filename, satellites, numbers,
+                                         epochs, chunk_size=chunk_size))
+        np.testing.assert_array_equal(xyz, expected)
+
+        index, xyz = run(aio.satellite_xyz_many(
+            filename, satellites, numbers, epochs, receiver=RECEIVER,
+            elevation_mask=-90, chunk_size=chunk_size))
+        np.testing.assert_array_equal(index, visible[0])
+        np.testing.assert_array_equal(xyz, visible[1])
+
+        single = run(aio.satellite_xyz(filename, 'G', 1, epochs[0]))
+        assert single == satellite_xyz(filename, 'G', 1, epochs[0])
@@ -0,0 +1,137 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from coordinates.batch import (
+    coarse_visibility,
+    glo_sat_xyz_array,
+    gps_sat_xyz_array,
+    read_nav_arrays,
+    satellite_index,
+    satellite_xyz_many,
+    xyz_array_calculator,
+)
+from coordinates.ephemeris import GloEphemeris
+from coordinates.exceptions import SatSystemError, NavMessageNotFoundError
+from coordinates.geodesy import receiver_frames, row_elevation
+from coordinates.sat import GLO_WAY, GPS_WAY, satellite_xyz
+from coordinates.timescale import datetime2sec
+
+
+@pytest.fixture
+def epochs():
+    start = datetime.datetime(2017, 9, 8, 0, 20, 0)
+    return [start + datetime.timedelta(minutes=15 * i) for i in range(10)]
+
+
+def test_xyz_array_calculator():
+    for s in GPS_WAY:
+        assert xyz_array_calculator(s) is gps_sat_xyz_array
+
+    for s in GLO_WAY:
+        assert xyz_array_calculator(s) is glo_sat_xyz_array
+
+    with pytest.raises(SatSystemError):
+        xyz_array_calculator('X')
+
+
+def test_satellite_index():
+    index = {('G', 1): 0, ('R', 1): 1, ('G', 7): 2}
+    satellite = np.array(['G', 'R', 'G', 'G', 'R'])
+    number = np.array([7, 1, 1, 7, 1])
+    np.testing.assert_array_equal(
+        satellite_index(index, satellite, number), [2, 1, 0, 2, 1])
+    assert satellite_index(index, satellite[:0], number[:0]).size == 0
+
+    with pytest.raises(NavMessageNotFoundError, match='R2'):
+        satellite_index(index, satellite, np.array([7, 2, 1, 7, 1]))
+
+
+def test_read_nav_arrays(nav_file_unsorted_v3):
+    with nav_file_unsorted_v3 as filename:
+        arrays = read_nav_arrays(filename)
+
+    epochs, messages, ephemerides = arrays[('S', 20)]
+    std = datetime2sec([
+        datetime.datetime(2017, 9, 8, 0, 0, 32),
+        datetime.datetime(2017, 9, 8, 0, 3, 12),
+        datetime.datetime(2017, 9, 8, 0, 5, 52),
+    ])
+    np.testing.assert_array_equal(epochs, std)
+    assert messages.shape == (3, 12)
+    np.testing.assert_array_equal(messages[:, -1], [2, 12, 22])
+    assert ephemerides.shape == (3, len(GloEphemeris.fields))
+    np.testing.assert_array_equal(
+        GloEphemeris.columns(ephemerides)['x0'],
+        messages[:, 0] * 1000,
+    )
+
+
+@pytest.mark.parametrize('satellite, number', [('G', 1), ('S', 20)])
+def test_satellite_xyz_many(nav_file_v3, epochs, satellite, number):
+    with nav_file_v3 as filename:
+        std = [satellite_xyz(filename, satellite, number, e) for e in epochs]
+
+        # reference_time rounds the seconds of the week to ~1e-7 s
+        test = satellite_xyz_many(filename, satellite, number, epochs)
+        np.testing.assert_allclose(test, std, rtol=0, atol=1e-3)
+
+        sec = datetime2sec(epochs)
+        test = satellite_xyz_many(filename, satellite, number, sec)
+        np.testing.assert_allclose(test, std, rtol=0, atol=1e-3)
+
+        for e, xyz in zip(sec, test):
+            std = satellite_xyz(filename, satellite, number, e)
+            np.testing.assert_allclose(xyz, std, rtol=0, atol=1e-6)
+
+
+def test_satellite_xyz_many_mixed(nav_file_v3, epochs):
+    sec = datetime2sec(epochs)
+    satellites = np.array(['G', 'S'] * (len(sec) // 2))
+    numbers = np.array([1, 20] * (len(sec) // 2))
+
+    with nav_file_v3 as filename:
+        test = satellite_xyz_many(filename, satellites, numbers, sec)
+        for i, (s, n, e) in enumerate(zip(satellites, numbers, sec)):
+            std = satellite_xyz_many(filename, s, n, e)[0]
+            np.testing.assert_array_equal(test[i], std)
+
+
+def test_satellite_xyz_many_errors(nav_file_v3, epochs):
+    with nav_file_v3 as filename:
+        with pytest.raises(SatSystemError):
+            satellite_xyz_many(filename, 'X', 1, epochs)
+
+        with pytest.raises(NavMessageNotFoundError):
+            satellite_xyz_many(filename, 'R', 1, epochs)
+
+        with pytest.raises(NavMessageNotFoundError):
+            epoch = datetime.datetime(2017, 9, 10)
+            satellite_xyz_many(filename, 'S', 20, [epoch])
+
+
+def test_satellite_xyz_many_visible(nav_file_v3):
+    receiver = (4121967.5664, 2652172.1378, 4069036.5926)
+    frame = receiver_frames(receiver)[0]
+    start = datetime2sec(datetime.datetime(2017, 9, 8))
+    sec = start + 30 * np.arange(2880)
+    satellites = np.array(['G', 'S'])[:, np.newaxis]
+    numbers = np.array([1, 20])[:, np.newaxis]
+
+    with nav_file_v3 as filename:
+        std = satellite_xyz_many(filename, satellites, numbers, sec)
+        elevation = row_elevation(receiver, frame, std)
+        for mask in (0, 10, 30):
+            index, xyz = satellite_xyz_many(filename, satellites, numbers,
+                                            sec, receiver=receiver,
+                                            elevation_mask=mask)
+            std_index = np.flatnonzero(elevation >= mask)
+            np.testing.assert_array_equal(index, std_index)
+            np.testing.assert_array_equal(xyz, std[std_index])
+
+        candidate = coarse_visibility(filename, 'G', 1, sec, receiver,
+                                      frame, 10)
+        visible = elevation[:len(sec)] >= 10
+        assert np.all(candidate[visible])
+        assert np.count_nonzero(~candidate) > len(sec) / 4
@@ -1,9 +1,12 @@
 import pytest
 
+from concurrent.futures import ThreadPoolExecutor
 from io import StringIO
 
 from coordinates.broadcast import rnx_nav
 from coordinates.broadcast import RinexNavFileV3, RinexNavFileV2
+from coordinates.broadcast import NavParseError
+from coordinates.exceptions import RinexNavFileError
 
 
 def test_rnx_nav_v2(nav_file_v2):
@@ -23,3 +26,170 @@ def test_version_stringio_reading_v2(nav_iter_v2):
 def test_version_stringio_reading_v3(nav_iter_v3):
     info = RinexNavFileV3.retrieve_ver_type(nav_iter_v3)
     assert len(info) == 3
+
+
+@pytest.mark.parametrize('fixture', ['nav_file_v2', 'nav_file_v3',
+                                     'nav_file_unsorted_v3'])
+def test_iter_bytes(request, fixture):
+    with request.getfixturevalue(fixture) as filename:
+        nav = rnx_nav(filename)
+        records = list(nav.iter_bytes())
+        assert records
+        assert records == list(nav)
+
+
+@pytest.mark.parametrize('fixture', ['nav_iter_v2', 'nav_iter_v3'])
+def test_iter_bytes_file_object(request, fixture):
+    file_object = request.getfixturevalue(fixture)
+    nav = rnx_nav(file_object)
+    assert list(nav.iter_bytes()) == list(nav)
+    assert file_object.tell() == 0
+
+
+@pytest.mark.parametrize('method', ['__iter__', 'iter_bytes'])
+def test_shared_file_object(nav_iter_v3, method):
+    expected = list(rnx_nav(StringIO(nav_iter_v3.getvalue())))
+
+    def read(_):
+        return list(getattr(rnx_nav(nav_iter_v3), method)())
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(read, range(32)))
+
+    assert all(records == expected for records in results)
+    assert nav_iter_v3.tell() == 0
+
+
+def test_iter_bytes_line_endings(nav_iter_v3):
+    content = nav_iter_v3.getvalue()
+    expected = list(rnx_nav(StringIO(content)))
+
+    crlf = StringIO(content.replace('\n', '\r\n'))
+    assert list(rnx_nav(crlf).iter_bytes()) == expected
+
+    no_newline = StringIO(content.rstrip('\n'))
+    assert list(rnx_nav(no_newline).iter_bytes()) == expected
+
+    # the trailing blanks are stripped by some tools
+    stripped = StringIO(
+        '\n'.join(line.rstrip() for line in content.split('\n')))
+    assert list(rnx_nav(stripped).iter_bytes()) == expected
+
+
+def test_iter_bytes_chunks(nav_iter_v3, monkeypatch):
+    import coordinates.broadcast
+
+    expected = list(rnx_nav(nav_iter_v3))
+    monkeypatch.setattr(coordinates.broadcast, 'BUFFER_CHUNK', 1)
+    assert list(rnx_nav(nav_iter_v3).iter_bytes()) == expected
+
+
+@pytest.mark.parametrize('old, new', [
+    ('G01 2017 09 08', 'G01 2017 13 08'),
+    ('G01 2017 09 08 00 00 00 5.53', 'G01 2017 09 08 00 00 00 5.5x'),
+    ('7.021094555967e-03', '7.021094555967f-03'),
+    ('S20 2017', 'X20 2017'),
+])
+def test_iter_bytes_errors(nav_iter_v3, old, new):
+    content = nav_iter_v3.getvalue().replace(old, new)
+    with pytest.raises(RinexNavFileError):
+        list(rnx_nav(StringIO(content)).iter_bytes())
+
+
+def test_iter_bytes_spare_fields(nav_iter_v3):
+    content = nav_iter_v3.getvalue()
+    expected = list(rnx_nav(StringIO(content)))
+
+    spare = content.replace(
+        '4.000000000000e+00' + ' ' * 38,
+        '4.000000000000e+00' + '{:19s}{:19s}'.format(' spare', ' n/a'),
+    )
+    assert spare != content
+    assert list(rnx_nav(StringIO(spare))) == expected
+    assert list(rnx_nav(StringIO(spare)).iter_bytes()) == expected
+
+    # the error is reported for the line of the invalid value
+    damaged = spare.replace('7.021094555967e-03', '7.021094555967f-03')
+    with pytest.raises(RinexNavFileError, match='7.021094555967f-03'):
+        list(rnx_nav(StringIO(damaged)).iter_bytes())
+
+
+def test_iter_bytes_truncated(nav_iter_v3):
+    content = nav_iter_v3.getvalue()
+    content = content[:content.rindex('     0.000000000000e+00')]
+    with pytest.raises(RinexNavFileError):
+        list(rnx_nav(StringIO(content)).iter_bytes())
+
+
+# the second record of nav_iter_v3 starts on the line 22
+@pytest.mark.parametrize('old, new, line_number, message', [
+    # a field of the orbit
+    ('7.021094555967e-03', '7.021094555967f-03', 14, "Can't parse"),
+    # the epoch
+    ('G01 2017 09 08', 'G01 2017 13 08', 14, "Can't read epoch"),
+    # a lost line
+    ('     9.681868691207e-01 3.310000000000e+02 6.192489497701e-01'
+     '-8.576071513516e-09\n', '', 14, 'Incomplete record'),
+    # unknown system
+    ('S20 2017', 'X20 2017', 22, "Can't read epoch"),
+    # garbage between the records: the previous record can't be trusted
+    ('S20 2017', '\x00\x00garbage\nS20 2017', 14, 'Unexpected line'),
+    # a duplicated orbit line
+    ('     9.681868691207e-01 3.310000000000e+02 6.192489497701e-01'
+     '-8.576071513516e-09\n',
+     '     9.681868691207e-01 3.310000000000e+02 6.192489497701e-01'
+     '-8.576071513516e-09\n' * 2, 14, 'Unexpected line'),
+])
+def test_iter_bytes_skip(nav_iter_v3, old, new, line_number, message):
+    content = nav_iter_v3.getvalue()
+    damaged = content.replace(old, new)
+    assert damaged != content
+
+    expected = list(rnx_nav(nav_iter_v3))
+    nav = rnx_nav(StringIO(damaged))
+    records = list(nav.iter_bytes(errors='skip'))
+
+    assert len(nav.errors) == 1
+    error = nav.errors[0]
+    assert isinstance(error, NavParseError)
+    assert error.line_number == line_number
+    assert error.message.startswith(message)
+
+    lines = damaged.split('\n')
+    assert error.offset == len('\n'.join(lines[:line_number - 1])) + 1
+
+    assert len(records) == len(expected) - 1
+    assert all(r in expected for r in records)
+
+
+def test_iter_bytes_skip_truncated(nav_iter_v2):
+    content = nav_iter_v2.getvalue()
+    expected = list(rnx_nav(nav_iter_v2))
+    # the last line of the second record
+    end = content.rindex('    0.864000000000D+05 0.000000000000D+00')
+    nav = rnx_nav(StringIO(content[:end]))
+
+    assert list(nav.iter_bytes(errors='skip')) == expected[:1]
+    assert [e.message for e in nav.errors] == ['Unexpected end of the file.']
+
+
+def test_iter_bytes_skip_many(nav_iter_v2, monkeypatch):
+    import coordinates.broadcast
+
+    monkeypatch.setattr(coordinates.broadcast, 'BUFFER_CHUNK', 16)
+    content = nav_iter_v2.getvalue()
+    header, body = content.split('END OF HEADER')
+    body = body[body.index('\n') + 1:]
+    damaged = body.replace('0.350000000000D+02', '0.35000000000xD+02')
+    content = header + 'END OF HEADER\n' + (body * 10 + damaged) * 3
+
+    nav = rnx_nav(StringIO(content))
+    records = list(nav.iter_bytes(errors='skip'))
+    assert len(records) == 3 * 21
+    assert [e.line_number for e in nav.errors] == [
+        8 + 8 * 22 * i + 8 * 20 + 1 for i in range(3)]
+
+
+def test_iter_bytes_errors_mode(nav_iter_v3):
+    with pytest.raises(ValueError):
+        list(rnx_nav(nav_iter_v3).iter_bytes(errors='ignore'))
@@ -0,0 +1,231 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO, StringIO
+
+import pytest
+
+from coordinates.cache import cache_key, file_cache
+from coordinates.sat import read_nav_data, satellite_xyz
+
+
+def counting_function():
+    calls = []
+
+    @file_cache(maxsize=4)
+    def read(filename, scale=1):
+        """Reads the file."""
+        calls.append(filename)
+        if isinstance(filename, str):
+            with open(filename) as file_object:
+                return len(file_object.read()) * scale
+        if hasattr(filename, 'read'):
+            size = len(filename.read())
+            filename.seek(0)
+            return size * scale
+        return filename.value * scale
+
+    return read, calls
+
+
+def test_path(tmp_path):
+    path = str(tmp_path / 'test.txt')
+    with open(path, 'w') as out:
+        out.write('abc')
+
+    read, calls = counting_function()
+    assert read(path) == 3
+    assert read(path) == 3
+    # the default is a part of the key
+    assert read(path, 1) == 3
+    assert read(path, 2) == 6
+    assert len(calls) == 2
+
+    with open(path, 'a') as out:
+        out.write('d')
+    assert read(path) == 4
+    assert len(calls) == 3
+
+    # the same size, another modification time
+    stat = os.stat(path)
+    with open(path, 'w') as out:
+        out.write('efgh')
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert read(path) == 4
+    assert len(calls) == 4
+
+
+def test_missing_path(tmp_path):
+    path = str(tmp_path / 'missing.txt')
+    assert cache_key(path) == ('path', path)
+
+
+def test_file_objects():
+    read, calls = counting_function()
+
+    first, second = StringIO('abc'), StringIO('abc')
+    assert read(first) == 3
+    assert first.tell() == 0
+    assert read(second) == 3
+    assert calls == [first]
+
+    # the mutated buffer is read again
+    first.write('abcd')
+    first.seek(0)
+    assert read(first) == 4
+    assert len(calls) == 2
+
+    assert read(BytesIO(b'abc')) == 3
+    assert len(calls) == 2
+
+    # the content from the current position
+    third = StringIO('xabc')
+    third.seek(1)
+    assert cache_key(third) != cache_key(StringIO('xabc'))
+
+
+def test_token():
+    read, calls = counting_function()
+
+    first, second = StringIO('abc'), StringIO('abcd')
+    first.cache_token = second.cache_token = ('brdc', 1)
+    assert read(first) == 3
+    assert read(second) == 3
+    assert len(calls) == 1
+
+    second.cache_token = ('brdc', 2)
+    assert read(second) == 4
+    assert len(calls) == 2
+
+
+def test_objects():
+    class Orbits:
+        value = 5
+
+    read, calls = counting_function()
+    orbits = Orbits()
+    assert read(orbits) == 5
+    assert read(orbits) == 5
+    assert read(Orbits()) == 5
+    assert len(calls) == 2
+
+
+def test_cache_functions():
+    read, calls = counting_function()
+    read(StringIO('abc'))
+
+    assert read.__name__ == 'read'
+    assert read.__doc__ == 'Reads the file.'
+    assert read.cache_info().misses == 1
+    assert read.__wrapped__(StringIO('ab')) == 2
+
+    read.cache_clear()
+    assert read.cache_info().currsize == 0
+
+
+def test_single_flight():
+    calls = []
+
+    @file_cache(maxsize=4, single_flight=True)
+    def read(filename, scale=1):
+        calls.append((filename.getvalue(), scale))
+        time.sleep(0.05)
+        return len(filename.getvalue()) * scale
+
+    barrier = threading.Barrier(8)
+
+    def call(i):
+        barrier.wait()
+        return read(StringIO('abc'), i % 2 + 1)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(call, range(8)))
+
+    assert results == [3, 6] * 4
+    assert sorted(calls) == [('abc', 1), ('abc', 2)]
+    assert read.cache_info().misses == 2
+
+
+def test_single_flight_error():
+    calls = []
+
+    @file_cache(maxsize=4, single_flight=True)
+    def read(filename):
+        calls.append(filename)
+        raise ValueError(filename)
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            read('missing')
+    # the errors aren't cached
+    assert len(calls) == 2
+
+
+class CountingStringIO(StringIO):
+    reads = 0
+
+    def read(self, *args):
+        self.reads += 1
+        return super().read(*args)
+
+
+def test_content_hash_memo():
+    stream = CountingStringIO('abc')
+    key = cache_key(stream)
+    assert cache_key(stream) == key
+    assert stream.reads == 1
+
+    # another position or size
+    stream.seek(1)
+    assert cache_key(stream) != key
+    stream.seek(0, 2)
+    stream.write('d')
+    stream.seek(0)
+    assert cache_key(stream) == cache_key(StringIO('abcd'))
+    assert stream.reads == 3
+
+
+def test_satellite_xyz_reads(nav_iter_v3):
+    stream = CountingStringIO(nav_iter_v3.getvalue())
+    epoch = read_nav_data(nav_iter_v3)[('G', 1)][0]['epoch']
+
+    xyz = satellite_xyz(stream, 'G', 1, epoch)
+    # the hash: read_nav_data is cached by the same content
+    assert stream.reads == 1
+    for _ in range(3):
+        assert satellite_xyz(stream, 'G', 1, epoch) == xyz
+    assert stream.reads == 1
+    assert satellite_xyz.__wrapped__(StringIO(nav_iter_v3.getvalue()),
+                                     'G', 1, epoch) == xyz
+
+    # a miss: one hash and one parse
+    content = nav_iter_v3.getvalue().replace('5.153673307419e+03',
+                                             '5.253673307419e+03')
+    parsed = CountingStringIO(content)
+    read_nav_data.__wrapped__(parsed)
+    mutated = CountingStringIO(content)
+    assert satellite_xyz(mutated, 'G', 1, epoch) != xyz
+    assert mutated.reads == parsed.reads + 1
+
+
+def test_read_nav_data(nav_iter_v3):
+    content = nav_iter_v3.getvalue()
+    nav_data = read_nav_data(nav_iter_v3)
+    assert read_nav_data(StringIO(content)) is nav_data
+
+    mutated = StringIO(content.replace('G01', 'G02'))
+    assert list(read_nav_data(mutated)) == [('G', 2), ('S', 20)]
+
+
+def test_satellite_xyz(nav_iter_v3):
+    content = nav_iter_v3.getvalue()
+    epoch = read_nav_data(nav_iter_v3)[('G', 1)][0]['epoch']
+    xyz = satellite_xyz(nav_iter_v3, 'G', 1, epoch)
+
+    assert satellite_xyz(StringIO(content), 'G', 1, epoch) == xyz
+
+    # another orbit of the satellite
+    mutated = StringIO(content.replace('5.153673307419e+03',
+                                       '5.253673307419e+03'))
+    assert satellite_xyz(mutated, 'G', 1, epoch) != xyz
@@ -0,0 +1,138 @@
+import datetime
+import gzip
+import io
+import os
+
+import pytest
+
+from coordinates.catalogue import (
+    Catalogue,
+    ScanResult,
+    find_files,
+    header_lines,
+    read_header,
+)
+from coordinates.exceptions import RinexObsFileError
+from coordinates.synthetic import write_obs_header
+
+START = datetime.datetime(2017, 7, 6, 0, 0, 30)
+POSITION = (-6100258.869, -996506.167, -1567978.863)
+
+# an observation record after the header
+DATA = ' 17  7  6  0  0 30.0000000  0  1G01\n' * 100
+
+
+def obs_content(marker='SYNT', version=3.03, position=POSITION):
+    out = io.StringIO()
+    write_obs_header(out, START, position, version=version, marker=marker,
+                     systems='G', interval=15.)
+    return out.getvalue() + DATA
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if path.endswith('.gz'):
+        with gzip.open(path, 'wt') as obs_file:
+            obs_file.write(content)
+    else:
+        with open(path, 'w') as obs_file:
+            obs_file.write(content)
+    return path
+
+
+@pytest.fixture
+def archive(tmp_path):
+    root = str(tmp_path / 'archive')
+    write(os.path.join(root, '2017', '187', 'aspa1870.17o'),
+          obs_content('ASPA', 2.11))
+    write(os.path.join(root, '2017', '187', 'SYNT00XXX_R_20171870000_01D_'
+                                            '30S_MO.rnx.gz'),
+          obs_content('SYNT'))
+    write(os.path.join(root, '2017', '187', 'readme.txt'), 'not RINEX')
+    return root
+
+
+@pytest.mark.parametrize('chunk_size', [7, 80, 1 << 14])
+def test_header_lines(tmp_path, chunk_size):
+    path = write(str(tmp_path / 'test.17o'), obs_content())
+    lines = header_lines(path, chunk_size)
+
+    assert lines[0][60:].strip() == 'RINEX VERSION / TYPE'
+    assert lines[-1][60:].strip() == 'END OF HEADER'
+    assert len(lines) == len(obs_content().split(DATA)[0].splitlines())
+
+
+def test_header_lines_errors(tmp_path):
+    path = write(str(tmp_path / 'test.17o'),
+                 obs_content().replace('END OF HEADER', 'END OF THE HEAD'))
+    with pytest.raises(RinexObsFileError, match='end of the header'):
+        header_lines(path)
+
+    # the label must be in the label columns
+    path = write(str(tmp_path / 'comment.17o'),
+                 'END OF HEADER' + obs_content())
+    assert len(header_lines(path)) == len(header_lines(
+        write(str(tmp_path / 'plain.17o'), obs_content())))
+
+
+@pytest.mark.parametrize('version', [2.11, 3.03])
+def test_read_header(tmp_path, version):
+    path = write(str(tmp_path / 'test.17o.gz'), obs_content('ASPA', version))
+    header = read_header(path)
+
+    assert header.version == version
+    assert header.marker_name == 'ASPA'
+    assert header.xyz == POSITION
+    assert header.receiver == ('1', 'SYNTHETIC', '1.0')
+    assert header.antenna == ('1', 'SYNTHETIC       NONE')
+    assert header.interval == 15.
+    assert header.first_epoch == START
+
+
+def test_find_files(archive):
+    names = [os.path.basename(p) for p in find_files([archive])]
+    assert names == ['SYNT00XXX_R_20171870000_01D_30S_MO.rnx.gz',
+                     'aspa1870.17o']
+
+
+def test_catalogue(tmp_path, archive):
+    filename = str(tmp_path / 'catalogue.json')
+    catalogue = Catalogue(filename)
+
+    assert catalogue.update(archive, workers=2) == ScanResult(2, 0, 0, 0)
+    assert sorted(h.marker_name for _, h in catalogue.items()) == [
+        'ASPA', 'SYNT']
+    catalogue.save()
+
+    # a rescan reads the changed files only
+    catalogue = Catalogue(filename)
+    assert len(catalogue) == 2
+    assert catalogue.update(archive) == ScanResult(0, 2, 0, 0)
+
+    path = os.path.join(archive, '2017', '187', 'aspa1870.17o')
+    write(path, obs_content('ASPB', 2.11))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert catalogue.update(archive) == ScanResult(1, 1, 0, 0)
+    assert catalogue[path].marker_name == 'ASPB'
+
+    os.remove(path)
+    assert catalogue.update(archive) == ScanResult(0, 1, 1, 0)
+    assert path not in catalogue
+
+
+def test_catalogue_errors(tmp_path, archive):
+    path = write(os.path.join(archive, 'broken.17o'), 'broken\n')
+    catalogue = Catalogue()
+
+    assert catalogue.update(archive) == ScanResult(2, 0, 0, 1)
+    assert path in catalogue.errors
+    with pytest.raises(KeyError):
+        catalogue[path]
+
+    # not retried until changed
+    assert catalogue.update(archive) == ScanResult(0, 3, 0, 0)
+
+    filename = str(tmp_path / 'catalogue.json')
+    catalogue.save(filename)
+    assert Catalogue(filename).errors == catalogue.errors
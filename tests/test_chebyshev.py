@@ -0,0 +1,85 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from coordinates.batch import satellite_xyz_grid, satellite_xyz_many
+from coordinates.chebyshev import ChebyshevOrbits
+from coordinates.exceptions import ChebyshevFitError, NavMessageNotFoundError
+from coordinates.timescale import datetime2sec
+
+
+@pytest.fixture
+def fit_range():
+    start = datetime.datetime(2017, 9, 8, 0, 15)
+    end = datetime.datetime(2017, 9, 8, 3, 0)
+    return start, end
+
+
+def test_fit(nav_file_v3, fit_range):
+    start, end = fit_range
+    with nav_file_v3 as filename:
+        orbits = ChebyshevOrbits.fit(
+            filename, ['G', 'S'], [1, 20], start, end, tolerance=1e-3,
+        )
+
+        assert orbits.coefficients.shape == (2, 11, 3, 11)
+        assert np.all(orbits.max_error < 1e-3)
+
+        sec = np.linspace(datetime2sec(start), datetime2sec(end), 1001)
+        for sat, num in [('G', 1), ('S', 20)]:
+            std = satellite_xyz_many(filename, sat, num, sec)
+            test = orbits.satellite_xyz_many(sat, num, sec)
+            np.testing.assert_allclose(test, std, rtol=0, atol=1e-3)
+
+        test = orbits.satellite_xyz_many(['G', 'S'], [1, 20], sec[:2])
+        std = [orbits.satellite_xyz_many('G', 1, sec[0])[0],
+               orbits.satellite_xyz_many('S', 20, sec[1])[0]]
+        np.testing.assert_array_equal(test, std)
+
+
+def test_fit_tolerance(nav_file_v3, fit_range):
+    start, end = fit_range
+    with nav_file_v3 as filename:
+        with pytest.raises(ChebyshevFitError):
+            ChebyshevOrbits.fit(
+                filename, 'G', 1, start, end,
+                interval=7200, degree=3, tolerance=1e-3,
+            )
+
+
+def test_save_load(nav_file_v3, fit_range, tmp_path):
+    start, end = fit_range
+    with nav_file_v3 as filename:
+        orbits = ChebyshevOrbits.fit(filename, 'G', 1, start, end)
+
+    path = str(tmp_path / 'orbits.npz')
+    orbits.save(path)
+    loaded = ChebyshevOrbits.load(path)
+
+    sec = np.linspace(datetime2sec(start), datetime2sec(end), 11)
+    np.testing.assert_array_equal(
+        loaded.satellite_xyz_many('G', 1, sec),
+        orbits.satellite_xyz_many('G', 1, sec),
+    )
+    np.testing.assert_array_equal(loaded.max_error, orbits.max_error)
+
+    with pytest.raises(NavMessageNotFoundError):
+        loaded.satellite_xyz_many('G', 1, datetime2sec(end) + 3600)
+
+    with pytest.raises(NavMessageNotFoundError):
+        loaded.satellite_xyz_many('G', 2, sec)
+
+
+def test_grid(nav_file_v3, fit_range):
+    start, end = fit_range
+    sec = np.linspace(datetime2sec(start), datetime2sec(end), 11)
+    with nav_file_v3 as filename:
+        orbits = ChebyshevOrbits.fit(filename, 'G', 1, start, end)
+
+    # the satellite which was not fitted gives NaN
+    xyz = satellite_xyz_grid(orbits, ['G', 'G'], [1, 2], sec)
+    assert xyz.shape == (2, 11, 3)
+    expected = orbits.satellite_xyz_many('G', 1, sec)
+    np.testing.assert_array_equal(xyz[0], expected)
+    assert np.isnan(xyz[1]).all()
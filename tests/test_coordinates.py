@@ -1,11 +1,17 @@
 # coding=utf8
 """Test suite for gpss.coordinates."""
+import logging
+import subprocess
+import sys
 from io import StringIO
 from os import remove
 
 from contextlib import contextmanager
 from tempfile import NamedTemporaryFile
 
+import pytest
+
+import coordinates
 from coordinates import retrieve_xyz, xyz2lbh
 
 RNX = '''\
@@ -68,3 +74,31 @@ def test_xyz2lbh():
     std_lbh = (32.75819444508266, 39.88741666437168, 989.9998747808859)
     lbh = xyz2lbh(*xyz)
     assert std_lbh == lbh
+
+
+def test_lazy_import():
+    from coordinates.sat import satellite_xyz
+
+    assert coordinates.satellite_xyz is satellite_xyz
+    assert 'stats' in dir(coordinates)
+
+    with pytest.raises(AttributeError, match='unknown'):
+        coordinates.unknown
+
+
+def test_import_side_effects():
+    # a fresh interpreter: the heavy submodules aren't imported, and the
+    # logging isn't configured
+    code = """\
+import logging
+import sys
+
+import coordinates
+
+heavy = {'numpy', 'coordinates.sat', 'coordinates.broadcast'}
+print(sorted(heavy & set(sys.modules)))
+print(logging.getLogger().handlers, logging.getLogger().level)
+"""
+    output = subprocess.check_output([sys.executable, '-c', code],
+                                     universal_newlines=True)
+    assert output.splitlines() == ['[]', '[] {}'.format(logging.WARNING)]
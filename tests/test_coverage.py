@@ -0,0 +1,103 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from coordinates.coverage import coverage, grid_points
+from coordinates.geodesy import lbh2xyz_array, xyz2lbh_array
+
+RADIUS = 26560e3
+
+# lon, lat of the sub-satellite points, degrees
+SUB_POINTS = [(0, 0), (40, 30), (-40, 30), (20, -40), (-30, -20), (90, 60),
+              (180, 0), (0, 89)]
+
+
+class StaticOrbits:
+    """Satellites fixed over the sub-satellite points."""
+
+    def __init__(self):
+        lon, lat = np.radians(SUB_POINTS).T
+        self.xyz = RADIUS * np.column_stack([
+            np.cos(lat) * np.cos(lon),
+            np.cos(lat) * np.sin(lon),
+            np.sin(lat),
+        ])
+
+    def satellite_xyz_many(self, satellite, number, epoch):
+        epoch = np.atleast_1d(epoch)
+        return np.repeat(self.xyz[[number - 1]], len(epoch), axis=0)
+
+
+def reference_dop(point, sats, mask):
+    lon, lat, _ = xyz2lbh_array(*point, deg=False)
+    rows = []
+    for sat in sats:
+        los = (sat - point) / np.linalg.norm(sat - point)
+        e = -np.sin(lon) * los[0] + np.cos(lon) * los[1]
+        n = (-np.sin(lat) * np.cos(lon) * los[0] -
+             np.sin(lat) * np.sin(lon) * los[1] + np.cos(lat) * los[2])
+        u = (np.cos(lat) * np.cos(lon) * los[0] +
+             np.cos(lat) * np.sin(lon) * los[1] + np.sin(lat) * los[2])
+        if np.degrees(np.arcsin(u)) >= mask:
+            rows.append((-e, -n, -u, 1))
+    if len(rows) < 4:
+        return len(rows), None
+    q = np.linalg.inv(np.dot(np.transpose(rows), rows))
+    return len(rows), np.sqrt(np.diag(q))
+
+
+def test_lbh2xyz_array():
+    lon = np.array([0., 37.6, 200., 359.])
+    lat = np.array([0., 55.7, -33., 89.9])
+    h = np.array([0., 150., -20., 1e4])
+
+    x, y, z = lbh2xyz_array(lon, lat, h)
+    test_lon, test_lat, test_h = xyz2lbh_array(x, y, z)
+
+    np.testing.assert_allclose(test_lon, lon, atol=1e-9)
+    np.testing.assert_allclose(test_lat, lat, atol=1e-9)
+    np.testing.assert_allclose(test_h, h, atol=1e-6)
+
+
+def test_coverage():
+    lon = np.arange(0, 360, 30.)
+    lat = np.arange(-80, 81, 20.)
+    epochs = [0., 60., 120.]
+    numbers = np.arange(1, len(SUB_POINTS) + 1)
+
+    test = coverage(StaticOrbits(), 'G', numbers, epochs, lon, lat, mask=5,
+                    block_size=7, workers=2)
+
+    assert test.visible.shape == (3, len(lat), len(lon))
+
+    points, _ = grid_points(lon, lat)
+    sats = StaticOrbits().xyz
+    for i, point in enumerate(points):
+        row, col = divmod(i, len(lon))
+        visible, dop = reference_dop(point, sats, 5)
+        assert (test.visible[:, row, col] == visible).all()
+        if dop is None:
+            assert np.isnan(test.gdop[:, row, col]).all()
+            continue
+        assert test.gdop[0, row, col] == pytest.approx(
+            np.sqrt(np.sum(dop ** 2)))
+        assert test.pdop[1, row, col] == pytest.approx(
+            np.sqrt(np.sum(dop[:3] ** 2)))
+        assert test.hdop[2, row, col] == pytest.approx(
+            np.sqrt(np.sum(dop[:2] ** 2)))
+        assert test.vdop[0, row, col] == pytest.approx(dop[2])
+
+    assert (test.visible >= 4).any()
+    assert np.isnan(test.pdop).any()
+
+
+def test_coverage_nav_file(nav_file_v3):
+    with nav_file_v3 as filename:
+        epochs = [datetime.datetime(2017, 9, 8, 0, 10)]
+        test = coverage(filename, ['G', 'S'], [1, 20], epochs, [0, 90],
+                        [0, 45])
+
+    assert test.visible.shape == (1, 2, 2)
+    assert (test.visible <= 2).all()
+    assert np.isnan(test.gdop).all()
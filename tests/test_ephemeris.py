@@ -0,0 +1,45 @@
+from math import sqrt
+
+import numpy as np
+import pytest
+
+from coordinates import datum
+from coordinates.ephemeris import (
+    GloEphemeris,
+    KeplerEphemeris,
+    ephemeris_array,
+)
+from coordinates.sat import read_nav_data
+
+
+def test_kepler_ephemeris(nav_file_v3):
+    with nav_file_v3 as filename:
+        message = read_nav_data(filename)[('G', 1)][0]['message']
+
+    test = KeplerEphemeris(message)
+
+    assert test.a0 == message[7] ** 2
+    assert test.toe == message[8]
+    assert test.n == sqrt(datum.mu / message[7] ** 6) + message[2]
+    assert test.sqrt_1_e2 == pytest.approx(sqrt(1 - message[5] ** 2))
+    assert test == KeplerEphemeris(message)
+    assert len(test.values()) == len(KeplerEphemeris.fields)
+
+
+def test_ephemeris_array(nav_file_unsorted_v3):
+    with nav_file_unsorted_v3 as filename:
+        records = read_nav_data(filename)[('S', 20)]
+
+    ephemerides = [GloEphemeris(r['message']) for r in records]
+    array = ephemeris_array(ephemerides)
+    assert array.shape == (3, len(GloEphemeris.fields))
+
+    columns = GloEphemeris.columns(array)
+    for i, ephemeris in enumerate(ephemerides):
+        for name in GloEphemeris.fields:
+            assert columns[name][i] == getattr(ephemeris, name)
+
+    np.testing.assert_allclose(
+        columns['r2'],
+        columns['x0'] ** 2 + columns['y0'] ** 2 + columns['z0'] ** 2,
+    )
@@ -0,0 +1,47 @@
+import numpy as np
+
+from coordinates import xyz2lbh
+from coordinates.geodesy import xyz2lbh_array
+
+
+def test_xyz2lbh_array():
+    xyz = np.array([
+        (4121967.5664, 2652172.1378, 4069036.5926),
+        (-6100258.8690, -996506.1670, -1567978.8630),
+        (0., 6378137., 10.),
+        (-13765983.88, 19691265.92, 11753096.55),
+    ])
+    std = np.array([xyz2lbh(*p) for p in xyz])
+
+    test = np.column_stack(xyz2lbh_array(*xyz.T))
+    np.testing.assert_allclose(test[:, :2], std[:, :2], rtol=0, atol=1e-9)
+    np.testing.assert_allclose(test[:, 2], std[:, 2], rtol=0, atol=1e-6)
+
+    std = np.array([xyz2lbh(*p, deg=False) for p in xyz])
+    test = np.column_stack(xyz2lbh_array(*xyz.T, deg=False))
+    np.testing.assert_allclose(test[:, :2], std[:, :2], rtol=0, atol=1e-11)
+
+
+def test_row_azimuth_elevation():
+    from coordinates.geodesy import (
+        receiver_frames,
+        row_azimuth_elevation,
+        row_elevation,
+    )
+    from coordinates.geometry import compute_geometry
+
+    rng = np.random.RandomState(0)
+    receivers = rng.normal(0, 6.4e6, (20, 3))
+    sat_xyz = rng.normal(0, 2.6e7, (20, 3))
+    frames = receiver_frames(receivers)
+
+    azimuth, elevation = row_azimuth_elevation(receivers, frames, sat_xyz)
+    np.testing.assert_allclose(
+        elevation, row_elevation(receivers, frames, sat_xyz), atol=1e-9)
+
+    expected = compute_geometry(receivers[:1], sat_xyz[np.newaxis])
+    azimuth, elevation = row_azimuth_elevation(receivers[0], frames[0],
+                                               sat_xyz)
+    np.testing.assert_allclose(azimuth, expected.azimuth[0, 0], atol=1e-9)
+    np.testing.assert_allclose(elevation, expected.elevation[0, 0],
+                               atol=1e-9)
@@ -0,0 +1,82 @@
+import datetime
+from math import asin, atan2, cos, degrees, sin
+
+import numpy as np
+import pytest
+
+from coordinates import xyz2lbh
+from coordinates.batch import satellite_xyz_many
+from coordinates.geometry import geometry, iter_geometry
+from coordinates.timescale import datetime2sec
+
+RECEIVERS = [
+    (4121967.5664, 2652172.1378, 4069036.5926),
+    (-6100258.8690, -996506.1670, -1567978.8630),
+    (-1132914.0, -6092528.0, 504633.0),
+]
+
+
+@pytest.fixture
+def epochs():
+    start = datetime2sec(datetime.datetime(2017, 9, 8, 1))
+    return start + 600 * np.arange(12)
+
+
+def az_el(receiver, sat):
+    lon, lat, _ = xyz2lbh(*receiver, deg=False)
+    dx, dy, dz = (s - r for s, r in zip(sat, receiver))
+    rng = (dx ** 2 + dy ** 2 + dz ** 2) ** 0.5
+
+    e = -sin(lon) * dx + cos(lon) * dy
+    n = (-sin(lat) * cos(lon) * dx - sin(lat) * sin(lon) * dy +
+         cos(lat) * dz)
+    u = cos(lat) * cos(lon) * dx + cos(lat) * sin(lon) * dy + sin(lat) * dz
+
+    az = degrees(atan2(e, n)) % 360
+    el = degrees(asin(u / rng))
+    return rng, az, el
+
+
+def test_geometry(nav_file_v3, epochs):
+    with nav_file_v3 as filename:
+        test = geometry(filename, RECEIVERS, ['G', 'S', 'R'], [1, 20, 1],
+                        epochs)
+        sat_xyz = [satellite_xyz_many(filename, s, n, epochs)
+                   for s, n in [('G', 1), ('S', 20)]]
+
+    assert test.range.shape == (3, 3, 12)
+    assert test.los.shape == (3, 3, 12, 3)
+
+    for i, receiver in enumerate(RECEIVERS):
+        for k, xyz in enumerate(sat_xyz):
+            for m, sat in enumerate(xyz):
+                rng, az, el = az_el(receiver, sat)
+                assert test.range[i, k, m] == pytest.approx(rng, abs=1e-6)
+                assert test.azimuth[i, k, m] == pytest.approx(az, abs=1e-9)
+                assert test.elevation[i, k, m] == pytest.approx(el,
+                                                                abs=1e-9)
+
+    np.testing.assert_allclose(np.linalg.norm(test.los[:, :2], axis=-1), 1)
+
+    # no messages for R01
+    assert np.isnan(test.range[:, 2]).all()
+
+
+def test_geometry_blocks(nav_file_v3, epochs):
+    with nav_file_v3 as filename:
+        std = geometry(filename, RECEIVERS, ['G', 'S'], [1, 20], epochs,
+                       deg=False)
+        test = geometry(filename, RECEIVERS, ['G', 'S'], [1, 20], epochs,
+                        deg=False, memory_limit=128 * 2 * 5)
+
+        blocks = list(iter_geometry(filename, RECEIVERS, ['G', 'S'],
+                                    [1, 20], epochs,
+                                    memory_limit=128 * 2 * 5))
+
+    for s, t in zip(std, test):
+        np.testing.assert_array_equal(s, t)
+
+    # 3 stations x 3 blocks of epochs
+    assert len(blocks) == 9
+    stations, epochs_slice, block = blocks[0]
+    assert block.range.shape == (1, 2, 5)
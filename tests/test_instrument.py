@@ -0,0 +1,107 @@
+import datetime
+
+import pytest
+
+import coordinates
+from coordinates import instrument
+from coordinates.batch import satellite_xyz_many
+from coordinates.sat import read_nav_data, satellite_xyz
+
+EPOCH = datetime.datetime(2017, 9, 8, 1, 0, 0)
+
+
+@pytest.fixture
+def instrumented():
+    instrument.reset()
+    instrument.enable()
+    yield
+    instrument.disable()
+    instrument.reset()
+
+
+def test_disabled(nav_file_v3):
+    instrument.reset()
+    read_nav_data.cache_clear()
+    with nav_file_v3 as filename:
+        satellite_xyz.__wrapped__(filename, 'G', 1, EPOCH)
+
+    test = coordinates.stats()
+    assert not test['enabled']
+    assert test['counters'] == {}
+    assert test['timers'] == {}
+    assert test['files'] == {}
+
+
+def test_read_nav_data(instrumented, nav_file_v3):
+    read_nav_data.cache_clear()
+    with nav_file_v3 as filename:
+        read_nav_data(filename)
+        read_nav_data(filename)
+
+    test = instrument.stats()
+    assert test['counters']['parse.records'] == 2
+    assert list(test['files'].values()) == [2]
+    assert set(test['timers']) == {'parse', 'read_nav_data'}
+    assert test['timers']['parse'] <= test['timers']['read_nav_data']
+
+    caches = test['caches']['read_nav_data']
+    assert caches['hits'] == 1
+    assert caches['misses'] == 1
+    assert caches['hit_rate'] == 0.5
+
+
+def test_satellite_xyz(instrumented, nav_file_v3):
+    with nav_file_v3 as filename:
+        xyz = satellite_xyz.__wrapped__(filename, 'G', 1, EPOCH)
+        instrument.disable()
+        assert satellite_xyz.__wrapped__(filename, 'G', 1, EPOCH) == xyz
+
+    test = instrument.stats()
+    assert test['counters']['propagate.rows'] == 1
+    assert test['counters']['kepler.solutions'] == 1
+    assert 2 <= test['counters']['kepler.iterations'] < 30
+    assert {'find_message', 'propagate'} <= set(test['timers'])
+
+
+def test_satellite_xyz_many(instrumented, nav_file_v3):
+    with nav_file_v3 as filename:
+        satellite_xyz_many(filename, 'G', 1, [EPOCH] * 5)
+
+    test = instrument.stats()
+    assert test['counters']['propagate.rows'] == 5
+    assert {'find_message', 'propagate'} <= set(test['timers'])
+
+
+def test_callback(instrumented):
+    events = []
+
+    def callback(kind, name, value):
+        events.append((kind, name, value))
+
+    instrument.add_callback(callback)
+    try:
+        instrument.count('test')
+        instrument.count('test', 2)
+        instrument.add_time('stage', 0.5)
+    finally:
+        instrument.remove_callback(callback)
+    instrument.count('test')
+
+    assert events == [
+        ('counter', 'test', 1),
+        ('counter', 'test', 2),
+        ('timer', 'stage', 0.5),
+    ]
+    test = instrument.stats()
+    assert test['counters'] == dict(test=4)
+    assert test['timers'] == dict(stage=0.5)
+
+
+def test_start_stop(instrumented):
+    started = instrument.start()
+    assert instrument.stop('stage', started) >= started
+
+    instrument.disable()
+    assert instrument.start() is None
+    assert instrument.stop('stage', None) is None
+    assert set(instrument.stats()['timers']) == {'stage'}
@@ -0,0 +1,167 @@
+import os
+import subprocess
+import sys
+import textwrap
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from coordinates import jit
+from coordinates.batch import satellite_xyz_many
+from coordinates.ephemeris import (
+    GloEphemeris,
+    KeplerEphemeris,
+    ephemeris_array,
+)
+from coordinates.geodesy import xyz2lbh_array
+from coordinates.kernels import glo_sat_xyz_array, gps_sat_xyz_array
+from coordinates.sat import read_nav_data
+from coordinates.timescale import datetime2sec
+
+
+@pytest.fixture
+def numba_available():
+    pytest.importorskip('numba')
+
+
+def both(func, *args):
+    with jit.use_backend('numpy'):
+        std = func(*args)
+    with jit.use_backend('numba'):
+        test = func(*args)
+    return np.asarray(std), np.asarray(test)
+
+
+def test_set_backend():
+    assert jit.get_backend() in jit.BACKENDS
+    assert 'numpy' in jit.available_backends()
+
+    with pytest.raises(ValueError):
+        jit.set_backend('fortran')
+
+    with jit.use_backend('numpy'):
+        assert jit.get_backend() == 'numpy'
+        assert jit.kernel('gps_sat_xyz') is None
+
+
+@pytest.mark.parametrize('value, expected', [
+    (None, 'numpy'),
+    ('numpy', 'numpy'),
+    ('nmba', 'numpy'),
+])
+def test_initial_backend(monkeypatch, caplog, value, expected):
+    if value is None:
+        monkeypatch.delenv(jit.BACKEND_VARIABLE, raising=False)
+    else:
+        monkeypatch.setenv(jit.BACKEND_VARIABLE, value)
+    assert jit.initial_backend() == expected
+    assert bool(caplog.records) == (value == 'nmba')
+
+
+def test_initial_backend_unavailable(monkeypatch, caplog):
+    monkeypatch.setenv(jit.BACKEND_VARIABLE, 'numba')
+    monkeypatch.setattr(jit, 'available_backends', lambda: ('numpy',))
+    assert jit.initial_backend() == 'numpy'
+    assert 'unavailable' in caplog.text
+
+
+def test_kernels(nav_file_v3, numba_available):
+    rng = np.random.RandomState(0)
+    n = 1000
+
+    with nav_file_v3 as filename:
+        nav_data = read_nav_data(filename)
+    gps = nav_data[('G', 1)][0]['message']
+    glo = nav_data[('S', 20)][0]['message']
+
+    # GPS: vary the mean anomaly
+    ephemerides = np.repeat(ephemeris_array([KeplerEphemeris(gps)]), n, 0)
+    columns = KeplerEphemeris.fields
+    ephemerides[:, columns.index('m0')] += rng.uniform(-np.pi, np.pi, n)
+    sec = gps[8] + rng.uniform(-7200, 7200, n)
+
+    std, test = both(gps_sat_xyz_array, ephemerides, sec)
+    # the same arithmetic; sin and cos may differ in the last bit
+    np.testing.assert_allclose(test, std, rtol=0, atol=1e-6)
+
+    # GLONASS
+    ephemerides = np.repeat(ephemeris_array([GloEphemeris(glo)]), n, 0)
+    dt = rng.uniform(-900, 900, n)
+
+    std, test = both(glo_sat_xyz_array, ephemerides, dt)
+    np.testing.assert_array_equal(test, std)
+
+    # geodetic conversion
+    xyz = rng.normal(0, 7e6, (n, 3))
+    xyz[0] = (0, 1e6, 1e6)
+    xyz[1] = (0, -1e6, 1e6)
+
+    for deg in (True, False):
+        std, test = both(xyz2lbh_array, *xyz.T, deg)
+        np.testing.assert_allclose(test[:2], std[:2], rtol=0, atol=1e-12)
+        np.testing.assert_allclose(test[2], std[2], rtol=0, atol=1e-6)
+
+
+def test_threads(numba_available, monkeypatch):
+    monkeypatch.setitem(jit._state, 'kernels', None)
+    xyz = np.random.RandomState(0).normal(0, 7e6, (1000, 3))
+
+    with jit.use_backend('numpy'):
+        expected = np.asarray(xyz2lbh_array(*xyz.T))
+    with jit.use_backend('numba'):
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda _: xyz2lbh_array(*xyz.T),
+                                        range(8)))
+        kernels = jit._state['kernels']
+        assert all(jit.kernel(name) is kernels[name] for name in kernels)
+
+    for name in kernels:
+        assert kernels[name].targetoptions['nogil']
+    for result in results:
+        np.testing.assert_allclose(result[:2], expected[:2], rtol=0,
+                                   atol=1e-12)
+
+
+# the kernels called from several threads with numba workqueue layer
+THREADS_SCRIPT = textwrap.dedent("""\
+    from concurrent.futures import ThreadPoolExecutor
+
+    import numpy as np
+
+    from coordinates import jit
+    from coordinates.geodesy import xyz2lbh_array
+
+    jit.set_backend('numba')
+    xyz = np.random.RandomState(0).normal(0, 7e6, (100000, 3))
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: xyz2lbh_array(*xyz.T),
+                                    range(32)))
+    assert all(np.array_equal(r, results[0]) for r in results)
+    print('ok')
+""")
+
+
+def test_threads_workqueue(numba_available):
+    env = dict(os.environ, NUMBA_THREADING_LAYER='workqueue')
+    env['PYTHONPATH'] = os.pathsep.join(
+        [os.path.dirname(os.path.dirname(jit.__file__))] +
+        env.get('PYTHONPATH', '').split(os.pathsep))
+    process = subprocess.run(
+        [sys.executable, '-c', THREADS_SCRIPT],
+        env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True, timeout=300,
+    )
+    assert process.returncode == 0, process.stderr
+    assert process.stdout.strip() == 'ok'
+
+
+def test_satellite_xyz_many(nav_file_v3, numba_available):
+    sec = datetime2sec(np.datetime64('2017-09-08T00:20') +
+                       np.arange(10) * np.timedelta64(15, 'm'))
+
+    with nav_file_v3 as filename:
+        for satellite, number in [('G', 1), ('S', 20)]:
+            std, test = both(satellite_xyz_many, filename, satellite,
+                             number, sec)
+            np.testing.assert_allclose(test, std, rtol=0, atol=1e-6)
@@ -0,0 +1,205 @@
+import datetime
+import gzip
+import io
+
+import numpy as np
+import pytest
+
+from coordinates.exceptions import RinexObsFileError
+from coordinates.observations import block_xyz, rnx_obs
+from coordinates.sat import satellite_xyz
+from coordinates.synthetic import (
+    OBS_TYPES,
+    OBS_TYPES_V2,
+    nav_records,
+    write_nav,
+    write_obs,
+    write_obs_header,
+)
+from coordinates.timescale import datetime2sec
+
+START = datetime.datetime(2017, 9, 8, 1)
+POSITION = (-6100258.869, -996506.167, -1567978.863)
+
+# RINEX 3: GPS with 10 and GLONASS with 8 observation types
+DATA_V3 = """\
+> 2017 09 08 01 00  0.0000000  0  2
+G05  23048351.892 8 113451131.70016      3874.134 8        48.503 8
+R12                 125327792.144 6
+> 2017 09 08 01 00 30.0000000  3  1
+EVENT COMMENT
+> 2017 09 08 01 00 30.0000000  0  1
+G05  23048352.112 8 113451133.109 6
+"""
+
+# RINEX 2: L1, L2, L5, C1, P1, C2, P2, C5, S1, S2
+DATA_V2 = """\
+ 17  9  8  1  0  0.0000000  0 13G01G02G03G04G05G06G07G08G09G10G11R01
+                                R02
+ 117415917.408 6 125529137.21915
+""" + ' ' * 72 + """45.268 7
+""" + """\
+ 117415917.408 6
+
+""" * 12 + """\
+ 17  9  8  1  0 30.0000000  4  1
+EVENT COMMENT
+ 17  9  8  1  0 30.0000000  6  1G01
+ 117415917.408 6
+
+ 17  9  8  1  0 30.0000000  0  1G01
+  12345678.901
+
+"""
+
+
+def obs_content(data, version=3.03, systems='GR'):
+    out = io.StringIO()
+    write_obs_header(out, START, POSITION, version=version, systems=systems)
+    return out.getvalue() + data
+
+
+def test_read_v3():
+    obs = rnx_obs(io.StringIO(obs_content(DATA_V3)))
+
+    assert obs.header.version == 3.03
+    assert obs.header.time_system == 'G'
+    assert obs.header.obs_types['R'] == OBS_TYPES['R']
+    assert obs.header.columns[:10] == OBS_TYPES['G']
+    assert len(obs.header.columns) == 14
+    assert obs.header.station.marker_name == 'SYNT'
+
+    blocks = list(obs)
+    assert len(blocks) == 1
+
+    block = blocks[0]
+    sec = datetime2sec(START)
+    assert block.epoch.tolist() == [sec, sec, sec + 30]
+    assert block.satellite.tolist() == ['G', 'R', 'G']
+    assert block.number.tolist() == [5, 12, 5]
+    assert block.values.shape == (3, 14)
+    assert block.obs_types == obs.header.columns
+
+    c1c = block.obs_types.index('C1C')
+    l1c = block.obs_types.index('L1C')
+    assert block.values[0, :4].tolist() == [
+        23048351.892, 113451131.700, 3874.134, 48.503]
+    assert np.isnan(block.values[0, 4:]).all()
+    assert block.lli[0, l1c] == 1
+    assert block.ssi[0, :4].tolist() == [8, 6, 8, 8]
+
+    # GLONASS columns
+    assert np.isnan(block.values[1, c1c])
+    assert block.values[1, l1c] == 125327792.144
+    assert block.values[1, obs.header.columns.index('C2P')] != 0
+    assert np.isnan(block.values[1, obs.header.columns.index('C2W')])
+    assert block.lli[1].sum() == 0
+
+
+def test_read_v2():
+    content = obs_content(DATA_V2, version=2.11, systems='G')
+    blocks = list(rnx_obs(io.StringIO(content)))
+    block = blocks[0]
+
+    assert block.obs_types == OBS_TYPES_V2
+    assert block.satellite.tolist() == ['G'] * 11 + ['R', 'R', 'G']
+    assert block.number.tolist() == list(range(1, 12)) + [1, 2, 1]
+    # the second satellite of the first epoch has only L1
+    assert block.values[1].tolist()[0] == 117415917.408
+    assert np.isnan(block.values[1, 1:]).all()
+
+    assert block.values[0, :2].tolist() == [117415917.408, 125529137.219]
+    assert block.values[0, 9] == 45.268
+    assert np.isnan(block.values[0, 2:9]).all()
+    assert block.lli[0, :2].tolist() == [0, 1]
+    assert block.ssi[0, [0, 1, 9]].tolist() == [6, 5, 7]
+
+    assert block.epoch[-1] == datetime2sec(START) + 30
+    assert block.values[-1, 0] == 12345678.901
+    assert block.ssi[-1, 0] == 0
+
+
+def test_read_v2_blank_system():
+    content = obs_content(DATA_V2.replace('13G01', '13 01'), version=2.11,
+                          systems='G')
+    block = next(iter(rnx_obs(io.StringIO(content))))
+    assert block.satellite[0] == 'G'
+    assert block.number[0] == 1
+    assert block.values[0, 0] == 117415917.408
+
+
+@pytest.mark.parametrize('version', [3.03, 2.11])
+@pytest.mark.parametrize('block_size', [1, 7, 500])
+def test_blocks(tmp_path, version, block_size):
+    path = str(tmp_path / 'synt2510.17o.gz')
+    with gzip.open(path, 'wt') as obs_file:
+        write_obs(obs_file, START, POSITION, 20, version=version)
+
+    obs = rnx_obs(path, block_size=block_size)
+    blocks = list(obs)
+    assert len(blocks) == -(-20 // block_size)
+
+    epoch = np.concatenate([b.epoch for b in blocks])
+    assert len(epoch) == 20 * 40
+    assert np.unique(epoch).size == 20
+    assert (np.diff(epoch) >= 0).all()
+    for block in blocks:
+        assert np.unique(block.epoch).size <= block_size
+        assert block.values.shape == (len(block.epoch),
+                                      len(obs.header.columns))
+        assert block.lli.dtype == block.ssi.dtype == np.int8
+
+    values = np.concatenate([b.values for b in blocks])
+    assert np.isnan(values).any()
+    assert (~np.isnan(values)).any(axis=1).all()
+    # the blocks are the same whatever the size
+    assert np.array_equal(
+        values,
+        np.concatenate([b.values for b in rnx_obs(path, block_size=3)]),
+        equal_nan=True,
+    )
+
+
+def test_errors(tmp_path):
+    with pytest.raises(RinexObsFileError):
+        rnx_obs(io.StringIO(obs_content('').replace('END OF HEADER', '')))
+
+    bad_value = DATA_V3.replace('23048351.892', '2304835x.892')
+    with pytest.raises(RinexObsFileError):
+        list(rnx_obs(io.StringIO(obs_content(bad_value))))
+
+    truncated = DATA_V3[:DATA_V3.index('R12')]
+    with pytest.raises(RinexObsFileError):
+        list(rnx_obs(io.StringIO(obs_content(truncated))))
+
+    crinex = '{:20s}{:20s}{:20s}{}\n'.format(
+        '1.0', 'COMPACT RINEX FORMAT', '', 'CRINEX VERS   / TYPE')
+    with pytest.raises(RinexObsFileError):
+        rnx_obs(io.StringIO(crinex + obs_content(DATA_V3)))
+
+
+def test_block_xyz(tmp_path):
+    nav_path = str(tmp_path / 'synt2510.17p')
+    with open(nav_path, 'w') as nav_file:
+        write_nav(nav_file, nav_records(START, hours=2,
+                                        satellites=dict(G=5, R=12)))
+
+    block = next(iter(rnx_obs(io.StringIO(obs_content(DATA_V3)))))
+    block = block._replace(
+        satellite=np.array(['G', 'R', 'G', 'E']),
+        number=np.array([5, 12, 5, 1]),
+        epoch=np.append(block.epoch, block.epoch[-1]),
+    )
+    xyz = block_xyz(nav_path, block)
+
+    assert xyz.shape == (4, 3)
+    assert np.isnan(xyz[3]).all()
+    for i in range(3):
+        epoch = START + datetime.timedelta(seconds=block.epoch[i] -
+                                           block.epoch[0])
+        if block.satellite[i] == 'R':
+            # GLONASS messages are in UTC
+            epoch -= datetime.timedelta(seconds=18)
+        expected = satellite_xyz(nav_path, block.satellite[i],
+                                 int(block.number[i]), epoch)
+        assert np.allclose(xyz[i], expected, rtol=0, atol=1e-3)
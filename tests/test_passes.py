@@ -0,0 +1,107 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from coordinates.broadcast import RinexNavFile
+from coordinates.geometry import geometry
+from coordinates.passes import predict_passes
+from coordinates.synthetic import nav_records, write_nav
+from coordinates.timescale import datetime2sec
+
+RECEIVERS = [
+    (4121967.5664, 2652172.1378, 4069036.5926),
+    (-6100258.8690, -996506.1670, -1567978.8630),
+]
+
+
+def brute_force(filename, receiver, start, end, mask):
+    sec = np.arange(start, end + 1, 1.)
+    el = geometry(filename, [receiver], 'G', 1, sec).elevation[0, 0]
+    above = el >= mask
+    change = np.flatnonzero(above[1:] != above[:-1])
+    return sec, el, change
+
+
+def test_predict_passes(nav_file_v3):
+    start = datetime2sec(datetime.datetime(2017, 9, 8))
+    end = start + 86400
+    mask = 10
+
+    with nav_file_v3 as filename:
+        passes = predict_passes(filename, RECEIVERS, 'G', 1, start, end,
+                                mask=mask)
+
+        assert passes
+        stations = [p.station for p in passes]
+        assert stations == sorted(stations)
+
+        for s, receiver in enumerate(RECEIVERS):
+            sec, el, change = brute_force(filename, receiver, start, end,
+                                          mask)
+            station_passes = [p for p in passes if p.station == s]
+
+            events = []
+            for p in station_passes:
+                assert (p.satellite, p.number) == ('G', 1)
+                if not np.isnan(p.rise):
+                    events.append(p.rise)
+                if not np.isnan(p.set):
+                    events.append(p.set)
+                assert p.max_elevation >= mask
+
+                in_pass = (sec >= np.nan_to_num(p.rise, nan=start)) & \
+                          (sec <= np.nan_to_num(p.set, nan=end))
+                peak = np.argmax(np.where(in_pass, el, -90))
+                assert p.max_elevation == pytest.approx(el[peak], abs=1e-3)
+                assert p.culmination == pytest.approx(sec[peak], abs=30)
+
+            np.testing.assert_allclose(events, sec[change] + 0.5, atol=1)
+
+
+def test_predict_passes_leap_seconds(tmp_path, monkeypatch):
+    filename = str(tmp_path / 'synthetic.rnx')
+    with open(filename, 'w') as out:
+        write_nav(out, nav_records(datetime.datetime(2017, 9, 8), hours=7,
+                                   satellites=dict(R=4)))
+    start = datetime.datetime(2017, 9, 8, 1)
+
+    expected = predict_passes(filename, RECEIVERS, 'R', [1, 2, 3, 4], start,
+                              start + datetime.timedelta(hours=6),
+                              leap_seconds=18)
+    assert expected
+
+    calls = []
+    retrieve_leap_seconds = RinexNavFile.retrieve_leap_seconds
+
+    def counting(filename):
+        calls.append(filename)
+        return retrieve_leap_seconds(filename)
+
+    monkeypatch.setattr(RinexNavFile, 'retrieve_leap_seconds',
+                        staticmethod(counting))
+
+    passes = predict_passes(filename, RECEIVERS, 'R', [1, 2, 3, 4], start,
+                            start + datetime.timedelta(hours=6))
+    # the header is read once for all the refinement steps
+    assert calls == [filename]
+    assert passes == expected
+
+
+def test_predict_passes_absent(nav_file_v3):
+    start = datetime2sec(datetime.datetime(2017, 9, 8))
+    with nav_file_v3 as filename:
+        passes = predict_passes(filename, RECEIVERS, 'R', 1, start,
+                                start + 3600)
+    assert passes == []
+
+
+def test_predict_passes_empty_span(nav_file_v3):
+    start = datetime2sec(datetime.datetime(2017, 9, 8, 1))
+    with nav_file_v3 as filename:
+        passes = predict_passes(filename, RECEIVERS, 'G', 1, start, start,
+                                mask=-90)
+    assert passes
+    for p in passes:
+        assert np.isnan(p.rise) and np.isnan(p.set)
+        assert p.culmination == start
@@ -0,0 +1,137 @@
+import datetime
+from io import StringIO
+
+import numpy as np
+import pytest
+
+from coordinates import datum
+from coordinates.batch import xyz_array_calculator
+from coordinates.ephemeris import GeoEphemeris, ephemeris_array
+from coordinates.exceptions import SatSystemError
+from coordinates.kernels import bds_geo_sat_xyz_array
+from coordinates.propagators import (
+    PROPAGATORS,
+    Propagator,
+    find_propagator,
+    register_propagator,
+    satellite_class,
+)
+from coordinates.sat import (
+    BDS_GEO_PROPAGATOR,
+    KEPLER_PROPAGATOR,
+    bds_geo_sat_xyz,
+    gps_sat_xyz,
+    read_nav_data,
+    satellite_xyz,
+    xyz_calculator,
+)
+from coordinates.synthetic import write_nav_header
+
+# BDS GEO satellite with the perturbations, BDT
+NAV_C01 = (
+    'C01 2017 09 08 00 00 00-1.165584811742e-04'
+    ' 5.834500761653e-12 0.000000000000e+00\n'
+    '     1.000000000000e+00 4.865625000000e+02'
+    ' 2.145803699535e-10-2.834888362922e+00\n'
+    '     1.580640673637e-05 4.571832250804e-04'
+    ' 2.465862780809e-05 6.493394513057e+03\n'
+    '     4.320000000000e+05-1.816079020500e-07'
+    ' 3.464353008733e+01 5.075708031654e-08\n'
+    '     8.726646259972e-02-2.575312500000e+02'
+    ' 5.204267823391e-01 1.003613662000e-10\n'
+    '     1.035757516470e-10 1.000000000000e+00'
+    ' 6.090000000000e+02 0.000000000000e+00\n'
+    '     2.000000000000e+00 0.000000000000e+00'
+    ' 5.000000000000e-09 0.000000000000e+00\n'
+    '     4.302000000000e+05 1.000000000000e+00\n'
+)
+
+
+@pytest.fixture
+def registry():
+    saved = dict(PROPAGATORS)
+    yield PROPAGATORS
+    PROPAGATORS.clear()
+    PROPAGATORS.update(saved)
+
+
+def geo_message(toe=345600.):
+    """Elements of an ideal geostationary orbit in the frame tilted by 5
+    degrees, see GeoEphemeris.
+
+    """
+    a = (datum.mu / datum.omega ** 2) ** (1 / 3)
+    message = [0.] * 26
+    message[7] = np.sqrt(a)
+    message[8] = toe
+    message[10] = np.pi + datum.omega * toe
+    message[12] = np.radians(5)
+    return tuple(message)
+
+
+def test_satellite_class():
+    assert satellite_class('C', 1) == 'GEO'
+    assert satellite_class('C', 8) == 'IGSO'
+    assert satellite_class('C', 20) is None
+    assert satellite_class('G', 1) is None
+
+
+def test_find_propagator():
+    assert find_propagator('C', 1) is BDS_GEO_PROPAGATOR
+    assert find_propagator('C', 20) is KEPLER_PROPAGATOR
+    assert find_propagator('C') is KEPLER_PROPAGATOR
+
+    assert xyz_calculator('C', 59) is bds_geo_sat_xyz
+    assert xyz_calculator('C', 30) is gps_sat_xyz
+    assert xyz_array_calculator('C', 5) is bds_geo_sat_xyz_array
+
+    with pytest.raises(SatSystemError, match='X'):
+        find_propagator('X', 1)
+
+
+def test_register_propagator(registry):
+    propagator = Propagator('test', tuple, None, None)
+    register_propagator({'C'}, propagator, satellite_class='IGSO')
+
+    assert find_propagator('C', 8) is propagator
+    assert find_propagator('C', 1) is BDS_GEO_PROPAGATOR
+
+    register_propagator({'X'}, propagator)
+    assert find_propagator('X', 1) is propagator
+
+
+def test_bds_geo_sat_xyz():
+    toe = 345600.
+    message = geo_message(toe)
+    sec = toe + np.array([-3600., 0., 1800., 7200.])
+
+    xyz = np.array([bds_geo_sat_xyz(message, s) for s in sec])
+
+    # geostationary in ECEF
+    np.testing.assert_allclose(xyz, np.broadcast_to(xyz[0], xyz.shape),
+                               rtol=0, atol=1e-3)
+    assert np.abs(xyz[:, 2]).max() < 1e-3
+
+    test = bds_geo_sat_xyz_array(
+        ephemeris_array([GeoEphemeris(message)] * len(sec)),
+        sec,
+    )
+    np.testing.assert_allclose(test, xyz, rtol=0, atol=1e-6)
+
+
+def test_bds_geo_satellite_xyz():
+    out = StringIO()
+    write_nav_header(out, 3.03, 'N', 'M', 18)
+    content = out.getvalue() + NAV_C01
+    epoch = datetime.datetime(2017, 9, 8, 0, 30)
+
+    # the GEO algorithm since v1.1.0, the plain Kepler orbit before
+    xyz = satellite_xyz(StringIO(content), 'C', 1, epoch)
+    np.testing.assert_allclose(
+        xyz, (28544723.900337, 31009516.676709, -9.812115),
+        rtol=0, atol=1e-3,
+    )
+
+    message = read_nav_data(StringIO(content))[('C', 1)][0]['message']
+    kepler = gps_sat_xyz(message, message[8] + 1800)
+    assert abs(kepler[2] - xyz[2]) > 1e6
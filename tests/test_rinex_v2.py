@@ -150,3 +150,8 @@ def test_iter(nav_file_v2):
         nav = RinexNavFileV2(filename)
         for i, msg in enumerate(nav):
             assert std[i] == msg
+
+
+def test_retrieve_leap_seconds(nav_file_v2):
+    with nav_file_v2 as filename:
+        assert RinexNavFileV2.retrieve_leap_seconds(filename) == 17
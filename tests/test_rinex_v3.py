@@ -89,3 +89,9 @@ def test_iter(nav_file_v3):
         nav = RinexNavFileV3(filename)
         for i, msg in enumerate(nav):
             assert std[i] == msg
+
+
+def test_retrieve_leap_seconds(nav_file_v3, nav_iter_v3):
+    with nav_file_v3 as filename:
+        assert RinexNavFileV3.retrieve_leap_seconds(filename) == 18
+    assert RinexNavFileV3.retrieve_leap_seconds(nav_iter_v3) == 18
@@ -1,9 +1,16 @@
 import datetime
 
 import pytest
+from testlib import mktmp
 
-from coordinates.exceptions import SatSystemError, NavMessageNotFoundError
+from coordinates.ephemeris import GloEphemeris, KeplerEphemeris
+from coordinates.exceptions import (
+    NavMessageNotFoundError,
+    RinexNavFileError,
+    SatSystemError,
+)
 from coordinates.sat import GLO_WAY, GPS_WAY
+from coordinates.timescale import datetime2sec
 from coordinates.sat import (
     find_message,
     get_day_sec,
@@ -11,9 +18,11 @@ from coordinates.sat import (
     get_week_sec,
     glo_sat_xyz,
     gps_sat_xyz,
+    is_within_fit_interval,
     nearest_message,
     read_nav_data,
     reference_time,
+    satellite_xyz,
     xyz_calculator,
 )
 
@@ -72,12 +81,124 @@ def test_read_nav_data(nav_file_unsorted_v3):
 
     }
 
+    for record in std[('S', 20)]:
+        record['ephemeris'] = GloEphemeris(record['message'])
+
     with nav_file_unsorted_v3 as filename:
         test = read_nav_data(filename)
 
     assert std == test
 
 
+def test_read_nav_data_duplicates(nav_file_v3):
+    with nav_file_v3 as filename:
+        with open(filename) as f:
+            lines = f.readlines()
+    end = [i for i, line in enumerate(lines) if 'END OF HEADER' in line][0]
+    records = lines[end + 1:]
+    content = lines[:end + 1] + records * 3
+
+    with mktmp(content) as filename:
+        test = read_nav_data(filename)
+
+    assert test.dropped == dict(duplicate=4, unhealthy=0, fit_interval=0)
+    assert len(test[('G', 1)]) == 1
+    assert len(test[('S', 20)]) == 1
+
+
+def test_read_nav_data_skip_errors(nav_file_v3):
+    with nav_file_v3 as filename:
+        with open(filename) as f:
+            lines = f.readlines()
+    end = [i for i, line in enumerate(lines) if 'END OF HEADER' in line][0]
+    records = lines[end + 1:]
+    damaged = records[:]
+    damaged[3] = damaged[3].replace('e', 'x')
+    content = lines[:end + 1] + damaged + records
+
+    with mktmp(content) as filename:
+        with pytest.raises(RinexNavFileError):
+            read_nav_data(filename)
+
+        test = read_nav_data(filename, errors='skip')
+        assert read_nav_data(filename, errors='skip') is test
+
+    assert [e.line_number for e in test.errors] == [end + 2]
+    assert test.dropped == dict(duplicate=1, unhealthy=0, fit_interval=0)
+    assert len(test[('G', 1)]) == 1
+    assert len(test[('S', 20)]) == 1
+
+
+def test_read_nav_data_filters(nav_file_v3):
+    with nav_file_v3 as filename:
+        test = read_nav_data(filename, healthy_only=True,
+                             check_fit_interval=True)
+
+    # S20 health is 1
+    assert test.dropped == dict(duplicate=0, unhealthy=1, fit_interval=0)
+    assert list(test) == [('G', 1)]
+
+
+def test_is_within_fit_interval():
+    message = [0.] * 26
+    message[8] = 432000.
+    message[24] = 432000. - 7200
+    assert is_within_fit_interval('G', message)
+
+    message[24] = 432000. - 7201
+    assert not is_within_fit_interval('G', message)
+
+    message[25] = 6.
+    assert is_within_fit_interval('G', message)
+
+    # week rollover
+    message[8] = 0.
+    message[24] = 604800. - 3600
+    assert is_within_fit_interval('G', message)
+
+    message[24] = 0.
+    message[8] = 86400.
+    assert is_within_fit_interval('E', message)
+
+
+def test_is_within_fit_interval_qzss():
+    message = [0.] * 26
+    message[8] = 432000.
+    # the flag 0: 2 hours
+    message[24] = 432000. - 3600
+    assert is_within_fit_interval('J', message)
+    message[24] = 432000. - 3601
+    assert not is_within_fit_interval('J', message)
+
+    # the flag 1: more than 2 hours, not checked
+    message[25] = 1.
+    message[24] = 432000. - 7200
+    assert is_within_fit_interval('J', message)
+
+    # hours
+    message[25] = 4.
+    assert is_within_fit_interval('J', message)
+    message[24] = 432000. - 7201
+    assert not is_within_fit_interval('J', message)
+
+
+def test_compiled_ephemeris(nav_file_v3):
+    epoch = datetime.datetime(2017, 9, 8, 1, 30)
+    dt = 3600.
+
+    with nav_file_v3 as filename:
+        nav_data = read_nav_data(filename)
+
+    for sat, calculate, ephemeris_type, t in [
+        (('G', 1), gps_sat_xyz, KeplerEphemeris, reference_time('G', epoch)),
+        (('S', 20), glo_sat_xyz, GloEphemeris, dt),
+    ]:
+        record = nav_data[sat][0]
+        assert isinstance(record['ephemeris'], ephemeris_type)
+        assert (calculate(record['ephemeris'], t) ==
+                calculate(record['message'], t))
+
+
 def test_nearest_message():
     messages = [
         {'epoch': datetime.datetime(2017, 9, 8, 2, 0), 'message': 1},
@@ -196,3 +317,46 @@ def test_xyz_calculator(unknown_sat_system):
 
     with pytest.raises(SatSystemError, match=unknown_sat_system):
         xyz_calculator(unknown_sat_system)
+
+
+def test_get_dt_days():
+    obs_epoch = datetime.datetime(2017, 1, 2, 0, 0, 30)
+    msg_epoch = datetime.datetime(2017, 1, 1, 0, 0, 0)
+
+    assert get_dt(msg_epoch, obs_epoch) == 86430
+    assert get_dt(obs_epoch, msg_epoch) == -86430
+
+
+def test_find_message_sec(nav_file_unsorted_v3):
+    epoch = datetime.datetime(2017, 9, 8, 0, 4, 0)
+    sec = datetime2sec(epoch)
+
+    with nav_file_unsorted_v3 as filename:
+        nav_data = read_nav_data(filename)
+
+    std = find_message(nav_data, 'S', 20, epoch)
+    test = find_message(nav_data, 'S', 20, sec)
+
+    assert std == test
+
+
+def test_find_message_absent(nav_file_v3):
+    from coordinates.batch import satellite_xyz_many
+
+    epoch = datetime.datetime(2017, 9, 8, 0, 20, 0)
+    with nav_file_v3 as filename:
+        nav_data = read_nav_data(filename)
+        for _ in range(2):
+            with pytest.raises(NavMessageNotFoundError):
+                find_message(nav_data, 'G', 5, epoch)
+            with pytest.raises(NavMessageNotFoundError):
+                satellite_xyz(filename, 'G', 5, epoch)
+
+        # the cached data isn't changed by the lookups
+        assert ('G', 5) not in read_nav_data(filename)
+        with pytest.raises(KeyError):
+            nav_data[('G', 5)]
+
+        with pytest.raises(NavMessageNotFoundError):
+            satellite_xyz_many(filename, ['G', 'G'], [1, 5],
+                               datetime2sec(epoch))
@@ -0,0 +1,148 @@
+import datetime
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection
+
+import numpy as np
+import pytest
+
+from coordinates.batch import satellite_xyz_many
+from coordinates.geodesy import receiver_frames, row_azimuth_elevation
+from coordinates.serve import make_server
+from coordinates.timescale import datetime2sec
+
+START = datetime.datetime(2017, 9, 8, 0, 20, 0)
+RECEIVER = (-6100258.869, -996506.167, -1567978.863)
+
+
+@pytest.fixture
+def server(nav_file_v3):
+    with nav_file_v3 as filename:
+        server = make_server([filename], port=0, window=0.05)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            yield server, filename
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+
+def request(server, method, path, body=None):
+    connection = HTTPConnection(*server.server_address[:2], timeout=10)
+    try:
+        connection.request(method, path,
+                           body=None if body is None else json.dumps(body))
+        response = connection.getresponse()
+        return response.status, json.loads(response.read().decode('utf-8'))
+    finally:
+        connection.close()
+
+
+def query(i=0):
+    return dict(
+        satellite=['G', 'S'],
+        number=[1, 20],
+        epoch=datetime2sec(START) + 900 * i,
+    )
+
+
+def test_xyz(server):
+    server, filename = server
+    epochs = [START + datetime.timedelta(minutes=15 * i) for i in range(4)]
+
+    status, response = request(server, 'POST', '/xyz', dict(
+        satellite='G',
+        number=1,
+        epoch=[e.isoformat() for e in epochs],
+    ))
+    assert status == 200
+    np.testing.assert_array_equal(
+        response['xyz'], satellite_xyz_many(filename, 'G', 1, epochs))
+
+
+def test_azel(server):
+    server, filename = server
+    body = dict(query(), receiver=RECEIVER)
+    body['nav'] = server.store.name()
+
+    status, response = request(server, 'POST', '/azel', body)
+    assert status == 200
+
+    xyz = satellite_xyz_many(filename, body['satellite'], body['number'],
+                             body['epoch'])
+    receiver = np.array(RECEIVER)
+    azimuth, elevation = row_azimuth_elevation(
+        receiver, receiver_frames(receiver)[0], xyz)
+    np.testing.assert_allclose(response['azimuth'], azimuth)
+    np.testing.assert_allclose(response['elevation'], elevation)
+
+
+def test_batching(server):
+    server, filename = server
+    barrier = threading.Barrier(8)
+
+    def call(i):
+        barrier.wait()
+        return request(server, 'POST', '/xyz', query(i))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(call, range(8)))
+
+    for i, (status, response) in enumerate(results):
+        assert status == 200
+        body = query(i)
+        np.testing.assert_array_equal(
+            response['xyz'],
+            satellite_xyz_many(filename, body['satellite'], body['number'],
+                               body['epoch']),
+        )
+
+    stats = server.stats.snapshot()
+    assert stats['requests'] == 8
+    assert stats['rows'] == 16
+    assert stats['batches'] < 8
+
+
+def test_errors(server):
+    server, filename = server
+
+    status, response = request(server, 'POST', '/xyz',
+                               dict(query(), nav='brdm0010.17p'))
+    assert status == 400
+    assert 'Unknown' in response['error']
+
+    body = query()
+    del body['epoch']
+    assert request(server, 'POST', '/xyz', body)[0] == 400
+    assert request(server, 'POST', '/xyz', [1, 2])[0] == 400
+    assert request(server, 'GET', '/xyz')[0] == 404
+
+    # the failed request doesn't fail the batch
+    def call(body):
+        return request(server, 'POST', '/xyz', body)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        bad, good = executor.map(call, [dict(query(), number=[1, 30]),
+                                        query()])
+    assert bad[0] == 400
+    assert good[0] == 200
+
+
+def test_stats(server):
+    server, filename = server
+    request(server, 'POST', '/xyz', query())
+    request(server, 'POST', '/xyz', dict(query(), satellite='X'))
+
+    status, stats = request(server, 'GET', '/stats')
+    assert status == 200
+    assert 'caches' in stats
+
+    stats = stats['server']
+    assert stats['requests'] == 2
+    assert stats['errors'] == 1
+    assert stats['files'] == list(server.store.paths)
+    assert stats['requests_per_second'] > 0
+    assert 0 < stats['latency']['p50'] <= stats['latency']['max']
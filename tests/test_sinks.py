@@ -0,0 +1,137 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from coordinates.batch import satellite_xyz_many
+from coordinates.geodesy import xyz2lbh_array
+from coordinates.sinks import (
+    ColumnSink,
+    FeatherSink,
+    HDF5Sink,
+    ParquetSink,
+    orbit_columns,
+    to_arrow,
+    write_orbits,
+)
+from coordinates.timescale import datetime2sec
+
+
+@pytest.fixture
+def request_arrays():
+    start = datetime2sec(datetime.datetime(2017, 9, 8, 1))
+    sec = np.repeat(start + 60 * np.arange(50), 2)
+    satellites = np.tile(['G', 'S'], 50)
+    numbers = np.tile([1, 20], 50)
+    return satellites, numbers, sec
+
+
+def test_orbit_columns(request_arrays):
+    satellites, numbers, sec = request_arrays
+    xyz = np.ones((len(sec), 3)) * 2e7
+
+    columns = orbit_columns(satellites, numbers, sec, xyz, geodetic=True)
+    assert list(columns) == ['epoch', 'system', 'prn', 'xyz',
+                             'lon', 'lat', 'h']
+    np.testing.assert_array_equal(columns['epoch'], sec)
+    np.testing.assert_array_equal(columns['system'], satellites)
+    np.testing.assert_array_equal(columns['prn'], numbers)
+
+    lon, lat, h = xyz2lbh_array(*xyz.T)
+    np.testing.assert_array_equal(columns['h'], h)
+
+    columns = orbit_columns('G', 1, sec, xyz, clock=np.zeros(len(sec)))
+    assert list(columns) == ['epoch', 'system', 'prn', 'xyz', 'clock']
+
+
+def test_abstract_sink():
+    with pytest.raises(TypeError):
+        ColumnSink('unused')
+
+
+@pytest.mark.parametrize('dtype', ['U', 'S'])
+def test_to_arrow_strings(dtype):
+    pyarrow = pytest.importorskip('pyarrow')
+    values = ['G', 'R', 'E', 'SBS', '', 'C']
+    column = to_arrow(np.array(values, dtype=dtype))
+    assert column.type == pyarrow.string()
+    assert column.to_pylist() == values
+    assert to_arrow(np.array([], dtype=dtype)).to_pylist() == []
+
+
+def test_write_columns_length():
+    pytest.importorskip('pyarrow')
+    sink = FeatherSink('unused')
+    with pytest.raises(ValueError):
+        sink.write({'a': np.zeros(2), 'b': np.zeros(3)})
+
+
+@pytest.mark.parametrize('sink_type', [ParquetSink, FeatherSink])
+def test_arrow_sinks(nav_file_v3, request_arrays, tmp_path, sink_type):
+    pyarrow = pytest.importorskip('pyarrow')
+    import pyarrow.feather
+    import pyarrow.parquet
+
+    satellites, numbers, sec = request_arrays
+    filename = str(tmp_path / 'orbits')
+
+    with nav_file_v3 as nav:
+        std = satellite_xyz_many(nav, satellites, numbers, sec)
+        with sink_type(filename) as sink:
+            write_orbits(sink, nav, satellites, numbers, sec,
+                         chunk_size=30, geodetic=True)
+    assert sink.rows == len(sec)
+
+    if sink_type is ParquetSink:
+        table = pyarrow.parquet.read_table(filename)
+    else:
+        table = pyarrow.feather.read_table(filename)
+
+    assert table.num_rows == len(sec)
+    np.testing.assert_array_equal(table['epoch'].to_numpy(), sec)
+    assert table['system'].to_pylist() == satellites.tolist()
+    np.testing.assert_array_equal(table['prn'].to_numpy(), numbers)
+
+    xyz = np.array(table['xyz'].to_pylist())
+    np.testing.assert_array_equal(xyz, std)
+
+
+def test_hdf5_sink(nav_file_v3, request_arrays, tmp_path):
+    h5py = pytest.importorskip('h5py')
+
+    satellites, numbers, sec = request_arrays
+    filename = str(tmp_path / 'orbits.h5')
+
+    with nav_file_v3 as nav:
+        std = satellite_xyz_many(nav, satellites, numbers, sec)
+        with HDF5Sink(filename, group='orbits') as sink:
+            write_orbits(sink, nav, satellites, numbers, sec, chunk_size=30)
+
+    with h5py.File(filename, 'r') as data:
+        group = data['orbits']
+        np.testing.assert_array_equal(group['epoch'][:], sec)
+        np.testing.assert_array_equal(group['xyz'][:], std)
+        np.testing.assert_array_equal(group['prn'][:], numbers)
+        assert group['system'][:].astype(str).tolist() == \
+            satellites.tolist()
+
+
+def test_write_orbits_velocity_clock(nav_file_v3, request_arrays, tmp_path):
+    h5py = pytest.importorskip('h5py')
+
+    satellites, numbers, sec = request_arrays
+    filename = str(tmp_path / 'orbits.h5')
+    velocity = np.arange(len(sec) * 3, dtype=float).reshape(-1, 3)
+    clock = np.arange(len(sec)) * 1e-9
+
+    with nav_file_v3 as nav:
+        with HDF5Sink(filename) as sink:
+            write_orbits(sink, nav, satellites, numbers, sec, chunk_size=30,
+                         velocity=velocity, clock=clock)
+            with pytest.raises(ValueError):
+                write_orbits(sink, nav, satellites, numbers, sec,
+                             clock=clock[1:])
+
+    with h5py.File(filename, 'r') as data:
+        np.testing.assert_array_equal(data['velocity'][:], velocity)
+        np.testing.assert_array_equal(data['clock'][:], clock)
@@ -0,0 +1,193 @@
+import datetime
+from io import StringIO
+
+import numpy as np
+import pytest
+
+from coordinates.batch import satellite_xyz_many
+from coordinates.broadcast import RinexNavFile
+from coordinates.exceptions import NavMessageNotFoundError, SP3FileError
+from coordinates.sat import satellite_xyz
+from coordinates.sp3 import (
+    export_sp3,
+    lagrange_interpolate,
+    read_sp3,
+    write_sp3,
+)
+from coordinates.timescale import datetime2sec, sec2datetime
+
+START = datetime.datetime(2017, 9, 8, 0, 0, 0)
+STEP = 900
+EPOCHS = 24
+
+
+def sp3_content(filename):
+    """Returns SP3 text with G01 positions computed from the nav file,
+    S20 is absent at the first epoch.
+
+    """
+    sec = datetime2sec(START) + STEP * np.arange(EPOCHS)
+    g01 = satellite_xyz_many(filename, 'G', 1, sec) / 1000
+    s20 = satellite_xyz_many(filename, 'S', 20, sec) / 1000
+
+    lines = [
+        '#dP2017  9  8  0  0  0.00000000      24 ORBIT IGS14 HLM  IGS',
+        '## 1965 432000.00000000   900.00000000 58004 0.0000000000000',
+        '+    2   G01S20  0  0  0  0  0  0  0  0  0  0  0  0  0  0  0',
+        '%c M  cc GPS ccc cccc cccc cccc cccc ccccc ccccc ccccc ccccc',
+        '%c cc cc ccc ccc cccc cccc cccc cccc ccccc ccccc ccccc ccccc',
+        '/* test',
+    ]
+    for i, s in enumerate(sec):
+        e = sec2datetime(s)
+        lines.append(
+            '*  {:4d} {:2d} {:2d} {:2d} {:2d} {:11.8f}'.format(
+                e.year, e.month, e.day, e.hour, e.minute, e.second,
+            )
+        )
+        lines.append('PG01{:14.6f}{:14.6f}{:14.6f}{:14.6f}'.format(
+            *g01[i], 71.543883,
+        ))
+        if i:
+            lines.append('PS20{:14.6f}{:14.6f}{:14.6f}{:14.6f}'.format(
+                *s20[i], 999999.999999,
+            ))
+    lines.append('EOF')
+    return '\n'.join(lines) + '\n'
+
+
+@pytest.fixture
+def sp3(nav_file_v3):
+    with nav_file_v3 as filename:
+        yield filename, read_sp3(StringIO(sp3_content(filename)))
+
+
+def test_read_sp3(sp3):
+    _, orbits = sp3
+
+    assert orbits.time_system == 'GPS'
+    assert orbits.epochs.shape == (EPOCHS,)
+    assert orbits.epochs[0] == datetime2sec(START)
+    np.testing.assert_array_equal(np.diff(orbits.epochs), STEP)
+
+    np.testing.assert_array_equal(orbits.satellites, ['G', 'S'])
+    np.testing.assert_array_equal(orbits.numbers, [1, 20])
+    assert orbits.positions.shape == (2, EPOCHS, 3)
+
+    assert np.isnan(orbits.positions[1, 0]).all()
+    assert not np.isnan(orbits.positions[1, 1:]).any()
+
+    np.testing.assert_allclose(orbits.clocks[0], 71.543883e-6)
+    assert np.isnan(orbits.clocks[1]).all()
+
+
+def test_read_sp3_errors():
+    with pytest.raises(SP3FileError):
+        read_sp3(StringIO(''))
+
+    with pytest.raises(SP3FileError):
+        read_sp3(StringIO('     3.03           NAVIGATION DATA\n'))
+
+    content = '#dP2017\n*  2017  9  8  0 xx  0.00000000\n'
+    with pytest.raises(SP3FileError):
+        read_sp3(StringIO(content))
+
+
+def test_satellite_xyz(sp3):
+    filename, orbits = sp3
+
+    start = datetime2sec(START)
+    sec = start + STEP / 2 + STEP * np.arange(EPOCHS - 1)
+
+    std = satellite_xyz_many(filename, 'G', 1, sec)
+    test = satellite_xyz_many(orbits, 'G', 1, sec)
+    # the error grows at the edges of the file
+    np.testing.assert_allclose(test, std, rtol=0, atol=5e-2)
+    np.testing.assert_allclose(test[5:-5], std[5:-5], rtol=0, atol=1e-3)
+
+    epoch = sec2datetime(sec[5])
+    test = satellite_xyz(orbits, 'G', 1, epoch)
+    assert isinstance(test, tuple)
+    np.testing.assert_allclose(test, std[5], rtol=0, atol=1e-2)
+
+    # the window with absent value
+    assert np.isnan(satellite_xyz_many(orbits, 'S', 20, sec[0])).all()
+
+    with pytest.raises(NavMessageNotFoundError):
+        satellite_xyz_many(orbits, 'R', 1, sec)
+
+    with pytest.raises(NavMessageNotFoundError):
+        satellite_xyz_many(orbits, 'G', 1, start - 1)
+
+
+def test_lagrange_interpolate():
+    epochs = np.arange(10.)
+    values = np.stack([epochs ** 3, 2 * epochs, -epochs], axis=1)[np.newaxis]
+    sec = np.array([0., 0.5, 4.25, 9.])
+
+    std = np.stack([sec ** 3, 2 * sec, -sec], axis=1)
+    test = lagrange_interpolate(epochs, values, np.zeros(4, dtype=int), sec,
+                                order=4)
+    np.testing.assert_allclose(test, std)
+
+
+def test_write_sp3(nav_file_v3, monkeypatch):
+    sec = datetime2sec(START) + 300 * np.arange(30)
+    out = StringIO()
+
+    calls = []
+    retrieve_leap_seconds = RinexNavFile.retrieve_leap_seconds
+
+    def counting(filename):
+        calls.append(filename)
+        return retrieve_leap_seconds(filename)
+
+    monkeypatch.setattr(RinexNavFile, 'retrieve_leap_seconds',
+                        staticmethod(counting))
+
+    with nav_file_v3 as filename:
+        write_sp3(out, filename, sec, ['G', 'S', 'R'], [1, 20, 1],
+                  chunk_size=7)
+        # the header is read once for all the chunks
+        assert calls == [filename]
+        orbits = read_sp3(out)
+
+        np.testing.assert_array_equal(orbits.epochs, sec)
+        np.testing.assert_array_equal(orbits.satellites, ['G', 'S', 'R'])
+        np.testing.assert_array_equal(orbits.numbers, [1, 20, 1])
+
+        for i, (sat, num) in enumerate([('G', 1), ('S', 20)]):
+            std = satellite_xyz_many(filename, sat, num, sec)
+            np.testing.assert_allclose(orbits.positions[i], std,
+                                       rtol=0, atol=1e-3)
+        assert np.isnan(orbits.positions[2]).all()
+        assert np.isnan(orbits.clocks).all()
+
+    lines = out.getvalue().splitlines()
+    assert lines[0].startswith('#dP2017  9  8  0  0  0.00000000      30 ')
+    assert lines[1] == '## 1965 432000.00000000   300.00000000 58004 ' \
+                       '0.0000000000000'
+    assert lines[2].startswith('+    3   G01S20R01  0')
+    assert lines[-1] == 'EOF'
+
+
+def test_export_sp3(nav_file_v3, tmp_path):
+    start = START + datetime.timedelta(hours=23)
+    end = start + datetime.timedelta(hours=2)
+    filename_format = str(tmp_path / 'brd{:%Y%j}.sp3')
+
+    with nav_file_v3 as filename:
+        files = export_sp3(filename, start, end, 300, ['G', 'S'], [1, 20],
+                           filename_format)
+
+    assert files == [str(tmp_path / 'brd2017251.sp3'),
+                     str(tmp_path / 'brd2017252.sp3')]
+
+    first, second = read_sp3(files[0]), read_sp3(files[1])
+    assert len(first.epochs) == len(second.epochs) == 12
+    assert first.epochs[-1] + 300 == second.epochs[0]
+
+    # S20 has the message for the first day only
+    assert not np.isnan(first.positions).any()
+    assert not np.isnan(second.positions[0]).any()
+    assert np.isnan(second.positions[1]).all()
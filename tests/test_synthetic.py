@@ -0,0 +1,180 @@
+import datetime
+import io
+
+import numpy as np
+import pytest
+
+from coordinates import retrieve_xyz
+from coordinates.broadcast import rnx_nav
+from coordinates.sat import (
+    bds_geo_sat_xyz,
+    glo_sat_xyz,
+    gps_sat_xyz,
+    read_nav_data,
+)
+from coordinates.synthetic import (
+    CLASS_ORBITS,
+    DEFAULT_SATELLITES,
+    ORBITS,
+    nav_records,
+    write_nav,
+    write_obs_header,
+)
+from coordinates.timescale import datetime2sec, week_sec
+
+START = datetime.datetime(2017, 9, 8)
+SATELLITES = dict(G=3, R=3, E=2, C=2)
+
+
+def test_nav_records():
+    records = nav_records(START, hours=4, satellites=SATELLITES)
+
+    assert len(records) == 3 * 2 + 3 * 8 + 2 * 24 + 2 * 4
+    assert [r[2] for r in records] == sorted(r[2] for r in records)
+    assert records == nav_records(START, hours=4, satellites=SATELLITES)
+    assert records != nav_records(START, hours=4, satellites=SATELLITES,
+                                  seed=1)
+
+
+def test_write_nav(tmp_path):
+    records = nav_records(START, hours=2, satellites=SATELLITES)
+    filename = str(tmp_path / 'synthetic.rnx')
+    with open(filename, 'w') as out:
+        write_nav(out, records)
+
+    parsed = list(rnx_nav(filename))
+    assert len(parsed) == len(records)
+    for test, expected in zip(parsed, records):
+        assert test[:3] == expected[:3]
+        np.testing.assert_allclose(test[4], expected[4], rtol=1e-11)
+
+
+@pytest.mark.parametrize('duplicates', [0.25, 2.5])
+def test_write_nav_all_systems(tmp_path, duplicates):
+    records = nav_records(START, hours=1, satellites=DEFAULT_SATELLITES,
+                          duplicates=duplicates)
+    filename = str(tmp_path / 'synthetic.rnx')
+    with open(filename, 'w') as out:
+        write_nav(out, records)
+
+    parsed = list(rnx_nav(filename))
+    assert {r[0] for r in parsed} == set(DEFAULT_SATELLITES)
+    assert len(parsed) == len(records)
+
+    nav_data = read_nav_data(filename)
+    assert sum(len(v) for v in nav_data.values()) < len(records)
+    assert nav_data.dropped['duplicate'] == (
+        len(records) - sum(len(v) for v in nav_data.values()))
+    original = nav_records(START, hours=1, satellites=DEFAULT_SATELLITES)
+    assert nav_data.dropped['duplicate'] == len(records) - len(original)
+    assert len(records) == pytest.approx(len(original) * (1 + duplicates),
+                                         rel=0.1)
+
+
+@pytest.mark.parametrize('system', ['G', 'R', 'S'])
+def test_write_nav_v2(tmp_path, system):
+    records = nav_records(START, hours=2, satellites={system: 3})
+    filename = str(tmp_path / 'synthetic.rnx')
+    with open(filename, 'w') as out:
+        write_nav(out, records, version=2.11)
+
+    parsed = list(rnx_nav(filename))
+    assert len(parsed) == len(records)
+    for test, expected in zip(parsed, records):
+        assert test[:3] == expected[:3]
+        np.testing.assert_allclose(test[4], expected[4], rtol=1e-11)
+
+
+def test_write_nav_v2_errors():
+    with pytest.raises(ValueError, match='one system'):
+        write_nav(io.StringIO(), nav_records(START, hours=1),
+                  version=2.11)
+
+    with pytest.raises(ValueError, match='E'):
+        write_nav(io.StringIO(), nav_records(START, hours=1,
+                                             satellites=dict(E=1)),
+                  version=2.11)
+
+
+@pytest.mark.parametrize('system, number, semi_axis', [
+    ('G', 11, ORBITS['G'][0]),
+    ('E', 11, ORBITS['E'][0]),
+    ('C', 11, ORBITS['C'][0]),
+    ('C', 7, CLASS_ORBITS[('C', 'IGSO')][0]),
+    ('J', 2, ORBITS['J'][0]),
+    ('I', 2, ORBITS['I'][0]),
+])
+def test_kepler_messages(system, number, semi_axis):
+    records = [r for r in nav_records(START, hours=4,
+                                      satellites={system: number})
+               if r[1] == number]
+
+    previous = None
+    for _, _, epoch, _, message in records:
+        sec = week_sec(datetime2sec(epoch), 'G' if system == 'J' else system)
+        xyz = np.array(gps_sat_xyz(message, sec))
+        # eccentricity is below 0.02
+        assert np.linalg.norm(xyz) == pytest.approx(semi_axis, rel=0.03)
+
+        if previous is not None:
+            # consecutive messages describe the same orbit
+            test = np.array(gps_sat_xyz(previous, sec))
+            assert np.linalg.norm(test - xyz) < 1e-2
+        previous = message
+
+
+def test_geo_messages():
+    records = nav_records(START, hours=4, satellites=dict(C=1, S=1))
+
+    xyz = []
+    for system, _, epoch, _, message in records:
+        if system == 'C':
+            sec = week_sec(datetime2sec(epoch), system)
+            xyz.append(bds_geo_sat_xyz(message, sec + 600))
+        else:
+            xyz.append(glo_sat_xyz(message, 600.))
+    xyz = np.array(xyz)
+
+    # stationary over the equator
+    assert np.linalg.norm(xyz, axis=1) == pytest.approx(
+        CLASS_ORBITS[('C', 'GEO')][0])
+    assert np.abs(xyz[:, 2]).max() < 1e-3
+
+    for system in 'CS':
+        points = xyz[[r[0] == system for r in records]]
+        np.testing.assert_allclose(points, np.broadcast_to(points[0],
+                                                           points.shape),
+                                   rtol=0, atol=1.)
+
+
+def test_glo_messages():
+    records = nav_records(START, hours=1, satellites=dict(R=1))
+    semi_axis = ORBITS['R'][0]
+
+    for _, _, _, _, message in records:
+        xyz = np.array(glo_sat_xyz(message, 0.))
+        assert np.linalg.norm(xyz) == pytest.approx(semi_axis)
+
+
+@pytest.mark.parametrize('version, systems', [
+    (3.03, 'GRECJIS'),
+    (2.11, 'G'),
+    (2.11, 'GR'),
+])
+def test_write_obs_header(version, systems):
+    position = (-6100258.869, -996506.167, -1567978.863)
+    out = io.StringIO()
+    write_obs_header(out, START, position, systems=systems,
+                     version=version)
+
+    lines = out.getvalue().splitlines(True)
+    assert all(len(line) <= 81 for line in lines)
+    assert lines[0][5:9] == '{:.2f}'.format(version)
+    assert lines[-1][60:].rstrip() == 'END OF HEADER'
+    out.seek(0)
+    assert retrieve_xyz(out) == position
+
+    if version >= 3:
+        labels = [line[0] for line in lines
+                  if 'SYS / # / OBS TYPES' in line]
+        assert ''.join(labels) == systems
@@ -0,0 +1,94 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from coordinates.exceptions import SatSystemError
+from coordinates.sat import reference_time
+from coordinates.timescale import (
+    GPS_EPOCH,
+    convert,
+    datetime2sec,
+    day_sec,
+    from_gps,
+    sec2datetime,
+    to_gps,
+    week_sec,
+)
+
+
+def test_datetime2sec():
+    epoch = datetime.datetime(1980, 1, 8, 0, 0, 30)
+    assert datetime2sec(epoch) == 172830
+    assert datetime2sec(GPS_EPOCH) == 0
+
+    epochs = [epoch, datetime.datetime(1980, 1, 6, 0, 0, 1, 500000)]
+    std = np.array([172830, 1.5])
+    np.testing.assert_array_equal(datetime2sec(epochs), std)
+    np.testing.assert_array_equal(
+        datetime2sec(np.array(epochs, dtype='datetime64[us]')),
+        std,
+    )
+    np.testing.assert_array_equal(datetime2sec(std), std)
+
+
+def test_sec2datetime():
+    epoch = datetime.datetime(2017, 9, 8, 1, 50, 0, 250000)
+    assert sec2datetime(datetime2sec(epoch)) == epoch
+
+    epochs = sec2datetime(np.array([0., 1.5]))
+    std = np.array(['1980-01-06T00:00:00', '1980-01-06T00:00:01.5'],
+                   dtype='datetime64[us]')
+    np.testing.assert_array_equal(epochs, std)
+
+
+@pytest.mark.parametrize('satellite', ['G', 'C', 'E', 'I'])
+def test_week_sec(satellite):
+    epochs = [
+        datetime.datetime(2017, 9, 8, 1, 50, 0),
+        datetime.datetime(2017, 9, 10, 0, 0, 5),
+        datetime.datetime(2006, 1, 1, 0, 0, 0),
+    ]
+    for epoch in epochs:
+        std = reference_time(satellite, epoch)
+        test = week_sec(datetime2sec(epoch), satellite)
+        assert test == pytest.approx(std, abs=1e-6)
+
+    sec = datetime2sec(epochs)
+    test = week_sec(sec, satellite)
+    std = [reference_time(satellite, e) for e in epochs]
+    np.testing.assert_allclose(test, std, atol=1e-6)
+
+    with pytest.raises(SatSystemError):
+        week_sec(sec, 'X')
+
+
+def test_day_sec():
+    epoch = datetime.datetime(1980, 1, 7, 0, 2, 30)
+    assert day_sec(datetime2sec(epoch)) == 150
+
+
+def test_system_conversion():
+    gps = datetime2sec(datetime.datetime(2017, 9, 8, 0, 0, 18))
+
+    assert to_gps(from_gps(gps, 'C'), 'C') == gps
+    assert from_gps(gps, 'C') == gps - 14
+    assert from_gps(gps, 'E') == gps
+
+    # GLONASS = UTC + 3h
+    glo = from_gps(gps, 'R', leap_seconds=18)
+    assert sec2datetime(glo) == datetime.datetime(2017, 9, 8, 3, 0, 0)
+    utc = convert(glo, 'R', 'UTC', leap_seconds=18)
+    assert sec2datetime(utc) == datetime.datetime(2017, 9, 8, 0, 0, 0)
+
+    sec = np.array([gps, gps + 30])
+    np.testing.assert_array_equal(
+        to_gps(from_gps(sec, 'R', 18), 'R', 18),
+        sec,
+    )
+
+    with pytest.raises(ValueError):
+        to_gps(gps, 'R')
+
+    with pytest.raises(SatSystemError):
+        to_gps(gps, 'X')